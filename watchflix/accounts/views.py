@@ -8,7 +8,8 @@ from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework.decorators import action
 from django.shortcuts import get_object_or_404
 from movies.models import Actor, Director
-from recommender.recommender import MovieGraphRecommender
+from django.db import transaction
+from recommender.outbox import publish_follow_changed
 
 class UserProfileViewSet(viewsets.ModelViewSet):
     queryset = UserProfile.objects.all()
@@ -22,47 +23,36 @@ class UserProfileViewSet(viewsets.ModelViewSet):
     @action(detail=True, methods=['post'], url_path='follow-actor/(?P<actor_id>\d+)')
     def follow_actor(self, request, username=None, actor_id=None):
         try:
-            graph_recommender = MovieGraphRecommender()
-
             user_profile = self.get_object()
             actor = Actor.objects.get(id=actor_id)
 
-            actor.followers.add(user_profile)
-            actor.save()
-
-            graph_recommender.create_follows_actor_relationship(user_profile.id, actor_id)
+            # The FOLLOWS edge is written by the outbox dispatcher once this commits
+            with transaction.atomic():
+                actor.followers.add(user_profile)
+                publish_follow_changed(user_profile.id, 'Actor', actor.id)
 
             return Response({'detail': f'You are now following {actor.first_name} {actor.last_name}.'}, status=status.HTTP_200_OK)
         except Actor.DoesNotExist:
             return Response({'error': 'Actor not found.'}, status=status.HTTP_404_NOT_FOUND)
         except Exception as e:
             return Response({'error': f'An error occurred: {str(e)}'}, status=status.HTTP_400_BAD_REQUEST)
-        finally:
-            if 'graph_recommender' in locals():
-                graph_recommender.close()
 
     @action(detail=True, methods=['post'], url_path='follow-director/(?P<director_id>\d+)')
     def follow_director(self, request, username=None, director_id=None):
         try:
-            graph_recommender = MovieGraphRecommender()
-
             user_profile = self.get_object()
             director = Director.objects.get(id=director_id)
 
-            director.followers.add(user_profile)
-            director.save()
-
-            graph_recommender.create_follows_director_relationship(user_profile.id, director_id)
+            # The FOLLOWS edge is written by the outbox dispatcher once this commits
+            with transaction.atomic():
+                director.followers.add(user_profile)
+                publish_follow_changed(user_profile.id, 'Director', director.id)
 
             return Response({'detail': f'You are now following {director.first_name} {director.last_name}.'}, status=status.HTTP_200_OK)
-        
         except Director.DoesNotExist:
             return Response({'error': 'Director not found.'}, status=status.HTTP_404_NOT_FOUND)
         except Exception as e:
             return Response({'error': f'An error occurred: {str(e)}'}, status=status.HTTP_400_BAD_REQUEST)
-        finally:
-            if 'graph_recommender' in locals():
-                graph_recommender.close()
 
     @action(detail=True, methods=['get'], url_path='is-admin')
     def is_admin(self, request, username=None):
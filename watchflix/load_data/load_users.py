@@ -3,9 +3,8 @@ import names
 from datetime import datetime, timedelta
 from django.contrib.auth.models import User
 from accounts.models import UserProfile, SubscriptionPlan, Feature
-from recommender.recommender import MovieGraphRecommender
-
-graph_recommender = MovieGraphRecommender()
+from django.db import transaction
+from recommender.outbox import publish_user_changed
 
 def create_subscription_plans():
     basic_plan, _ = SubscriptionPlan.objects.get_or_create(
@@ -34,30 +33,30 @@ def create_user_profiles(user_ids):
         if not User.objects.filter(username=username).exists():
             print(f'Creating user with username: {username}, first name: {first_name}, last name: {last_name}.')
 
-            user = User.objects.create_user(
-                username=username,
-                password=password,
-                first_name=first_name,
-                last_name=last_name
-            )
-
-            birth_date = datetime.today() - timedelta(days=random.randint(18 * 365, 65 * 365))
-
-            # Assign Premium Plan for odd user IDs and Basic Plan for even user IDs
-            subscription_plan = SubscriptionPlan.objects.get(name='Premium Plan') if user_id % 2 else SubscriptionPlan.objects.get(name='Basic Plan')
-            print(f'Assigned subscription plan: {subscription_plan.name}')
-
-            # Create the UserProfile and save the user details
-            user_profile = UserProfile.objects.create(
-                user=user,
-                birth_date=birth_date.date(),
-                subscription_plan=subscription_plan
-            )
-            print(f'UserProfile created for user {username} with subscription plan {subscription_plan.name}')
-
-            # Create the user in the graph-based recommender system
-            graph_recommender.create_user(user_profile.id, user.username, str(user_profile.birth_date))
-            print(f'User {username} added to graph-based recommender system.')
+            with transaction.atomic():
+                user = User.objects.create_user(
+                    username=username,
+                    password=password,
+                    first_name=first_name,
+                    last_name=last_name
+                )
+
+                birth_date = datetime.today() - timedelta(days=random.randint(18 * 365, 65 * 365))
+
+                # Assign Premium Plan for odd user IDs and Basic Plan for even user IDs
+                subscription_plan = SubscriptionPlan.objects.get(name='Premium Plan') if user_id % 2 else SubscriptionPlan.objects.get(name='Basic Plan')
+                print(f'Assigned subscription plan: {subscription_plan.name}')
+
+                # Create the UserProfile and save the user details
+                user_profile = UserProfile.objects.create(
+                    user=user,
+                    birth_date=birth_date.date(),
+                    subscription_plan=subscription_plan
+                )
+                print(f'UserProfile created for user {username} with subscription plan {subscription_plan.name}')
+
+                # The graph user is created by the outbox dispatcher once this commits
+                publish_user_changed(user_profile.id)
         else:
             print(f'User with username {username} already exists. Skipping creation.')
 
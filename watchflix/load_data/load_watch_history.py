@@ -4,9 +4,7 @@ from movies.models import Movie
 from django.db import transaction
 from django.db.models import Avg
 from datetime import datetime
-from recommender.recommender import MovieGraphRecommender
-
-graph_recommender = MovieGraphRecommender()
+from recommender.outbox import publish_movies_changed, publish_watches_changed
 
 def load_watch_history(ratings_filtered):
     print("Starting load_watch_history...")  
@@ -50,14 +48,12 @@ def load_watch_history(ratings_filtered):
                     )
                 )
 
-                # Debug print for relationship creation in Neo4j
-                print(f"Creating graph relationship for user: {user.id}, movie: {movie.id}, rating: {row['rating']}")
-                graph_recommender.create_relationship(user.id, movie.id, row['rating'])
-
     if watch_history_objects:
         print(f"Bulk inserting {len(watch_history_objects)} watch history records...")
         with transaction.atomic():
             WatchHistory.objects.bulk_create(watch_history_objects, batch_size=1000)
+            # WATCHED edges are written in batches by the outbox dispatcher once this commits
+            publish_watches_changed({(watch.user.id, watch.movie.id) for watch in watch_history_objects})
 
     update_movie_avg_ratings(movie_map)
 
@@ -65,15 +61,18 @@ def load_watch_history(ratings_filtered):
 
 def update_movie_avg_ratings(movie_map):
     print("Updating movie average ratings...")
-    for movie_id in movie_map.keys():
-        avg_rating = WatchHistory.objects.filter(movie__id=movie_id).aggregate(average_rating=Avg('rating'))['average_rating']
-        
-        if avg_rating is not None:
-            movie = movie_map[movie_id]
-            movie.avg_rating = avg_rating
-            movie.save()
-            print(f"Updated movie {movie.id} with new average rating: {avg_rating}")
+    updated = []
+    with transaction.atomic():
+        for movie_id in movie_map.keys():
+            avg_rating = WatchHistory.objects.filter(movie__id=movie_id).aggregate(average_rating=Avg('rating'))['average_rating']
+
+            if avg_rating is not None:
+                movie = movie_map[movie_id]
+                movie.avg_rating = avg_rating
+                movie.save()
+                updated.append(movie.id)
+                print(f"Updated movie {movie.id} with new average rating: {avg_rating}")
+        # avg_rating is on the Movie node and in the vector payload, so both are synced after commit
+        publish_movies_changed(updated)
 
     print("Finished updating movie average ratings.")
-
-graph_recommender.close()
@@ -8,7 +8,9 @@ from .serializers import (
     GenreSerializer, MovieSerializer, ShowMovieSerializer,
     ActorSerializer, DirectorSerializer
 )
-from recommender.recommender import VectorRecommender, MovieGraphRecommender
+from recommender.recommender import VectorRecommender
+from recommender.outbox import publish_movie_changed
+from django.db import transaction
 from datetime import datetime, timedelta
 import random
 import requests
@@ -30,8 +32,6 @@ class AddMovieByIMDBView(APIView):
         if not imdb_url:
             return Response({'error': 'IMDb URL is required.'}, status=status.HTTP_400_BAD_REQUEST)
 
-        graph_recommender = MovieGraphRecommender()
-        vector_recommender = VectorRecommender()
         api_url = 'http://www.omdbapi.com/'
         api_key = 'a475ded9'
 
@@ -39,42 +39,32 @@ class AddMovieByIMDBView(APIView):
             imdb_id = self.extract_imdb_id(imdb_url)
             movie_data = self.fetch_movie_data(api_url, api_key, imdb_id)
 
-            # Create or get the movie instance
-            movie, created = Movie.objects.get_or_create(
-                imdb_id=imdb_id,
-                defaults={
-                    'title': movie_data['Title'],
-                    'release_year': int(movie_data.get('Year')),
-                    'duration': self.parse_runtime(movie_data.get('Runtime', '0')),
-                    'synopsis': movie_data['Plot'],
-                    'poster_url': movie_data['Poster']
-                }
-            )
-
-            movie.save()
-
-            movie = Movie.objects.get(imdb_id=imdb_id)
-
-            genres_list = movie_data['Genre'].split(', ')
-            genre_instances = []
-            for genre_name in genres_list:
-                genre, created = Genre.objects.get_or_create(name=genre_name.strip())
-                genre_instances.append(genre)
-
-            movie.genres.set(genre_instances)
-
-            graph_recommender.create_movie(
-                movie.id, movie.title, movie.release_year,
-                movie.synopsis, movie.duration, movie.poster_url, genres_list
-            )                        
-
-            message = f"Movie '{movie.title}' was successfully added." if created else f"Movie '{movie.title}' already exists in the database."
-
-            movie = self.load_actors_and_directors(movie, movie_data, graph_recommender)                   
-            movie.save()
-            
-            doc = self.prepare_vector_doc(movie)
-            vector_recommender.add_vector('movies', movie.id, doc)
+            # Neo4j and the vector store are updated by the outbox dispatcher once this commits
+            with transaction.atomic():
+                # Create or get the movie instance
+                movie, created = Movie.objects.get_or_create(
+                    imdb_id=imdb_id,
+                    defaults={
+                        'title': movie_data['Title'],
+                        'release_year': int(movie_data.get('Year')),
+                        'duration': self.parse_runtime(movie_data.get('Runtime', '0')),
+                        'synopsis': movie_data['Plot'],
+                        'poster_url': movie_data['Poster']
+                    }
+                )
+
+                genres_list = movie_data['Genre'].split(', ')
+                genre_instances = []
+                for genre_name in genres_list:
+                    genre, _ = Genre.objects.get_or_create(name=genre_name.strip())
+                    genre_instances.append(genre)
+
+                movie.genres.set(genre_instances)
+
+                message = f"Movie '{movie.title}' was successfully added." if created else f"Movie '{movie.title}' already exists in the database."
+
+                movie = self.load_actors_and_directors(movie, movie_data)
+                publish_movie_changed(movie.id)
 
             return Response({
                 'success': True,
@@ -85,10 +75,6 @@ class AddMovieByIMDBView(APIView):
         except Exception as e:
             return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
-        finally:
-            graph_recommender.close()
-            vector_recommender.close()
-
     # Utility methods
 
     def extract_imdb_id(self, imdb_url):
@@ -112,19 +98,6 @@ class AddMovieByIMDBView(APIView):
         except (ValueError, IndexError):
             return 0
 
-    def prepare_vector_doc(self, movie):
-        return {
-            'title': movie.title,
-            'plot': movie.synopsis,
-            'id': movie.id,
-            'release_year': movie.release_year,
-            'imdbId': movie.imdb_id,
-            'poster_url': movie.poster_url,
-            'duration': movie.duration,
-            'genres': [genre.name for genre in movie.genres.all()],
-            'avg_rating': movie.avg_rating
-        }
-
     def serialize_movie(self, movie):
         return {
             'title': movie.title,
@@ -136,29 +109,21 @@ class AddMovieByIMDBView(APIView):
         }
 
     @staticmethod
-    def load_actors_and_directors(movie, movie_data, graph_recommender):
+    def load_actors_and_directors(movie, movie_data):
         """
-        Load actors and directors, ensuring they're properly linked to the movie in both the Django and Neo4j models.
+        Load actors and directors and link them to the movie; the graph picks the credits up from the outbox.
         """
         # Load actors
         actors_data = movie_data.get('Actors', '')
         if actors_data:
             actor_instances = AddMovieByIMDBView.create_person_instances(actors_data.split(', '), Actor)
             movie.actors.set(actor_instances)  
-            # Create actor relationships in graph db
-            for actor in actor_instances:
-                graph_recommender.create_actor(actor.id, actor.first_name, actor.last_name, actor.birth_year)
-                graph_recommender.create_acts_relationship(actor.id, movie.id)
 
         # Load directors
         directors_data = movie_data.get('Director', '')
         if directors_data:
             director_instances = AddMovieByIMDBView.create_person_instances(directors_data.split(', '), Director)
-            movie.directors.set(director_instances)  # Use .add() to append directors without replacing existing ones
-            # Create director relationships in graph db
-            for director in director_instances:
-                graph_recommender.create_director(director.id, director.first_name, director.last_name, director.birth_year)
-                graph_recommender.create_directs_relationship(director.id, movie.id)
+            movie.directors.set(director_instances)
 
         return movie
 
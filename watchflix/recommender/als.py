@@ -0,0 +1,216 @@
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from accounts.models import UserProfile
+from .item_knn import build_rating_matrix, recommendation_rows, user_watch_ratings
+from .utils import bundle_mtime, load_array_bundle, save_array_bundle
+
+logger = logging.getLogger(__name__)
+
+ALS_FEEDBACK_MODES = ('implicit', 'explicit')
+MODEL_ARRAYS = ('user_ids', 'item_ids', 'user_factors', 'item_factors', 'item_popularity')
+
+
+def _normal_equations(columns, values, fixed, gram, regularization, alpha, feedback):
+    """
+    Left- and right-hand side of one row's least-squares problem against the
+    fixed factors.
+
+    Implicit feedback follows Hu, Koren & Volinsky: every cell is a preference
+    of 0 or 1 with confidence 1 + alpha * rating, and the unobserved cells are
+    folded into the shared Gram matrix. Explicit feedback fits the observed
+    ratings only, with the regularization scaled by the row's count (ALS-WR).
+    """
+    eye = np.eye(fixed.shape[1], dtype=np.float32)
+    observed = fixed[columns]
+    if feedback == 'implicit':
+        confidence = 1.0 + alpha * values
+        return gram + (observed.T * (confidence - 1.0)) @ observed + regularization * eye, observed.T @ confidence
+    return observed.T @ observed + regularization * max(len(columns), 1) * eye, observed.T @ values
+
+
+def _solve_rows(matrix, fixed, gram, regularization, alpha, feedback, start, stop, out):
+    """Solve rows start..stop of a CSR matrix in one batched call, writing into out[start:stop]."""
+    factors = fixed.shape[1]
+    lhs = np.empty((stop - start, factors, factors), dtype=np.float32)
+    rhs = np.empty((stop - start, factors), dtype=np.float32)
+    for offset, row in enumerate(range(start, stop)):
+        row_slice = slice(matrix.indptr[row], matrix.indptr[row + 1])
+        lhs[offset], rhs[offset] = _normal_equations(
+            matrix.indices[row_slice], matrix.data[row_slice], fixed, gram, regularization, alpha, feedback
+        )
+    out[start:stop] = np.linalg.solve(lhs, rhs[..., np.newaxis])[..., 0]
+
+
+def als_fit(matrix, factors, regularization, iterations, alpha=40.0, feedback='implicit',
+            threads=None, block_size=1024, seed=0):
+    """
+    Factorise a CSR user x item matrix with alternating least squares.
+
+    Each half-step solves independent blocks of rows on a thread pool; NumPy
+    releases the GIL inside the matmuls and solves, so the blocks run in parallel.
+    Returns (user_factors, item_factors, seconds per iteration).
+    """
+    if feedback not in ALS_FEEDBACK_MODES:
+        raise ImproperlyConfigured(f"Unknown ALS feedback mode '{feedback}'; expected one of {ALS_FEEDBACK_MODES}.")
+
+    rng = np.random.default_rng(seed)
+    n_users, n_items = matrix.shape
+    user_factors = (rng.standard_normal((n_users, factors)) * 0.01).astype(np.float32)
+    item_factors = (rng.standard_normal((n_items, factors)) * 0.01).astype(np.float32)
+    by_user = matrix.tocsr().astype(np.float32)
+    by_item = by_user.T.tocsr()
+
+    timings = []
+    with ThreadPoolExecutor(max_workers=threads or os.cpu_count()) as executor:
+        for iteration in range(iterations):
+            started = time.perf_counter()
+            for rows, fixed, out in ((by_user, item_factors, user_factors), (by_item, user_factors, item_factors)):
+                gram = fixed.T @ fixed
+                blocks = [
+                    executor.submit(
+                        _solve_rows, rows, fixed, gram, regularization, alpha, feedback,
+                        start, min(start + block_size, rows.shape[0]), out,
+                    )
+                    for start in range(0, rows.shape[0], block_size)
+                ]
+                for block in blocks:
+                    block.result()
+
+            timings.append(time.perf_counter() - started)
+            logger.info(f"ALS iteration {iteration + 1}/{iterations} took {timings[-1]:.2f}s.")
+
+    return user_factors, item_factors, timings
+
+
+class AlsModel:
+    """User and item factors, kept sorted by id so lookups are a binary search."""
+
+    def __init__(self, user_ids, item_ids, user_factors, item_factors, item_popularity, meta, mtime=None):
+        self.user_ids = user_ids
+        self.item_ids = item_ids
+        self.user_factors = user_factors
+        self.item_factors = item_factors
+        self.item_popularity = item_popularity
+        self.meta = meta
+        self.mtime = mtime
+        self._item_gram = None
+
+    @classmethod
+    def train(cls, factors=None, regularization=None, iterations=None, alpha=None, feedback=None, threads=None):
+        matrix, user_ids, item_ids = build_rating_matrix()
+        meta = {
+            'factors': factors or settings.ALS_FACTORS,
+            'regularization': regularization if regularization is not None else settings.ALS_REGULARIZATION,
+            'iterations': iterations or settings.ALS_ITERATIONS,
+            'alpha': alpha if alpha is not None else settings.ALS_ALPHA,
+            'feedback': feedback or settings.ALS_FEEDBACK,
+        }
+        user_factors, item_factors, timings = als_fit(
+            matrix, meta['factors'], meta['regularization'], meta['iterations'],
+            alpha=meta['alpha'], feedback=meta['feedback'], threads=threads,
+        )
+        meta.update(built_at=time.time(), iteration_seconds=[round(seconds, 3) for seconds in timings])
+
+        user_order, item_order = np.argsort(user_ids), np.argsort(item_ids)
+        item_popularity = np.diff(matrix.tocsc().indptr).astype(np.int64)
+        return cls(
+            user_ids[user_order], item_ids[item_order], user_factors[user_order], item_factors[item_order],
+            item_popularity[item_order], meta,
+        )
+
+    def save(self, path):
+        save_array_bundle(path, {
+            'user_ids': self.user_ids,
+            'item_ids': self.item_ids,
+            'user_factors': np.ascontiguousarray(self.user_factors, dtype=np.float32),
+            'item_factors': np.ascontiguousarray(self.item_factors, dtype=np.float32),
+            'item_popularity': self.item_popularity,
+        }, self.meta)
+
+    @classmethod
+    def load(cls, path):
+        arrays, meta, mtime = load_array_bundle(path, MODEL_ARRAYS)
+        return cls(meta=meta, mtime=mtime, **arrays)
+
+    def is_stale(self, path):
+        mtime = bundle_mtime(path)
+        return mtime is not None and mtime != self.mtime
+
+    @staticmethod
+    def _positions(ids, wanted):
+        wanted = np.asarray(wanted, dtype=np.int64)
+        positions = np.searchsorted(ids, wanted)
+        found = positions < len(ids)
+        found[found] = ids[positions[found]] == wanted[found]
+        return positions[found], found
+
+    def user_vector(self, user_id, watched):
+        """Stored factors for a trained user; users who joined since are folded in from their history."""
+        positions, found = self._positions(self.user_ids, [user_id])
+        if found[0]:
+            return self.user_factors[positions[0]]
+
+        columns, found = self._positions(self.item_ids, list(watched))
+        if not len(columns):
+            return None
+        ratings = np.asarray(list(watched.values()), dtype=np.float32)[found]
+        if self._item_gram is None:
+            self._item_gram = self.item_factors.T @ self.item_factors
+        lhs, rhs = _normal_equations(
+            columns, ratings, self.item_factors, self._item_gram,
+            self.meta['regularization'], self.meta['alpha'], self.meta['feedback'],
+        )
+        return np.linalg.solve(lhs, rhs)
+
+    def score(self, user_id, watched, limit):
+        """One dot product against the item factors, watched movies masked, top-k by argpartition."""
+        vector = self.user_vector(user_id, watched)
+        if vector is None:
+            return []
+
+        scores = self.item_factors @ vector
+        watched_columns, _ = self._positions(self.item_ids, list(watched))
+        scores[watched_columns] = -np.inf
+        limit = min(limit, len(scores) - len(watched_columns))
+        if limit <= 0:
+            return []
+        top = np.argpartition(-scores, limit - 1)[:limit]
+        top = top[np.argsort(-scores[top], kind='stable')]
+        return [(int(self.item_ids[i]), float(scores[i]), int(self.item_popularity[i])) for i in top]
+
+
+class AlsRecommender:
+    """User-based recommendations from the offline ALS model under ALS_PATH."""
+
+    _model = None
+    _lock = threading.Lock()
+
+    def __init__(self, path=None):
+        self.path = str(path or settings.ALS_PATH)
+
+    def close(self):
+        pass
+
+    def get_model(self):
+        cls = type(self)
+        if cls._model is None or cls._model.is_stale(self.path):
+            with cls._lock:
+                if cls._model is None or cls._model.is_stale(self.path):
+                    if bundle_mtime(self.path) is None:
+                        raise ImproperlyConfigured(f"No ALS model at '{self.path}'; run 'manage.py train_als' first.")
+                    cls._model = AlsModel.load(self.path)
+                    logger.info(f"Loaded ALS model with {len(cls._model.item_ids)} items from {self.path}.")
+        return cls._model
+
+    def recommend_movies_user_based(self, username, limit=100):
+        user_id = UserProfile.objects.filter(user__username=username).values_list('id', flat=True).first()
+        if user_id is None:
+            return []
+        scored = self.get_model().score(user_id, user_watch_ratings(username), limit)
+        return recommendation_rows(scored)
@@ -1,6 +1,30 @@
+import logging
 from django.apps import AppConfig
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
 
 
 class RecommenderConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'recommender'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+
+        if settings.CACHE_L2_BACKEND == 'file':
+            logger.warning(
+                "CACHE_L2_BACKEND is 'file': cache.add is not atomic across workers, so concurrent requests "
+                "may recompute the same recommendations, and every write scans the cache directory. "
+                "Use 'db' or 'redis' in production."
+            )
+
+        # Load the encoder in the master process so forked workers share its weights
+        if not settings.ENCODER_PRELOAD:
+            return
+
+        from .encoder import encoder_registry
+        try:
+            encoder_registry.warm_up()
+        except Exception as e:
+            logger.error(f"Error warming up encoder: {e}")
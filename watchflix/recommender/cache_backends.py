@@ -0,0 +1,221 @@
+import logging
+import pickle
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+logger = logging.getLogger(__name__)
+
+# Pickled values at least this large are zlib-compressed before going to L2
+COMPRESS_MIN_BYTES = 1024
+_RAW, _COMPRESSED = b'p', b'z'
+
+
+def dumps(value):
+    """
+    Compact serialization for L2: pickle, compressed when it pays off, behind a
+    one-byte tag. Integers are stored as-is so L2 can increment them atomically.
+    """
+    if type(value) is int:
+        return value
+    data = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+    if len(data) >= COMPRESS_MIN_BYTES:
+        return _COMPRESSED + zlib.compress(data, 6)
+    return _RAW + data
+
+
+def loads(data):
+    if type(data) is int:
+        return data
+    tag, body = data[:1], data[1:]
+    if tag == _COMPRESSED:
+        body = zlib.decompress(body)
+    return pickle.loads(body)
+
+
+class TierStats:
+    def __init__(self, *names):
+        self._lock = threading.Lock()
+        self._counts = dict.fromkeys(names, 0)
+
+    def add(self, name, count=1):
+        with self._lock:
+            self._counts[name] += count
+
+    def snapshot(self):
+        with self._lock:
+            counts = dict(self._counts)
+        lookups = counts['hits'] + counts['misses']
+        counts['hit_rate'] = counts['hits'] / lookups if lookups else 0
+        return counts
+
+
+class TwoTierCache(BaseCache):
+    """
+    Django cache backend with a small in-process L1 in front of a shared L2.
+
+    L1 is a bounded LRU whose entries live for at most L1_TIMEOUT seconds, so
+    a value another worker changed or deleted in L2 is seen within that window.
+    L2 is any other configured cache alias (file, database or Redis) and is
+    what survives restarts. add/incr/decr go straight to L2, so they are only
+    as atomic as L2 makes them: Redis is atomic across workers, while the file
+    and database backends read and then write. With those, two workers may
+    both win a refresh lock (a duplicate computation) or collapse two
+    generation bumps into one (an entry may stay stale until its TTL).
+
+    OPTIONS: L2_ALIAS, L1_MAX_ENTRIES, L1_TIMEOUT.
+    """
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self.l2_alias = options.get('L2_ALIAS', 'shared')
+        self.l1_max_entries = int(options.get('L1_MAX_ENTRIES', 1000))
+        self.l1_timeout = float(options.get('L1_TIMEOUT', 5))
+        self._l1 = OrderedDict()
+        self._lock = threading.Lock()
+        self.l1_stats = TierStats('hits', 'misses', 'evictions', 'expirations')
+        self.l2_stats = TierStats('hits', 'misses', 'errors')
+
+    @property
+    def l2(self):
+        return caches[self.l2_alias]
+
+    # L1
+
+    def _l1_get(self, key):
+        with self._lock:
+            entry = self._l1.get(key)
+            if entry is None:
+                self.l1_stats.add('misses')
+                return None
+            if entry[0] <= time.monotonic():
+                del self._l1[key]
+                self.l1_stats.add('expirations')
+                self.l1_stats.add('misses')
+                return None
+            self._l1.move_to_end(key)
+        self.l1_stats.add('hits')
+        return entry
+
+    def _l1_set(self, key, value, timeout):
+        lifetime = self.l1_timeout if timeout is None else min(self.l1_timeout, timeout)
+        if lifetime <= 0:
+            self._l1_delete(key)
+            return
+        with self._lock:
+            self._l1[key] = (time.monotonic() + lifetime, value)
+            self._l1.move_to_end(key)
+            while len(self._l1) > self.l1_max_entries:
+                self._l1.popitem(last=False)
+                self.l1_stats.add('evictions')
+
+    def _l1_delete(self, key):
+        with self._lock:
+            self._l1.pop(key, None)
+
+    # L2
+
+    def _l2_call(self, method, *args, default=None, **kwargs):
+        try:
+            return getattr(self.l2, method)(*args, **kwargs)
+        except Exception as e:
+            # A failing L2 degrades to L1-only caching instead of failing the request
+            self.l2_stats.add('errors')
+            logger.error(f"L2 cache '{self.l2_alias}' {method} failed: {e}")
+            return default
+
+    def _timeout(self, timeout):
+        return self.default_timeout if timeout is DEFAULT_TIMEOUT else timeout
+
+    # BaseCache API
+
+    def get(self, key, default=None, version=None):
+        l1_key = self.make_and_validate_key(key, version=version)
+        entry = self._l1_get(l1_key)
+        if entry is not None:
+            return entry[1]
+
+        data = self._l2_call('get', key, version=version)
+        if data is None:
+            self.l2_stats.add('misses')
+            return default
+        self.l2_stats.add('hits')
+        value = loads(data)
+        self._l1_set(l1_key, value, None)
+        return value
+
+    def get_many(self, keys, version=None):
+        results, missing = {}, []
+        for key in keys:
+            entry = self._l1_get(self.make_and_validate_key(key, version=version))
+            if entry is not None:
+                results[key] = entry[1]
+            else:
+                missing.append(key)
+
+        if missing:
+            found = self._l2_call('get_many', missing, version=version, default={})
+            self.l2_stats.add('hits', len(found))
+            self.l2_stats.add('misses', len(missing) - len(found))
+            for key, data in found.items():
+                results[key] = loads(data)
+                self._l1_set(self.make_and_validate_key(key, version=version), results[key], None)
+        return results
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        timeout = self._timeout(timeout)
+        self._l2_call('set', key, dumps(value), timeout=timeout, version=version)
+        self._l1_set(self.make_and_validate_key(key, version=version), value, timeout)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        timeout = self._timeout(timeout)
+        failed = self._l2_call(
+            'set_many', {key: dumps(value) for key, value in data.items()},
+            timeout=timeout, version=version, default=list(data),
+        )
+        for key, value in data.items():
+            self._l1_set(self.make_and_validate_key(key, version=version), value, timeout)
+        return failed or []
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        added = self._l2_call('add', key, dumps(value), timeout=self._timeout(timeout), version=version, default=False)
+        self._l1_delete(self.make_and_validate_key(key, version=version))
+        return added
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        self._l1_delete(self.make_and_validate_key(key, version=version))
+        return self._l2_call('touch', key, timeout=self._timeout(timeout), version=version, default=False)
+
+    def delete(self, key, version=None):
+        self._l1_delete(self.make_and_validate_key(key, version=version))
+        return self._l2_call('delete', key, version=version, default=False)
+
+    def delete_many(self, keys, version=None):
+        for key in keys:
+            self._l1_delete(self.make_and_validate_key(key, version=version))
+        self._l2_call('delete_many', keys, version=version)
+
+    def has_key(self, key, version=None):
+        return self.get(key, version=version) is not None
+
+    def incr(self, key, delta=1, version=None):
+        # Not routed through _l2_call: a missing key must raise ValueError like every backend
+        self._l1_delete(self.make_and_validate_key(key, version=version))
+        return self.l2.incr(key, delta, version=version)
+
+    def clear(self):
+        with self._lock:
+            self._l1.clear()
+        self._l2_call('clear')
+
+    def stats(self):
+        with self._lock:
+            l1_size = len(self._l1)
+        return {
+            'l1': {**self.l1_stats.snapshot(), 'size': l1_size, 'max_entries': self.l1_max_entries},
+            'l2': {**self.l2_stats.snapshot(), 'alias': self.l2_alias},
+        }
@@ -0,0 +1,108 @@
+import atexit
+import os
+import threading
+from django.conf import settings
+from neo4j import GraphDatabase
+from qdrant_client import QdrantClient
+
+_qdrant_client = None
+_qdrant_lock = threading.Lock()
+
+_neo4j_driver = None
+_neo4j_pid = None
+_neo4j_lock = threading.Lock()
+
+
+def get_qdrant_client():
+    """Return the process-wide Qdrant client, creating it on first use."""
+    global _qdrant_client
+    if _qdrant_client is None:
+        with _qdrant_lock:
+            if _qdrant_client is None:
+                _qdrant_client = QdrantClient(url=settings.QDRANT_URI)
+    return _qdrant_client
+
+
+def close_qdrant_client():
+    global _qdrant_client
+    with _qdrant_lock:
+        if _qdrant_client is not None:
+            _qdrant_client.close()
+            _qdrant_client = None
+
+
+class Neo4jPoolStats:
+    """Session counters for the shared Neo4j driver."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.sessions_opened = 0
+        self.active_sessions = 0
+        self.max_active_sessions = 0
+
+    def session_opened(self):
+        with self._lock:
+            self.sessions_opened += 1
+            self.active_sessions += 1
+            self.max_active_sessions = max(self.max_active_sessions, self.active_sessions)
+
+    def session_closed(self):
+        with self._lock:
+            self.active_sessions -= 1
+
+
+neo4j_pool_stats = Neo4jPoolStats()
+
+
+def get_neo4j_driver():
+    """
+    Return the process-wide Neo4j driver, creating it on first use.
+
+    The driver owns a connection pool, so it must not be shared across a
+    fork; a forked worker gets its own driver the first time it asks.
+    """
+    global _neo4j_driver, _neo4j_pid
+    if _neo4j_driver is None or _neo4j_pid != os.getpid():
+        with _neo4j_lock:
+            if _neo4j_driver is None or _neo4j_pid != os.getpid():
+                _neo4j_driver = GraphDatabase.driver(
+                    settings.NEO4J_URI,
+                    auth=(settings.NEO4J_USER, settings.NEO4J_PASSWORD),
+                    max_connection_pool_size=settings.NEO4J_MAX_CONNECTION_POOL_SIZE,
+                    connection_acquisition_timeout=settings.NEO4J_CONNECTION_ACQUISITION_TIMEOUT,
+                    max_connection_lifetime=settings.NEO4J_MAX_CONNECTION_LIFETIME,
+                )
+                _neo4j_pid = os.getpid()
+    return _neo4j_driver
+
+
+def close_neo4j_driver():
+    global _neo4j_driver
+    with _neo4j_lock:
+        if _neo4j_driver is not None and _neo4j_pid == os.getpid():
+            _neo4j_driver.close()
+        _neo4j_driver = None
+
+
+def neo4j_pool_metrics():
+    metrics = {
+        'max_pool_size': settings.NEO4J_MAX_CONNECTION_POOL_SIZE,
+        'sessions_opened': neo4j_pool_stats.sessions_opened,
+        'active_sessions': neo4j_pool_stats.active_sessions,
+        'max_active_sessions': neo4j_pool_stats.max_active_sessions,
+    }
+    if _neo4j_driver is not None and _neo4j_pid == os.getpid():
+        # The driver has no public pool API; read the pool's connection lists directly
+        try:
+            pool = _neo4j_driver._pool
+            with pool.lock:
+                connections = [connection for queue in pool.connections.values() for connection in queue]
+            metrics['open_connections'] = len(connections)
+            metrics['in_use_connections'] = sum(1 for connection in connections if connection.in_use)
+        except AttributeError:
+            pass
+    return metrics
+
+
+atexit.register(close_qdrant_client)
+atexit.register(close_neo4j_driver)
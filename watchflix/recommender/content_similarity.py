@@ -0,0 +1,120 @@
+import logging
+import time
+import numpy as np
+from django.conf import settings
+from movies.models import Actor, Director, Movie
+from .item_knn import _sparse, build_item_similarity
+from .utils import chunked
+
+logger = logging.getLogger(__name__)
+
+# (feature group, through table, column holding the feature id)
+CONTENT_FEATURES = (
+    ('genre', Movie.genres.through, 'genre_id'),
+    ('actor', Actor.movies.through, 'actor_id'),
+    ('director', Director.movies.through, 'director_id'),
+)
+
+
+def build_content_incidence(weights):
+    """
+    CSR feature x movie incidence matrix of genres, actors and directors, with
+    the movie ids of its columns.
+
+    Each cell is the feature group's weight times the feature's inverse
+    document frequency, so sharing a director counts for more than sharing a
+    genre, and sharing a rare genre more than sharing "Drama".
+    """
+    sparse = _sparse()
+    movie_ids = np.fromiter(Movie.objects.order_by('id').values_list('id', flat=True), dtype=np.int64)
+    column_by_id = {int(movie_id): column for column, movie_id in enumerate(movie_ids)}
+
+    rows, columns, values = [], [], []
+    offset = 0
+    for group, through, feature_field in CONTENT_FEATURES:
+        pairs = through.objects.order_by().values_list(feature_field, 'movie_id')
+        feature_rows = {}
+        group_rows, group_columns = [], []
+        for feature_id, movie_id in pairs.iterator(chunk_size=10000):
+            group_rows.append(offset + feature_rows.setdefault(feature_id, len(feature_rows)))
+            group_columns.append(column_by_id[movie_id])
+
+        group_rows = np.asarray(group_rows, dtype=np.int32)
+        frequency = np.bincount(group_rows - offset, minlength=len(feature_rows))
+        idf = np.log(max(len(movie_ids), 1) / np.maximum(frequency, 1)) + 1.0
+        rows.append(group_rows)
+        columns.append(np.asarray(group_columns, dtype=np.int32))
+        values.append((weights[group] * idf[group_rows - offset]).astype(np.float32))
+        offset += len(feature_rows)
+
+    matrix = sparse.csr_matrix(
+        (np.concatenate(values), (np.concatenate(rows), np.concatenate(columns))),
+        shape=(offset, len(movie_ids)),
+    )
+    return matrix, movie_ids
+
+
+class ContentSimilarityJob:
+    """
+    Materialises each movie's top-N content neighbours as
+    (:Movie)-[:CONTENT_SIMILAR {score}]->(:Movie) edges.
+
+    The score is the cosine similarity of the two movies' weighted genre, actor
+    and director vectors. Every run rebuilds all edges: adding one movie can
+    change anyone's top N.
+    """
+
+    write_query = """
+    UNWIND $rows AS row
+    MATCH (m:Movie {id: row.movie_id})
+    CALL {
+        WITH m
+        MATCH (m)-[old:CONTENT_SIMILAR]->()
+        DELETE old
+    }
+    WITH m, row
+    UNWIND row.neighbors AS neighbor
+    MATCH (other:Movie {id: neighbor.id})
+    CREATE (m)-[:CONTENT_SIMILAR {score: neighbor.score}]->(other)
+    """
+
+    def __init__(self, recommender, top_n=None, weights=None, batch_size=500):
+        self.recommender = recommender
+        self.top_n = top_n or settings.CONTENT_SIMILARITY_TOP_N
+        self.weights = weights or settings.CONTENT_SIMILARITY_WEIGHTS
+        self.batch_size = batch_size
+
+    def compute(self):
+        """{movie_id: [(neighbour_id, score), ...]} best first."""
+        incidence, movie_ids = build_content_incidence(self.weights)
+        similarity = build_item_similarity(incidence, self.top_n)
+
+        neighbors = {}
+        for column, movie_id in enumerate(movie_ids):
+            row = slice(similarity.indptr[column], similarity.indptr[column + 1])
+            columns, scores = similarity.indices[row], similarity.data[row]
+            order = np.lexsort((movie_ids[columns], -scores))
+            neighbors[int(movie_id)] = [
+                (int(movie_ids[columns[i]]), round(float(scores[i]), 6)) for i in order if scores[i] > 0
+            ]
+        return neighbors
+
+    def run(self):
+        started = time.perf_counter()
+        neighbors = self.compute()
+        computed = time.perf_counter() - started
+
+        for batch in chunked(list(neighbors.items()), self.batch_size):
+            rows = [
+                {'movie_id': movie_id, 'neighbors': [{'id': other_id, 'score': score} for other_id, score in movie_neighbors]}
+                for movie_id, movie_neighbors in batch
+            ]
+            self.recommender._execute_write(self.recommender._run_query, self.write_query, rows=rows)
+
+        edges = sum(len(movie_neighbors) for movie_neighbors in neighbors.values())
+        elapsed = time.perf_counter() - started
+        logger.info(
+            f"Wrote {edges} CONTENT_SIMILAR edges for {len(neighbors)} movies "
+            f"(computed in {computed:.1f}s, {elapsed:.1f}s total)."
+        )
+        return {'movies': len(neighbors), 'edges': edges, 'seconds': round(elapsed, 3)}
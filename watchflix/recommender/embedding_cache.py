@@ -0,0 +1,92 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+
+
+def normalize_query(text):
+    return " ".join(text.lower().split())
+
+
+class QueryEmbeddingCache:
+    """
+    Bounded LRU cache of query embeddings keyed by normalized query text.
+
+    Misses in the in-process LRU fall through to the Django cache when
+    QUERY_EMBEDDING_CACHE_SHARED is enabled, so workers can share vectors.
+    """
+
+    def __init__(self, max_size=None, ttl=None, shared=None):
+        self.max_size = max_size if max_size is not None else settings.QUERY_EMBEDDING_CACHE_SIZE
+        self.ttl = ttl if ttl is not None else settings.QUERY_EMBEDDING_CACHE_TTL
+        self.shared = shared if shared is not None else settings.QUERY_EMBEDDING_CACHE_SHARED
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+
+    def _shared_key(self, key):
+        digest = hashlib.sha1(key.encode('utf-8')).hexdigest()
+        return f"query_embedding_{settings.ENCODER_MODEL_NAME}_{digest}"
+
+    def _get_local(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            vector, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return vector
+
+    def _set_local(self, key, vector):
+        with self._lock:
+            self._entries[key] = (vector, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def get_or_compute(self, text, compute):
+        key = normalize_query(text)
+
+        vector = self._get_local(key)
+        if vector is not None:
+            self.hits += 1
+            return vector
+
+        if self.shared:
+            stored = cache.get(self._shared_key(key))
+            if stored is not None:
+                vector = np.frombuffer(stored, dtype=np.float32)
+                self._set_local(key, vector)
+                self.shared_hits += 1
+                return vector
+
+        self.misses += 1
+        vector = np.asarray(compute(key), dtype=np.float32)
+        self._set_local(key, vector)
+        if self.shared:
+            cache.set(self._shared_key(key), vector.tobytes(), timeout=self.ttl)
+        return vector
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        return {
+            'size': len(self._entries),
+            'max_size': self.max_size,
+            'hits': self.hits,
+            'shared_hits': self.shared_hits,
+            'misses': self.misses,
+        }
+
+
+query_embedding_cache = QueryEmbeddingCache()
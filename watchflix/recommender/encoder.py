@@ -0,0 +1,172 @@
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from sentence_transformers import SentenceTransformer
+
+logger = logging.getLogger(__name__)
+
+
+ENCODER_INFERENCE_MODES = ('fp32', 'onnx-int8')
+
+
+def load_encoder(model_name, mode=None):
+    """Load an encoder in the given inference mode (defaults to ENCODER_INFERENCE_MODE)."""
+    mode = mode or settings.ENCODER_INFERENCE_MODE
+    if mode == 'fp32':
+        return SentenceTransformer(model_name, device="cpu")
+    if mode == 'onnx-int8':
+        from .onnx_encoder import OnnxEncoder
+        return OnnxEncoder(model_name)
+    raise ImproperlyConfigured(f"Unknown ENCODER_INFERENCE_MODE '{mode}', expected one of {ENCODER_INFERENCE_MODES}.")
+
+
+class EncoderRegistry:
+    """
+    Process-wide registry of sentence encoders.
+
+    Each model is loaded at most once per process and shared by every thread.
+    SentenceTransformer.encode does not mutate the model, so a loaded encoder
+    can be used concurrently without extra locking.
+    """
+
+    def __init__(self):
+        self._encoders = {}
+        self._batching_encoders = {}
+        self._lock = threading.Lock()
+
+    def get(self, model_name=None):
+        model_name = model_name or settings.ENCODER_MODEL_NAME
+        encoder = self._encoders.get(model_name)
+        if encoder is not None:
+            return encoder
+
+        with self._lock:
+            encoder = self._encoders.get(model_name)
+            if encoder is None:
+                logger.info(f"Loading encoder '{model_name}'...")
+                encoder = load_encoder(model_name)
+                self._encoders[model_name] = encoder
+                logger.info(f"Encoder '{model_name}' loaded.")
+        return encoder
+
+    def get_batching(self, model_name=None):
+        model_name = model_name or settings.ENCODER_MODEL_NAME
+        encoder = self._batching_encoders.get(model_name)
+        if encoder is None:
+            model = self.get(model_name)
+            with self._lock:
+                encoder = self._batching_encoders.setdefault(model_name, BatchingEncoder(model))
+        return encoder
+
+    def warm_up(self, model_name=None):
+        # Run one encode so lazy initialisation happens before the first request
+        encoder = self.get(model_name)
+        encoder.encode("warm up", show_progress_bar=False)
+        return encoder
+
+    def is_ready(self, model_name=None):
+        return (model_name or settings.ENCODER_MODEL_NAME) in self._encoders
+
+    def batching_stats(self, model_name=None):
+        encoder = self._batching_encoders.get(model_name or settings.ENCODER_MODEL_NAME)
+        return encoder.stats() if encoder is not None else None
+
+
+class BatchingEncoder:
+    """
+    Wraps an encoder so concurrent single-text encode calls share one forward pass.
+
+    Callers are queued and a worker thread encodes them together once
+    ENCODER_MAX_BATCH_SIZE requests are waiting or ENCODER_MAX_WAIT_MS has
+    passed since the first one arrived. Lists of texts bypass the queue.
+    """
+
+    HISTOGRAM_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128)
+
+    def __init__(self, encoder, max_batch_size=None, max_wait_ms=None):
+        self.encoder = encoder
+        self.max_batch_size = max_batch_size or settings.ENCODER_MAX_BATCH_SIZE
+        self.max_wait = (max_wait_ms if max_wait_ms is not None else settings.ENCODER_MAX_WAIT_MS) / 1000
+        self._queue = None
+        self._pid = None
+        self._start_lock = threading.Lock()
+        self.batches = 0
+        self.max_queue_depth = 0
+        self.batch_size_histogram = {bucket: 0 for bucket in self.HISTOGRAM_BUCKETS}
+
+    def get_sentence_embedding_dimension(self):
+        return self.encoder.get_sentence_embedding_dimension()
+
+    def encode(self, sentences, **kwargs):
+        if not isinstance(sentences, str):
+            return self.encoder.encode(sentences, **kwargs)
+
+        future = Future()
+        requests = self._get_queue()
+        requests.put((sentences, future))
+        self.max_queue_depth = max(self.max_queue_depth, requests.qsize())
+        return future.result()
+
+    def _get_queue(self):
+        # Threads do not survive fork, so each worker process starts its own
+        if self._pid != os.getpid():
+            with self._start_lock:
+                if self._pid != os.getpid():
+                    self._queue = queue.Queue()
+                    threading.Thread(target=self._run, args=(self._queue,), daemon=True).start()
+                    self._pid = os.getpid()
+        return self._queue
+
+    def _collect(self, requests):
+        batch = [requests.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(requests.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self, requests):
+        while True:
+            batch = self._collect(requests)
+            try:
+                vectors = self.encoder.encode(
+                    [text for text, _ in batch], batch_size=len(batch), show_progress_bar=False
+                )
+                for (_, future), vector in zip(batch, vectors):
+                    future.set_result(vector)
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+            self._record(len(batch))
+
+    def _record(self, batch_size):
+        self.batches += 1
+        bucket = next((b for b in self.HISTOGRAM_BUCKETS if batch_size <= b), self.HISTOGRAM_BUCKETS[-1])
+        self.batch_size_histogram[bucket] += 1
+
+    def stats(self):
+        return {
+            'queue_depth': self._queue.qsize() if self._queue is not None else 0,
+            'max_queue_depth': self.max_queue_depth,
+            'batches': self.batches,
+            'batch_size_histogram': {f"<={bucket}": count for bucket, count in self.batch_size_histogram.items()},
+        }
+
+
+encoder_registry = EncoderRegistry()
+
+
+def get_encoder(model_name=None):
+    if settings.ENCODER_MICRO_BATCHING:
+        return encoder_registry.get_batching(model_name)
+    return encoder_registry.get(model_name)
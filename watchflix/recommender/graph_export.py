@@ -0,0 +1,204 @@
+import csv
+import gzip
+import logging
+import subprocess
+import time
+from pathlib import Path
+from django.conf import settings
+from .graph_loader import GraphBulkLoader
+from .models import MovieSimilarityState
+
+logger = logging.getLogger(__name__)
+
+# Cypher conversions for the typed header columns, used by LOAD CSV
+CSV_TYPE_CONVERSIONS = {
+    'string': '{}',
+    'long': 'toInteger({})',
+    'float': 'toFloat({})',
+    'date': 'date({})',
+}
+
+
+class NodeFile:
+    def __init__(self, name, label, key, key_type, properties):
+        self.name = name
+        self.label = label
+        # Property the node is looked up by; also the neo4j-admin ID space
+        self.key = key
+        self.key_type = key_type
+        # (property, type) pairs besides the key
+        self.properties = properties
+
+    def header(self):
+        columns = [f':ID({self.label})', f'{self.key}:{self.key_type}']
+        columns += [f'{name}:{type_}' for name, type_ in self.properties]
+        return columns + [':LABEL']
+
+    def values(self, row):
+        return [row[self.key], row[self.key]] + [row[name] for name, _ in self.properties] + [self.label]
+
+    def load_csv_query(self, url_param, batch_size):
+        key = _convert(self.key_type, f'row.`{self.key}:{self.key_type}`')
+        assignments = ', '.join(
+            f"n.{name} = {_convert(type_, f'row.`{name}:{type_}`')}" for name, type_ in self.properties
+        )
+        set_clause = f"SET {assignments}" if assignments else ''
+        return f"""
+        LOAD CSV WITH HEADERS FROM ${url_param} AS row
+        CALL {{
+            WITH row
+            MERGE (n:{self.label} {{{self.key}: {key}}})
+            {set_clause}
+        }} IN TRANSACTIONS OF {batch_size} ROWS
+        """
+
+
+class RelationshipFile:
+    def __init__(self, name, type_, start, end, properties=()):
+        self.name = name
+        self.type = type_
+        # (label, row key) of the start and end nodes
+        self.start = start
+        self.end = end
+        self.properties = properties
+
+    def header(self):
+        columns = [f':START_ID({self.start[0]})', f':END_ID({self.end[0]})']
+        columns += [f'{name}:{type_}' for name, type_ in self.properties]
+        return columns + [':TYPE']
+
+    def values(self, row):
+        return [row[self.start[1]], row[self.end[1]]] + [row[name] for name, _ in self.properties] + [self.type]
+
+    def load_csv_query(self, url_param, batch_size, nodes):
+        start, end = nodes[self.start[0]], nodes[self.end[0]]
+        start_key = _convert(start.key_type, f'row.`:START_ID({start.label})`')
+        end_key = _convert(end.key_type, f'row.`:END_ID({end.label})`')
+        assignments = ', '.join(
+            f"{name}: {_convert(type_, f'row.`{name}:{type_}`')}" for name, type_ in self.properties
+        )
+        properties = f" {{{assignments}}}" if assignments else ''
+        return f"""
+        LOAD CSV WITH HEADERS FROM ${url_param} AS row
+        CALL {{
+            WITH row
+            MATCH (a:{start.label} {{{start.key}: {start_key}}}), (b:{end.label} {{{end.key}: {end_key}}})
+            CREATE (a)-[:{self.type}{properties}]->(b)
+        }} IN TRANSACTIONS OF {batch_size} ROWS
+        """
+
+
+def _convert(type_, expression):
+    return CSV_TYPE_CONVERSIONS[type_].format(expression)
+
+
+def _csv_field(value):
+    # Strings are always quoted so synopses with commas/newlines survive. None is written as an
+    # unquoted empty field, which both importers read as null; a quoted "" would be an empty string.
+    if value is None:
+        return ''
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return repr(value)
+    return '"' + str(value).replace('"', '""') + '"'
+
+
+# Same graph as GraphBulkLoader builds; phase names double as file names
+GRAPH_CSV_FILES = (
+    NodeFile('movies', 'Movie', 'id', 'long', (
+        ('title', 'string'), ('release_year', 'long'), ('synopsis', 'string'),
+        ('duration', 'long'), ('poster_url', 'string'), ('avg_rating', 'float'),
+    )),
+    NodeFile('genres', 'Genre', 'name', 'string', ()),
+    NodeFile('actors', 'Actor', 'id', 'long', (
+        ('first_name', 'string'), ('last_name', 'string'), ('birth_year', 'long'),
+    )),
+    NodeFile('directors', 'Director', 'id', 'long', (
+        ('first_name', 'string'), ('last_name', 'string'), ('birth_year', 'long'),
+    )),
+    NodeFile('users', 'User', 'id', 'long', (('username', 'string'), ('date_of_birth', 'date'))),
+    RelationshipFile('belongs', 'BELONGS', ('Movie', 'movie_id'), ('Genre', 'genre_name')),
+    RelationshipFile('acts', 'ACTS', ('Actor', 'actor_id'), ('Movie', 'movie_id')),
+    RelationshipFile('directs', 'DIRECTS', ('Director', 'director_id'), ('Movie', 'movie_id')),
+    RelationshipFile('watched', 'WATCHED', ('User', 'user_id'), ('Movie', 'movie_id'), (('rating', 'float'),)),
+    RelationshipFile('follows_actors', 'FOLLOWS', ('User', 'user_id'), ('Actor', 'person_id')),
+    RelationshipFile('follows_directors', 'FOLLOWS', ('User', 'user_id'), ('Director', 'person_id')),
+)
+
+
+class GraphCsvExporter:
+    """
+    Streams the graph out of the Django database into header-typed CSV files
+    that `neo4j-admin database import full` and LOAD CSV can both read.
+    """
+
+    def __init__(self, output_dir, compress=False, batch_size=None):
+        self.output_dir = Path(output_dir)
+        self.compress = compress
+        self.batch_size = batch_size or settings.NEO4J_BULK_BATCH_SIZE
+        self.loader = GraphBulkLoader(recommender=None, batch_size=self.batch_size)
+        self.files = GRAPH_CSV_FILES
+
+    def path(self, spec):
+        return self.output_dir / (f'{spec.name}.csv.gz' if self.compress else f'{spec.name}.csv')
+
+    def export(self):
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        phases = {phase: rows for phase, rows, _ in self.loader.phases()}
+        return {spec.name: self._write_file(spec, phases[spec.name]) for spec in self.files}
+
+    def _write_file(self, spec, rows):
+        started = time.perf_counter()
+        total = 0
+        opener = gzip.open if self.compress else open
+        with opener(self.path(spec), 'wt', newline='', encoding='utf-8') as f:
+            csv.writer(f).writerow(spec.header())
+            for row in rows:
+                f.write(','.join(_csv_field(value) for value in spec.values(row)) + '\r\n')
+                total += 1
+
+        elapsed = time.perf_counter() - started
+        logger.info(f"Exported {total} {spec.name} rows to {self.path(spec)} in {elapsed:.1f}s.")
+        return {'rows': total, 'path': str(self.path(spec)), 'seconds': round(elapsed, 3)}
+
+    def admin_import_command(self, database, neo4j_admin=None):
+        """neo4j-admin invocation for an offline import into a stopped (or new) database."""
+        command = [
+            neo4j_admin or settings.NEO4J_ADMIN_PATH, 'database', 'import', 'full',
+            '--overwrite-destination=true', '--multiline-fields=true',
+        ]
+        for spec in self.files:
+            option = '--nodes' if isinstance(spec, NodeFile) else '--relationships'
+            command.append(f'{option}={self.path(spec).resolve()}')
+        command.append(database)
+        return command
+
+    def run_admin_import(self, database, neo4j_admin=None):
+        command = self.admin_import_command(database, neo4j_admin)
+        logger.info(f"Running {' '.join(command)}")
+        subprocess.run(command, check=True)
+        MovieSimilarityState.objects.all().delete()
+
+    def run_load_csv(self, recommender, url_prefix=None):
+        """
+        Import through LOAD CSV on a running database. The files must be in the
+        server's import directory, reachable under NEO4J_IMPORT_URL_PREFIX.
+        """
+        url_prefix = url_prefix or settings.NEO4J_IMPORT_URL_PREFIX
+        nodes = {spec.label: spec for spec in self.files if isinstance(spec, NodeFile)}
+        stats = {}
+        GraphBulkLoader(recommender, self.batch_size).delete_all()
+        for spec in self.files:
+            url = url_prefix.rstrip('/') + '/' + self.path(spec).name
+            if isinstance(spec, NodeFile):
+                query = spec.load_csv_query('url', self.batch_size)
+            else:
+                query = spec.load_csv_query('url', self.batch_size, nodes)
+
+            started = time.perf_counter()
+            # CALL ... IN TRANSACTIONS only runs in an auto-commit transaction
+            with recommender._session() as session:
+                session.run(query, url=url).consume()
+            elapsed = time.perf_counter() - started
+            logger.info(f"Imported {url} in {elapsed:.1f}s.")
+            stats[spec.name] = {'seconds': round(elapsed, 3)}
+        return stats
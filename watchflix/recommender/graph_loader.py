@@ -0,0 +1,195 @@
+import itertools
+import logging
+import time
+from django.conf import settings
+from accounts.models import UserProfile
+from movies.models import Actor, Director, Genre, Movie
+from watch_history.models import WatchHistory
+from .models import MovieSimilarityState
+from .utils import chunked
+
+logger = logging.getLogger(__name__)
+
+
+class GraphBulkLoader:
+    """
+    Full graph rebuild from the Django database using batched UNWIND writes.
+
+    Each phase streams one node label or relationship type out of the ORM and
+    writes it in transactions of NEO4J_BULK_BATCH_SIZE rows.
+    """
+
+    def __init__(self, recommender, batch_size=None):
+        self.recommender = recommender
+        self.batch_size = batch_size or settings.NEO4J_BULK_BATCH_SIZE
+
+    def run(self, progress=None, resume=None):
+        """
+        Rebuild the graph. `progress(phase, rows_written, checkpoint)` is called
+        after every batch. Passing the last checkpoint as `resume` continues an
+        interrupted rebuild from that batch instead of wiping the graph again;
+        every phase merges, so rewriting the batch in flight at the
+        interruption does not duplicate anything.
+        """
+        stats = {}
+        if resume is None:
+            self.delete_all()
+        resumed = False
+        for phase, rows, query in self.phases():
+            offset = 0
+            if resume is not None and not resumed:
+                if phase != resume['phase']:
+                    continue
+                resumed = True
+                offset = resume['offset']
+                rows = itertools.islice(rows, offset, None)
+            stats[phase] = self._write_phase(phase, rows, query, progress, offset)
+        return stats
+
+    def row_counts(self):
+        """Rows each phase will write, for progress reporting."""
+        return {
+            'movies': Movie.objects.count(),
+            'genres': Genre.objects.count(),
+            'belongs': Movie.genres.through.objects.count(),
+            'actors': Actor.objects.count(),
+            'directors': Director.objects.count(),
+            'acts': Actor.movies.through.objects.count(),
+            'directs': Director.movies.through.objects.count(),
+            'users': UserProfile.objects.count(),
+            'watched': WatchHistory.objects.count(),
+            'follows_actors': Actor.followers.through.objects.count(),
+            'follows_directors': Director.followers.through.objects.count(),
+        }
+
+    def phases(self):
+        movie_genres = Movie.genres.through.objects.values_list('movie_id', 'genre__name')
+        acts = Actor.movies.through.objects.values_list('actor_id', 'movie_id')
+        directs = Director.movies.through.objects.values_list('director_id', 'movie_id')
+        follows_actors = Actor.followers.through.objects.values_list('userprofile_id', 'actor_id')
+        follows_directors = Director.followers.through.objects.values_list('userprofile_id', 'director_id')
+
+        return [
+            ('movies', self._movies(), """
+                UNWIND $rows AS row
+                MERGE (m:Movie {id: row.id})
+                SET m.title = row.title, m.release_year = row.release_year, m.synopsis = row.synopsis,
+                    m.duration = row.duration, m.poster_url = row.poster_url, m.avg_rating = row.avg_rating
+            """),
+            ('genres', self._rows(Genre.objects.values('name')), """
+                UNWIND $rows AS row
+                MERGE (g:Genre {name: row.name})
+            """),
+            ('belongs', self._pairs(movie_genres, 'movie_id', 'genre_name'), """
+                UNWIND $rows AS row
+                MATCH (m:Movie {id: row.movie_id}), (g:Genre {name: row.genre_name})
+                MERGE (m)-[:BELONGS]->(g)
+            """),
+            ('actors', self._rows(Actor.objects.values('id', 'first_name', 'last_name', 'birth_year')), """
+                UNWIND $rows AS row
+                MERGE (a:Actor {id: row.id})
+                ON CREATE SET a.first_name = row.first_name, a.last_name = row.last_name, a.birth_year = row.birth_year
+            """),
+            ('directors', self._rows(Director.objects.values('id', 'first_name', 'last_name', 'birth_year')), """
+                UNWIND $rows AS row
+                MERGE (d:Director {id: row.id})
+                ON CREATE SET d.first_name = row.first_name, d.last_name = row.last_name, d.birth_year = row.birth_year
+            """),
+            ('acts', self._pairs(acts, 'actor_id', 'movie_id'), """
+                UNWIND $rows AS row
+                MATCH (a:Actor {id: row.actor_id}), (m:Movie {id: row.movie_id})
+                MERGE (a)-[:ACTS]->(m)
+            """),
+            ('directs', self._pairs(directs, 'director_id', 'movie_id'), """
+                UNWIND $rows AS row
+                MATCH (d:Director {id: row.director_id}), (m:Movie {id: row.movie_id})
+                MERGE (d)-[:DIRECTS]->(m)
+            """),
+            ('users', self._users(), """
+                UNWIND $rows AS row
+                MERGE (u:User {id: row.id})
+                SET u.username = row.username, u.date_of_birth = row.date_of_birth
+            """),
+            ('watched', self._watched(), """
+                UNWIND $rows AS row
+                MATCH (u:User {id: row.user_id}), (m:Movie {id: row.movie_id})
+                MERGE (u)-[w:WATCHED]->(m)
+                SET w.rating = row.rating
+            """),
+            ('follows_actors', self._pairs(follows_actors, 'user_id', 'person_id'), """
+                UNWIND $rows AS row
+                MATCH (u:User {id: row.user_id}), (a:Actor {id: row.person_id})
+                MERGE (u)-[:FOLLOWS]->(a)
+            """),
+            ('follows_directors', self._pairs(follows_directors, 'user_id', 'person_id'), """
+                UNWIND $rows AS row
+                MATCH (u:User {id: row.user_id}), (d:Director {id: row.person_id})
+                MERGE (u)-[:FOLLOWS]->(d)
+            """),
+        ]
+
+    def delete_all(self):
+        # Delete in batches so a large graph does not have to fit in one transaction
+        query = """
+        MATCH (n) WHERE NOT n:SchemaMigration
+        WITH n LIMIT $limit
+        DETACH DELETE n
+        RETURN count(*) AS deleted
+        """
+        while True:
+            result = self.recommender._execute_write(self.recommender._run_query, query, limit=self.batch_size)
+            if not result or result[0]['deleted'] == 0:
+                break
+        # SIMILAR edges went with the nodes; the next similarity run recomputes everything
+        MovieSimilarityState.objects.all().delete()
+
+    def _write_phase(self, phase, rows, query, progress=None, offset=0):
+        started = time.perf_counter()
+        total = 0
+        for batch in chunked(rows, self.batch_size):
+            self.recommender._execute_write(self.recommender._run_query, query, rows=batch)
+            total += len(batch)
+            if progress is not None:
+                progress(phase, offset + total, {'phase': phase, 'offset': offset + total})
+
+        elapsed = time.perf_counter() - started
+        rate = total / elapsed if elapsed else 0
+        logger.info(f"Loaded {total} {phase} rows in {elapsed:.1f}s ({rate:.0f} rows/s).")
+        return {'rows': total, 'seconds': round(elapsed, 3), 'rows_per_second': round(rate, 1)}
+
+    def _iterator(self, queryset):
+        return queryset.iterator(chunk_size=self.batch_size)
+
+    # Every phase streams in primary key order, so a resumed run can skip what was already written
+
+    def _rows(self, queryset):
+        return self._iterator(queryset.order_by('pk'))
+
+    def _pairs(self, queryset, first, second):
+        return ({first: a, second: b} for a, b in self._iterator(queryset.order_by('pk')))
+
+    def _movies(self):
+        movies = Movie.objects.order_by('id').values(
+            'id', 'title', 'release_year', 'synopsis', 'duration', 'poster_url', 'avg_rating',
+        )
+        # The follow feed ranks on avg_rating before the similarity job has run; the driver takes no Decimals
+        return (
+            {**movie, 'avg_rating': float(movie['avg_rating']) if movie['avg_rating'] is not None else None}
+            for movie in self._iterator(movies)
+        )
+
+    def _users(self):
+        # Graph users are keyed by UserProfile id, matching WATCHED and FOLLOWS edges. The birth date is
+        # stored as a Neo4j date, as the outbox and the CSV export write it
+        profiles = UserProfile.objects.order_by('id').values_list('id', 'user__username', 'birth_date')
+        return (
+            {'id': id_, 'username': username, 'date_of_birth': birth_date}
+            for id_, username, birth_date in self._iterator(profiles)
+        )
+
+    def _watched(self):
+        records = WatchHistory.objects.order_by('id').values_list('user_id', 'movie_id', 'rating')
+        return (
+            {'user_id': user_id, 'movie_id': movie_id, 'rating': float(rating) if rating is not None else 0.0}
+            for user_id, movie_id, rating in self._iterator(records)
+        )
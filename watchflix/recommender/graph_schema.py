@@ -0,0 +1,97 @@
+import logging
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+class GraphMigration:
+    def __init__(self, version, name, statements, schema_objects=()):
+        self.version = version
+        self.name = name
+        self.statements = statements
+        # Names of the constraints/indexes the statements create, checked for drift
+        self.schema_objects = schema_objects
+
+
+GRAPH_MIGRATIONS = (
+    GraphMigration(
+        version=1,
+        name='unique_node_keys',
+        statements=(
+            "CREATE CONSTRAINT movie_id IF NOT EXISTS FOR (m:Movie) REQUIRE m.id IS UNIQUE",
+            "CREATE CONSTRAINT user_id IF NOT EXISTS FOR (u:User) REQUIRE u.id IS UNIQUE",
+            "CREATE CONSTRAINT user_username IF NOT EXISTS FOR (u:User) REQUIRE u.username IS UNIQUE",
+            "CREATE CONSTRAINT actor_id IF NOT EXISTS FOR (a:Actor) REQUIRE a.id IS UNIQUE",
+            "CREATE CONSTRAINT director_id IF NOT EXISTS FOR (d:Director) REQUIRE d.id IS UNIQUE",
+            "CREATE CONSTRAINT genre_name IF NOT EXISTS FOR (g:Genre) REQUIRE g.name IS UNIQUE",
+        ),
+        schema_objects=('movie_id', 'user_id', 'user_username', 'actor_id', 'director_id', 'genre_name'),
+    ),
+)
+
+
+class GraphSchemaManager:
+    """
+    Applies GRAPH_MIGRATIONS in order and records them as (:SchemaMigration)
+    nodes, the way Django records applied migrations in a table.
+    """
+
+    def __init__(self, recommender, migrations=GRAPH_MIGRATIONS):
+        self.recommender = recommender
+        self.migrations = migrations
+
+    def _read(self, query, **params):
+        return self.recommender._execute_read(self.recommender._run_query, query, **params)
+
+    def _write(self, query, **params):
+        return self.recommender._execute_write(self.recommender._run_query, query, **params)
+
+    def applied_versions(self):
+        rows = self._read("MATCH (s:SchemaMigration) RETURN s.version AS version")
+        return {row['version'] for row in rows}
+
+    def pending(self):
+        applied = self.applied_versions()
+        return [migration for migration in self.migrations if migration.version not in applied]
+
+    def migrate(self, wait=True):
+        applied = []
+        for migration in self.pending():
+            logger.info(f"Applying graph migration {migration.version} '{migration.name}'...")
+            # Schema statements cannot share a transaction with data writes
+            for statement in migration.statements:
+                self._write(statement)
+            self._write(
+                "MERGE (s:SchemaMigration {version: $version}) SET s.name = $name, s.applied_at = datetime()",
+                version=migration.version, name=migration.name,
+            )
+            applied.append(migration)
+
+        if wait:
+            self._write("CALL db.awaitIndexes($timeout)", timeout=settings.NEO4J_SCHEMA_AWAIT_TIMEOUT)
+        return applied
+
+    def expected_objects(self):
+        return {name for migration in self.migrations for name in migration.schema_objects}
+
+    def status(self):
+        """Compare the declared schema with what the database reports."""
+        constraints = {row['name'] for row in self._read("SHOW CONSTRAINTS YIELD name RETURN name")}
+        indexes = {
+            row['name']: row['state']
+            for row in self._read("SHOW INDEXES YIELD name, state RETURN name, state")
+        }
+        # Uniqueness constraints are backed by an index of the same name
+        existing = constraints | set(indexes)
+        expected = self.expected_objects()
+
+        return {
+            'pending_migrations': [migration.version for migration in self.pending()],
+            'missing': sorted(expected - existing),
+            'not_online': sorted(name for name in expected if name in indexes and indexes[name] != 'ONLINE'),
+            'unmanaged': sorted(existing - expected - {name for name in indexes if name.startswith('index_')}),
+        }
+
+    def is_ready(self):
+        status = self.status()
+        return not (status['pending_migrations'] or status['missing'] or status['not_online'])
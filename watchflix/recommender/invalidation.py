@@ -0,0 +1,82 @@
+import time
+from django.conf import settings
+from django.core.cache import cache
+from accounts.models import UserProfile
+from .models import UserRecommendation
+
+# A changed vector can move a movie into anyone's similar movies, so vector
+# changes bump a generation that is part of every key. The counter starts
+# from the clock, so an evicted counter never reuses an old generation. Other
+# movie changes only touch results that contain the movie: those record when
+# the movie last changed, and cached results computed before then are stale.
+MOVIE_RECOMMENDATIONS_GENERATION_KEY = 'movie_recommendations_generation'
+
+
+def user_recommendations_key(username):
+    return f"user_recommendations_{username}"
+
+
+def follow_feed_key(username):
+    return f"follow_feed_{username}"
+
+
+def movie_recommendations_generation():
+    return cache.get_or_set(MOVIE_RECOMMENDATIONS_GENERATION_KEY, time.time_ns(), timeout=None)
+
+
+def movie_recommendations_key(movie_id, include_genre=False, top_k=10, generation=None):
+    generation = generation or movie_recommendations_generation()
+    return f"movie_recommendations_{generation}_{movie_id}_{int(include_genre)}_{top_k}"
+
+
+def movie_changed_key(movie_id):
+    return f"movie_changed_{movie_id}"
+
+
+def current_movie_recommendations(entries, source_ids):
+    """
+    Keys of the cached {key: (recommendations, computed_at)} entries computed
+    after the last change to their source movie (`source_ids[key]`) and to
+    every movie they recommend.
+    """
+    movie_ids = {
+        key: {source_ids[key], *(recommendation['id'] for recommendation in recommendations)}
+        for key, (recommendations, _) in entries.items()
+    }
+    changed_at = cache.get_many([movie_changed_key(movie_id) for movie_id in set().union(*movie_ids.values())])
+    return {
+        key for key, (_, computed_at) in entries.items()
+        if all(changed_at.get(movie_changed_key(movie_id), 0) < computed_at for movie_id in movie_ids[key])
+    }
+
+
+def invalidate_movies(movie_ids):
+    """Drop cached movie recommendations for, or containing, the given movies."""
+    changed_at = time.time_ns()
+    # Only needs to outlive the cached entries it invalidates
+    timeout = max(settings.MOVIE_RECOMMENDATIONS_CACHE_TTL, settings.RECOMMENDATION_CACHE_NEGATIVE_TTL) \
+        + settings.RECOMMENDATION_CACHE_STALE_TTL
+    cache.set_many({movie_changed_key(movie_id): changed_at for movie_id in movie_ids}, timeout=timeout)
+
+
+def invalidate_movie_recommendations():
+    try:
+        cache.incr(MOVIE_RECOMMENDATIONS_GENERATION_KEY)
+    except ValueError:
+        cache.set(MOVIE_RECOMMENDATIONS_GENERATION_KEY, time.time_ns(), timeout=None)
+
+
+def invalidate_user_recommendations(user_ids, strategies):
+    """Drop the cached and materialised recommendations of the given UserProfile ids."""
+    user_ids = list(user_ids)
+    if not user_ids:
+        return
+    usernames = UserProfile.objects.filter(id__in=user_ids).values_list('user__username', flat=True)
+    keys = []
+    for username in usernames:
+        if 'user-based' in strategies:
+            keys.append(user_recommendations_key(username))
+        if 'follow-based' in strategies:
+            keys.append(follow_feed_key(username))
+    cache.delete_many(keys)
+    UserRecommendation.objects.filter(user_id__in=user_ids, strategy__in=strategies).delete()
@@ -0,0 +1,236 @@
+import logging
+import threading
+import time
+import numpy as np
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from movies.models import Movie
+from watch_history.models import WatchHistory
+from .utils import bundle_mtime, load_array_bundle, save_array_bundle
+
+logger = logging.getLogger(__name__)
+
+# The similarity matrix is stored as separate .npy arrays rather than one .npz,
+# because np.load can only memory-map plain .npy files
+MATRIX_ARRAYS = ('item_ids', 'data', 'indices', 'indptr')
+
+
+def _sparse():
+    try:
+        from scipy import sparse
+    except ImportError as e:
+        raise ImproperlyConfigured("The item-knn recommender requires scipy.") from e
+    return sparse
+
+
+def build_rating_matrix():
+    """
+    CSR user x movie matrix of WatchHistory ratings, with the UserProfile and
+    Movie ids of its rows and columns. Unrated watches count as 1, and for
+    re-watches the latest rating wins.
+    """
+    sparse = _sparse()
+    records = WatchHistory.objects.order_by('id').values_list('user_id', 'movie_id', 'rating')
+
+    user_rows, item_columns, entries = {}, {}, {}
+    for user_id, movie_id, rating in records.iterator(chunk_size=10000):
+        key = (user_rows.setdefault(user_id, len(user_rows)), item_columns.setdefault(movie_id, len(item_columns)))
+        entries[key] = float(rating) if rating is not None else 1.0
+
+    rows = np.fromiter((row for row, _ in entries), dtype=np.int32, count=len(entries))
+    columns = np.fromiter((column for _, column in entries), dtype=np.int32, count=len(entries))
+    values = np.fromiter(entries.values(), dtype=np.float32, count=len(entries))
+    matrix = sparse.csr_matrix((values, (rows, columns)), shape=(len(user_rows), len(item_columns)))
+    user_ids = np.fromiter(user_rows, dtype=np.int64, count=len(user_rows))
+    item_ids = np.fromiter(item_columns, dtype=np.int64, count=len(item_columns))
+    return matrix, user_ids, item_ids
+
+
+def build_item_similarity(ratings, neighbors, block_size=256):
+    """
+    Truncated item-item cosine similarity of a CSR user x item rating matrix.
+
+    Columns are multiplied in blocks so only `block_size` rows of the full
+    item x item product exist at a time; each row keeps its `neighbors`
+    strongest entries, excluding the item itself.
+    """
+    sparse = _sparse()
+    ratings = sparse.csr_matrix(ratings, dtype=np.float32)
+    norms = np.sqrt(np.asarray(ratings.multiply(ratings).sum(axis=0))).ravel()
+    norms[norms == 0] = 1.0
+    normalized = sparse.csr_matrix(ratings.multiply(1.0 / norms[np.newaxis, :]), dtype=np.float32)
+    by_column = normalized.tocsc()
+    n_items = ratings.shape[1]
+
+    data, indices, indptr = [], [], [0]
+    for start in range(0, n_items, block_size):
+        block = (by_column[:, start:start + block_size].T @ normalized).tocsr()
+        for offset in range(block.shape[0]):
+            row_start, row_end = block.indptr[offset], block.indptr[offset + 1]
+            columns = block.indices[row_start:row_end]
+            values = block.data[row_start:row_end]
+            keep = columns != start + offset
+            columns, values = columns[keep], values[keep]
+            if len(values) > neighbors:
+                top = np.argpartition(-values, neighbors - 1)[:neighbors]
+                columns, values = columns[top], values[top]
+            order = np.argsort(columns)
+            data.append(values[order])
+            indices.append(columns[order])
+            indptr.append(indptr[-1] + len(values))
+
+    return sparse.csr_matrix(
+        (
+            np.concatenate(data) if data else np.zeros(0, dtype=np.float32),
+            np.concatenate(indices) if indices else np.zeros(0, dtype=np.int32),
+            np.asarray(indptr, dtype=np.int64),
+        ),
+        shape=(n_items, n_items),
+    )
+
+
+class ItemKnnModel:
+    """Item ids plus their truncated similarity matrix, memory-mapped from disk."""
+
+    def __init__(self, item_ids, similarity, mtime=None):
+        self.item_ids = item_ids
+        self.similarity = similarity
+        self.column_by_id = {int(item_id): column for column, item_id in enumerate(item_ids)}
+        self.mtime = mtime
+
+    @classmethod
+    def build(cls, neighbors=None):
+        """Build the model from every WatchHistory row."""
+        matrix, _, item_ids = build_rating_matrix()
+        similarity = build_item_similarity(matrix, neighbors or settings.ITEM_KNN_NEIGHBORS)
+        return cls(item_ids, similarity)
+
+    def save(self, path):
+        # scipy needs indices and indptr to share a dtype to wrap the mmapped arrays without copying
+        index_dtype = np.int32 if self.similarity.nnz < np.iinfo(np.int32).max else np.int64
+        arrays = {
+            'item_ids': np.asarray(self.item_ids, dtype=np.int64),
+            'data': self.similarity.data.astype(np.float32),
+            'indices': self.similarity.indices.astype(index_dtype),
+            'indptr': self.similarity.indptr.astype(index_dtype),
+        }
+        save_array_bundle(path, arrays, {'shape': list(self.similarity.shape), 'built_at': time.time()})
+
+    @classmethod
+    def load(cls, path):
+        sparse = _sparse()
+        arrays, meta, mtime = load_array_bundle(path, MATRIX_ARRAYS)
+        similarity = sparse.csr_matrix(
+            (arrays['data'], arrays['indices'], arrays['indptr']), shape=tuple(meta['shape']), copy=False
+        )
+        return cls(arrays['item_ids'], similarity, mtime)
+
+    def is_stale(self, path):
+        mtime = bundle_mtime(path)
+        return mtime is not None and mtime != self.mtime
+
+    def score(self, watched, limit):
+        """
+        Score every item for a user from their {movie_id: rating} history with
+        one sparse vector-matrix product. Returns (movie_id, score, support) tuples.
+        """
+        sparse = _sparse()
+        columns = [self.column_by_id[movie_id] for movie_id in watched if movie_id in self.column_by_id]
+        if not columns:
+            return []
+
+        n_items = len(self.item_ids)
+        weights = [watched[int(self.item_ids[column])] for column in columns]
+        user_vector = sparse.csr_matrix(
+            (np.asarray(weights, dtype=np.float32), (np.zeros(len(columns), dtype=np.int32), columns)),
+            shape=(1, n_items),
+        )
+        product = user_vector @ self.similarity
+        candidates, scores = product.indices, product.data
+        # Support counts how many of the user's movies point at each candidate
+        support = np.bincount(self.similarity[columns].indices, minlength=n_items)
+
+        keep = ~np.isin(candidates, columns)
+        candidates, scores = candidates[keep], scores[keep]
+        if len(scores) > limit:
+            top = np.argpartition(-scores, limit - 1)[:limit]
+            candidates, scores = candidates[top], scores[top]
+        order = np.argsort(-scores, kind='stable')
+        return [
+            (int(self.item_ids[candidates[i]]), float(scores[i]), int(support[candidates[i]]))
+            for i in order
+        ]
+
+
+class ItemKnnRecommender:
+    """
+    User-based recommendations from the in-process item-kNN model, shaped like
+    MovieGraphRecommender.recommend_movies_user_based.
+    """
+
+    _model = None
+    _lock = threading.Lock()
+
+    def __init__(self, path=None):
+        self.path = str(path or settings.ITEM_KNN_PATH)
+
+    def close(self):
+        pass
+
+    def get_model(self):
+        cls = type(self)
+        if cls._model is None or cls._model.is_stale(self.path):
+            with cls._lock:
+                if cls._model is None or cls._model.is_stale(self.path):
+                    if bundle_mtime(self.path) is None:
+                        raise ImproperlyConfigured(
+                            f"No item-knn model at '{self.path}'; run 'manage.py build_item_knn' first."
+                        )
+                    cls._model = ItemKnnModel.load(self.path)
+                    logger.info(f"Loaded item-knn model with {len(cls._model.item_ids)} items from {self.path}.")
+        return cls._model
+
+    def recommend_movies_user_based(self, username, limit=100):
+        scored = self.get_model().score(user_watch_ratings(username), limit)
+        return recommendation_rows(scored)
+
+
+def user_watch_ratings(username):
+    """{movie_id: rating} for a user's live watch history; unrated watches count as 1."""
+    return {
+        movie_id: float(rating) if rating is not None else 1.0
+        for movie_id, rating in WatchHistory.objects.filter(user__user__username=username)
+        .values_list('movie_id', 'rating')
+    }
+
+
+def recommendation_rows(scored):
+    """Turn (movie_id, score, popularity) tuples into the user-based endpoint's movie rows."""
+    movies = Movie.objects.prefetch_related('genres').in_bulk([movie_id for movie_id, _, _ in scored])
+    return [
+        {
+            'id': movie.id,
+            'title': movie.title,
+            'duration': movie.duration,
+            'poster_url': movie.poster_url,
+            'release_year': movie.release_year,
+            'synopsis': movie.synopsis,
+            'genres': [genre.name for genre in movie.genres.all()],
+            'popularity': popularity,
+            'avg_rating': float(movie.avg_rating) if movie.avg_rating is not None else None,
+            'score': score,
+        }
+        for movie_id, score, popularity in scored
+        if (movie := movies.get(movie_id)) is not None
+    ]
+
+
+def build_item_knn_model(path=None, neighbors=None):
+    started = time.perf_counter()
+    model = ItemKnnModel.build(neighbors)
+    model.save(str(path or settings.ITEM_KNN_PATH))
+    elapsed = time.perf_counter() - started
+    logger.info(
+        f"Built item-knn model: {len(model.item_ids)} items, {model.similarity.nnz} neighbour entries in {elapsed:.1f}s."
+    )
+    return model
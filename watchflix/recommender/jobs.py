@@ -0,0 +1,214 @@
+import logging
+import os
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from django.conf import settings
+from django.db import IntegrityError, close_old_connections, transaction
+from django.db.models import F
+from django.utils import timezone
+from movies.models import Movie
+from .graph_loader import GraphBulkLoader
+from .models import BackgroundJob
+from .recommender import MovieGraphRecommender, VectorRecommender
+
+logger = logging.getLogger(__name__)
+
+
+class JobContext:
+    """What a running job sees: its params, its last checkpoint, and a way to report progress."""
+
+    def __init__(self, job):
+        self.job = job
+        self.params = job.params
+        self.checkpoint = job.checkpoint
+        self._started = time.monotonic()
+        self._start_rows = job.rows_processed if job.checkpoint is not None else 0
+
+    def report(self, phase, rows_processed, rows_total=None, checkpoint=None):
+        elapsed = time.monotonic() - self._started
+        rate = (rows_processed - self._start_rows) / elapsed if elapsed > 0 else None
+        fields = {
+            'phase': phase, 'rows_processed': rows_processed, 'rows_per_second': rate, 'heartbeat_at': timezone.now(),
+        }
+        if rows_total is not None:
+            fields['rows_total'] = rows_total
+        if checkpoint is not None:
+            fields['checkpoint'] = self.checkpoint = checkpoint
+        BackgroundJob.objects.filter(id=self.job.id).update(**fields)
+
+
+def run_neo4j_load(context):
+    recommender = MovieGraphRecommender()
+    counts = GraphBulkLoader(recommender).row_counts()
+    phases = list(counts)
+    total = sum(counts.values())
+
+    def progress(phase, written, checkpoint):
+        done = sum(counts[name] for name in phases[:phases.index(phase)]) + written
+        context.report(phase, done, total, checkpoint)
+
+    if context.checkpoint is None:
+        context.report('delete', 0, total)
+    try:
+        return recommender.load_data(progress=progress, resume=context.checkpoint)
+    finally:
+        recommender.close()
+
+
+def run_qdrant_load(context):
+    recommender = VectorRecommender()
+    total = Movie.objects.count()
+    # Vector sync state is saved per uploaded chunk, so a resumed full load continues incrementally
+    incremental = context.params.get('incremental', False) or context.checkpoint is not None
+    try:
+        return recommender.load_data(
+            incremental=incremental,
+            progress=lambda phase, scanned: context.report(phase, scanned, total, {'collection_ready': True}),
+        )
+    finally:
+        recommender.close()
+
+
+JOB_HANDLERS = {
+    'neo4j.load_data': run_neo4j_load,
+    'qdrant.load_data': run_qdrant_load,
+}
+
+
+class JobAlreadyActive(Exception):
+    def __init__(self, job):
+        super().__init__(f"A '{job.job_type}' job is already {job.status} (job {job.id}).")
+        self.job = job
+
+
+def enqueue_job(job_type, params=None):
+    """Queue a job; raises JobAlreadyActive if one of the same type is queued or running."""
+    if job_type not in JOB_HANDLERS:
+        raise ValueError(f"Unknown job type '{job_type}'.")
+    while True:
+        try:
+            with transaction.atomic():
+                return BackgroundJob.objects.create(job_type=job_type, params=params or {})
+        except IntegrityError:
+            active = BackgroundJob.objects.filter(job_type=job_type, status__in=BackgroundJob.ACTIVE_STATUSES).first()
+            # The active job may have finished in between; then the insert can simply be retried
+            if active is not None:
+                raise JobAlreadyActive(active)
+
+
+def job_status(job):
+    eta = None
+    if job.status == BackgroundJob.RUNNING and job.rows_total is not None and job.rows_per_second:
+        eta = max(job.rows_total - job.rows_processed, 0) / job.rows_per_second
+    return {
+        'id': job.id,
+        'job_type': job.job_type,
+        'status': job.status,
+        'phase': job.phase,
+        'rows_processed': job.rows_processed,
+        'rows_total': job.rows_total,
+        'rows_per_second': round(job.rows_per_second, 1) if job.rows_per_second is not None else None,
+        'eta_seconds': round(eta, 1) if eta is not None else None,
+        'attempts': job.attempts,
+        'error': job.error,
+        'result': job.result,
+        'created_at': job.created_at,
+        'started_at': job.started_at,
+        'finished_at': job.finished_at,
+    }
+
+
+class JobRunner:
+    """
+    Runs queued BackgroundJobs on a pool of worker threads.
+
+    A running job heartbeats every JOB_HEARTBEAT_INTERVAL seconds. A job whose
+    heartbeat is older than JOB_HEARTBEAT_TIMEOUT belongs to a worker that died;
+    it is requeued with its checkpoint, and after JOB_MAX_ATTEMPTS it is marked
+    failed. The one-active-job-per-type constraint keeps two loads of the same
+    store from running at once.
+    """
+
+    def __init__(self, workers=None, poll_interval=None):
+        self.workers = workers or settings.JOB_WORKERS
+        self.poll_interval = poll_interval or settings.JOB_POLL_INTERVAL
+        self.worker_name = f"{socket.gethostname()}:{os.getpid()}"
+
+    def recover(self):
+        cutoff = timezone.now() - timedelta(seconds=settings.JOB_HEARTBEAT_TIMEOUT)
+        stale = BackgroundJob.objects.filter(status=BackgroundJob.RUNNING, heartbeat_at__lt=cutoff)
+        for job in stale:
+            if job.attempts >= settings.JOB_MAX_ATTEMPTS:
+                fields = {'status': BackgroundJob.FAILED, 'finished_at': timezone.now(),
+                          'error': f"Worker {job.worker} stopped responding; giving up after {job.attempts} attempts."}
+            else:
+                fields = {'status': BackgroundJob.QUEUED}
+            if BackgroundJob.objects.filter(id=job.id, status=BackgroundJob.RUNNING).update(**fields):
+                logger.warning(f"Job {job.id} ({job.job_type}) lost its worker {job.worker}; now {fields['status']}.")
+
+    def claim(self):
+        for job_id in BackgroundJob.objects.filter(status=BackgroundJob.QUEUED).order_by('id').values_list('id', flat=True):
+            now = timezone.now()
+            claimed = BackgroundJob.objects.filter(id=job_id, status=BackgroundJob.QUEUED).update(
+                status=BackgroundJob.RUNNING, worker=self.worker_name, heartbeat_at=now, error='',
+                attempts=F('attempts') + 1,
+            )
+            if claimed:
+                BackgroundJob.objects.filter(id=job_id, started_at__isnull=True).update(started_at=now)
+                return BackgroundJob.objects.get(id=job_id)
+        return None
+
+    def execute(self, job):
+        handler = JOB_HANDLERS.get(job.job_type)
+        stop = threading.Event()
+        heartbeat = threading.Thread(target=self._heartbeat, args=(job.id, stop), daemon=True)
+        heartbeat.start()
+        started = time.perf_counter()
+        logger.info(f"Running job {job.id} ({job.job_type}), attempt {job.attempts}.")
+        try:
+            if handler is None:
+                raise ValueError(f"Unknown job type '{job.job_type}'.")
+            result = handler(JobContext(job))
+        except Exception as e:
+            logger.error(f"Job {job.id} ({job.job_type}) failed: {e}")
+            BackgroundJob.objects.filter(id=job.id).update(
+                status=BackgroundJob.FAILED, error=str(e), finished_at=timezone.now(),
+            )
+        else:
+            logger.info(f"Job {job.id} ({job.job_type}) finished in {time.perf_counter() - started:.1f}s.")
+            BackgroundJob.objects.filter(id=job.id).update(
+                status=BackgroundJob.SUCCEEDED, phase='done', result=result, finished_at=timezone.now(),
+            )
+        finally:
+            stop.set()
+            heartbeat.join()
+
+    def _heartbeat(self, job_id, stop):
+        try:
+            while not stop.wait(settings.JOB_HEARTBEAT_INTERVAL):
+                BackgroundJob.objects.filter(id=job_id, status=BackgroundJob.RUNNING).update(heartbeat_at=timezone.now())
+        finally:
+            close_old_connections()
+
+    def _work(self, loop):
+        try:
+            while True:
+                self.recover()
+                job = self.claim()
+                if job is not None:
+                    self.execute(job)
+                elif loop:
+                    time.sleep(self.poll_interval)
+                else:
+                    return
+        finally:
+            close_old_connections()
+
+    def run(self, loop=False):
+        """Run queued jobs; with loop=True keep polling for new ones."""
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='job-worker') as pool:
+            for future in [pool.submit(self._work, loop) for _ in range(self.workers)]:
+                future.result()
@@ -0,0 +1,141 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import numpy as np
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from movies.models import Movie
+from recommender.encoder import ENCODER_INFERENCE_MODES, load_encoder
+
+try:
+    import resource
+except ImportError:
+    # Not available on Windows; RSS is then only reported where /proc can be read
+    resource = None
+
+
+def _rss_mb():
+    """Resident set size of this process in MB, or None where it cannot be read."""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    if resource is None:
+        return None
+    # Peak rather than current RSS; bytes on macOS, kilobytes elsewhere
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (1024 * 1024 if sys.platform == 'darwin' else 1024)
+
+
+class Command(BaseCommand):
+    help = "Benchmark encoder inference modes on the movie synopsis corpus, each in a fresh process."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--modes', nargs='+', default=list(ENCODER_INFERENCE_MODES), choices=ENCODER_INFERENCE_MODES)
+        parser.add_argument('--limit', type=int, default=1000, help="Number of synopses to encode.")
+        parser.add_argument('--queries', type=int, default=100, help="Number of single-text encodes to time.")
+        parser.add_argument('--batch-size', type=int, default=settings.VECTOR_ENCODE_BATCH_SIZE)
+        # Used by the subprocess that benchmarks a single mode
+        parser.add_argument('--worker', choices=ENCODER_INFERENCE_MODES, help=argparse.SUPPRESS)
+        parser.add_argument('--model', help=argparse.SUPPRESS)
+        parser.add_argument('--corpus', help=argparse.SUPPRESS)
+        parser.add_argument('--output', help=argparse.SUPPRESS)
+
+    def handle(self, *args, **options):
+        if options['worker']:
+            self._benchmark(options['worker'], options)
+            return
+
+        corpus = list(
+            Movie.objects.exclude(synopsis='').order_by('id').values_list('synopsis', flat=True)[:options['limit']]
+        )
+        if not corpus:
+            raise CommandError("No movie synopses found to benchmark on.")
+        self.stdout.write(f"Benchmarking '{settings.ENCODER_MODEL_NAME}' on {len(corpus)} synopses.")
+
+        embeddings = {}
+        with tempfile.TemporaryDirectory() as directory:
+            corpus_path = os.path.join(directory, 'corpus.json')
+            with open(corpus_path, 'w') as f:
+                json.dump(corpus, f)
+            for mode in options['modes']:
+                output = os.path.join(directory, mode)
+                stats = self._run_worker(mode, corpus_path, output, options)
+                embeddings[mode] = np.load(f'{output}.npy')
+                rss = (
+                    f"RSS +{stats['rss_load_mb']:.0f}MB ({stats['rss_mb']:.0f}MB total)"
+                    if stats['rss_mb'] is not None else "RSS n/a"
+                )
+                self.stdout.write(
+                    f"[{mode}] load {stats['load_seconds']:.2f}s, "
+                    f"latency p50 {stats['p50_ms']:.2f}ms p95 {stats['p95_ms']:.2f}ms, "
+                    f"throughput {stats['throughput']:.1f} texts/s, {rss}"
+                )
+
+        if 'fp32' in embeddings:
+            reference = embeddings['fp32']
+            reference = reference / np.linalg.norm(reference, axis=1, keepdims=True)
+            for mode, vectors in embeddings.items():
+                if mode == 'fp32':
+                    continue
+                vectors = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+                agreement = (reference * vectors).sum(axis=1)
+                self.stdout.write(
+                    f"[{mode}] cosine vs fp32: mean {agreement.mean():.4f}, "
+                    f"min {agreement.min():.4f}, p5 {np.percentile(agreement, 5):.4f}"
+                )
+
+    def _run_worker(self, mode, corpus_path, output, options):
+        # A fresh interpreter per mode, so its load time and RSS are not skewed by the modes before it
+        python_path = [str(settings.BASE_DIR), os.environ.get('PYTHONPATH')]
+        env = dict(os.environ, PYTHONPATH=os.pathsep.join(path for path in python_path if path))
+        command = [
+            sys.executable, '-m', 'django', 'benchmark_encoder', '--worker', mode,
+            '--model', settings.ENCODER_MODEL_NAME, '--corpus', corpus_path, '--output', output,
+            '--queries', str(options['queries']), '--batch-size', str(options['batch_size']),
+        ]
+        result = subprocess.run(command, env=env, capture_output=True, text=True)
+        if result.returncode != 0:
+            error = result.stderr.strip().splitlines()
+            raise CommandError(f"Benchmarking '{mode}' failed: {error[-1] if error else result.returncode}")
+        with open(f'{output}.json') as f:
+            return json.load(f)
+
+    def _benchmark(self, mode, options):
+        with open(options['corpus']) as f:
+            corpus = json.load(f)
+        rss_before = _rss_mb()
+        started = time.perf_counter()
+        encoder = load_encoder(options['model'], mode)
+        load_seconds = time.perf_counter() - started
+        encoder.encode(corpus[0])
+
+        latencies = []
+        for text in corpus[:options['queries']]:
+            started = time.perf_counter()
+            encoder.encode(text)
+            latencies.append((time.perf_counter() - started) * 1000)
+
+        started = time.perf_counter()
+        embeddings = np.asarray(
+            encoder.encode(corpus, batch_size=options['batch_size'], show_progress_bar=False), dtype=np.float32
+        )
+        throughput = len(corpus) / (time.perf_counter() - started)
+        rss = _rss_mb()
+
+        np.save(f"{options['output']}.npy", embeddings)
+        with open(f"{options['output']}.json", 'w') as f:
+            json.dump({
+                'load_seconds': load_seconds,
+                'p50_ms': float(np.percentile(latencies, 50)),
+                'p95_ms': float(np.percentile(latencies, 95)),
+                'throughput': throughput,
+                'rss_mb': rss,
+                'rss_load_mb': rss - rss_before if rss is not None else None,
+            }, f)
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+from recommender.item_knn import build_item_knn_model
+
+
+class Command(BaseCommand):
+    help = "Build the sparse item-kNN model from WatchHistory and save it under ITEM_KNN_PATH."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--path', help="Output directory (defaults to ITEM_KNN_PATH).")
+        parser.add_argument('--neighbors', type=int, help="Neighbours kept per movie.")
+
+    def handle(self, *args, **options):
+        model = build_item_knn_model(options['path'], options['neighbors'])
+        self.stdout.write(f"Built item-knn model with {len(model.item_ids)} movies and {model.similarity.nnz} neighbours.")
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+from recommender.content_similarity import ContentSimilarityJob
+from recommender.recommender import MovieGraphRecommender
+
+
+class Command(BaseCommand):
+    help = "Rebuild CONTENT_SIMILAR edges from weighted genre, actor and director overlap."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top-n', type=int, help="Neighbours kept per movie.")
+
+    def handle(self, *args, **options):
+        job = ContentSimilarityJob(MovieGraphRecommender(), top_n=options['top_n'])
+        result = job.run()
+        self.stdout.write(
+            f"Wrote {result['edges']} edges for {result['movies']} movies in {result['seconds']:.1f}s."
+        )
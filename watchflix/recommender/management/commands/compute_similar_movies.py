@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+from recommender.recommender import MovieGraphRecommender
+from recommender.similarity import CoWatchSimilarityJob
+
+
+class Command(BaseCommand):
+    help = "Recompute co-watch SIMILAR edges for movies whose watch sets changed since the last run."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true', help="Recompute every movie.")
+        parser.add_argument('--top-n', type=int, help="Neighbours kept per movie.")
+
+    def handle(self, *args, **options):
+        job = CoWatchSimilarityJob(MovieGraphRecommender(), top_n=options['top_n'])
+        result = job.run(full=options['full'])
+        self.stdout.write(
+            f"Recomputed {result['recomputed']} movies, cleared {result['cleared']}, "
+            f"{result['unchanged']} unchanged."
+        )
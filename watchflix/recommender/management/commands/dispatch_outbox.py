@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+from recommender.outbox import OutboxDispatcher
+from recommender.recommender import MovieGraphRecommender, VectorRecommender
+
+
+class Command(BaseCommand):
+    help = "Apply pending outbox events to Neo4j and the vector store."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true', help="Keep polling for new events.")
+        parser.add_argument('--interval', type=float, help="Seconds between polls of an empty outbox.")
+        parser.add_argument('--batch-size', type=int)
+        parser.add_argument('--retry-failed', action='store_true', help="Requeue events that ran out of attempts first.")
+
+    def handle(self, *args, **options):
+        graph = MovieGraphRecommender()
+        dispatcher = OutboxDispatcher(graph, VectorRecommender(), batch_size=options['batch_size'])
+        try:
+            if options['retry_failed']:
+                self.stdout.write(f"Requeued {dispatcher.requeue_failed()} failed events.")
+            totals = dispatcher.run(loop=options['loop'], interval=options['interval'])
+            self.stdout.write(f"Dispatched {totals['dispatched']} events, {totals['failed']} failed.")
+        finally:
+            graph.close()
@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+from recommender.graph_export import GraphCsvExporter
+from recommender.graph_schema import GraphSchemaManager
+from recommender.recommender import MovieGraphRecommender
+
+
+class Command(BaseCommand):
+    help = "Export the graph to CSV files for neo4j-admin or LOAD CSV, and optionally import them."
+
+    def add_arguments(self, parser):
+        parser.add_argument('output_dir', help="Directory for the CSV files (the Neo4j import directory for LOAD CSV).")
+        parser.add_argument('--compress', action='store_true', help="Write gzip-compressed .csv.gz files.")
+        parser.add_argument('--import', dest='import_mode', choices=['admin', 'load-csv'],
+                            help="'admin' runs neo4j-admin against a stopped database, 'load-csv' imports into a running one.")
+        parser.add_argument('--database', default='neo4j', help="Target database for --import admin.")
+        parser.add_argument('--neo4j-admin', help="Path to the neo4j-admin binary.")
+        parser.add_argument('--url-prefix', help="URL the server reads the output directory from for --import load-csv.")
+
+    def handle(self, *args, **options):
+        exporter = GraphCsvExporter(options['output_dir'], compress=options['compress'])
+        for name, result in exporter.export().items():
+            self.stdout.write(f"{name}: {result['rows']} rows -> {result['path']}")
+
+        if options['import_mode'] == 'admin':
+            exporter.run_admin_import(options['database'], options['neo4j_admin'])
+            self.stdout.write(
+                f"Imported into '{options['database']}'. Start the database and run 'graph_schema migrate'."
+            )
+        elif options['import_mode'] == 'load-csv':
+            recommender = MovieGraphRecommender()
+            # Constraints first, so the relationship MATCHes hit an index
+            GraphSchemaManager(recommender).migrate()
+            exporter.run_load_csv(recommender, options['url_prefix'])
+            self.stdout.write("Imported through LOAD CSV.")
+        else:
+            self.stdout.write(' '.join(exporter.admin_import_command(options['database'], options['neo4j_admin'])))
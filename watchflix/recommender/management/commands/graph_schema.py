@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand, CommandError
+from recommender.graph_schema import GraphSchemaManager
+from recommender.recommender import MovieGraphRecommender
+
+
+class Command(BaseCommand):
+    help = "Apply graph schema migrations (constraints and indexes) or show schema drift."
+
+    def add_arguments(self, parser):
+        parser.add_argument('action', choices=['migrate', 'status'])
+        parser.add_argument('--no-wait', action='store_true', help="Do not wait for indexes to come ONLINE.")
+
+    def handle(self, *args, **options):
+        manager = GraphSchemaManager(MovieGraphRecommender())
+
+        if options['action'] == 'migrate':
+            applied = manager.migrate(wait=not options['no_wait'])
+            if not applied:
+                self.stdout.write("No graph migrations to apply.")
+            for migration in applied:
+                self.stdout.write(f"Applied {migration.version} '{migration.name}'.")
+            return
+
+        status = manager.status()
+        self.stdout.write(f"Pending migrations: {status['pending_migrations'] or 'none'}")
+        self.stdout.write(f"Missing: {status['missing'] or 'none'}")
+        self.stdout.write(f"Not ONLINE: {status['not_online'] or 'none'}")
+        self.stdout.write(f"Not declared in GRAPH_MIGRATIONS: {status['unmanaged'] or 'none'}")
+        if status['pending_migrations'] or status['missing'] or status['not_online']:
+            raise CommandError("Graph schema has drifted from GRAPH_MIGRATIONS.")
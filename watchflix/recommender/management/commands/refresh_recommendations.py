@@ -0,0 +1,23 @@
+import time
+from django.core.management.base import BaseCommand
+from recommender.read_model import RECOMMENDATION_STRATEGIES, UserRecommendationRefresher
+
+
+class Command(BaseCommand):
+    help = "Refresh stale per-user recommendations, most recently active users first."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--strategies', nargs='+', choices=list(RECOMMENDATION_STRATEGIES))
+        parser.add_argument('--limit', type=int, help="Refresh at most this many users per pass.")
+        parser.add_argument('--workers', type=int)
+        parser.add_argument('--loop', action='store_true', help="Keep refreshing, sleeping --interval seconds between passes.")
+        parser.add_argument('--interval', type=float, default=30)
+
+    def handle(self, *args, **options):
+        refresher = UserRecommendationRefresher(strategies=options['strategies'], workers=options['workers'])
+        while True:
+            refreshed = refresher.run(limit=options['limit'])
+            self.stdout.write(f"Refreshed {refreshed} users.")
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+from recommender.jobs import JobRunner
+
+
+class Command(BaseCommand):
+    help = "Run queued background jobs such as the Neo4j and vector store loads."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int)
+        parser.add_argument('--loop', action='store_true', help="Keep polling for new jobs.")
+        parser.add_argument('--interval', type=float, help="Seconds between polls of an empty queue.")
+
+    def handle(self, *args, **options):
+        JobRunner(workers=options['workers'], poll_interval=options['interval']).run(loop=options['loop'])
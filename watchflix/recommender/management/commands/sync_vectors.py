@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+from recommender.recommender import VectorRecommender
+
+
+class Command(BaseCommand):
+    help = "Incrementally sync movie vectors: re-encode new or changed movies, update payloads, drop deleted ones."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true', help="Recreate the collection and re-encode every movie.")
+
+    def handle(self, *args, **options):
+        recommender = VectorRecommender()
+        if options['full']:
+            recommender.load_data()
+            self.stdout.write("Reloaded all movie vectors.")
+            return
+
+        result = recommender.sync_movie_vectors('movies')
+        self.stdout.write(
+            f"Encoded {result['encoded']}, updated {result['payloads_updated']} payloads, "
+            f"deleted {result['deleted']}."
+        )
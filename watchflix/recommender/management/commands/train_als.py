@@ -0,0 +1,31 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from recommender.als import ALS_FEEDBACK_MODES, AlsModel
+
+
+class Command(BaseCommand):
+    help = "Train the ALS matrix-factorization model from WatchHistory and save it under ALS_PATH."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--path', help="Output directory (defaults to ALS_PATH).")
+        parser.add_argument('--factors', type=int, default=settings.ALS_FACTORS)
+        parser.add_argument('--regularization', type=float, default=settings.ALS_REGULARIZATION)
+        parser.add_argument('--iterations', type=int, default=settings.ALS_ITERATIONS)
+        parser.add_argument('--alpha', type=float, default=settings.ALS_ALPHA, help="Confidence scale for implicit feedback.")
+        parser.add_argument('--feedback', choices=ALS_FEEDBACK_MODES, default=settings.ALS_FEEDBACK)
+        parser.add_argument('--threads', type=int, help="Worker threads (defaults to the CPU count).")
+
+    def handle(self, *args, **options):
+        model = AlsModel.train(
+            factors=options['factors'], regularization=options['regularization'], iterations=options['iterations'],
+            alpha=options['alpha'], feedback=options['feedback'], threads=options['threads'],
+        )
+        for iteration, seconds in enumerate(model.meta['iteration_seconds'], start=1):
+            self.stdout.write(f"Iteration {iteration}: {seconds:.3f}s")
+
+        path = str(options['path'] or settings.ALS_PATH)
+        model.save(path)
+        self.stdout.write(
+            f"Saved {len(model.user_ids)} user and {len(model.item_ids)} movie factors "
+            f"({options['factors']} dims) to {path}."
+        )
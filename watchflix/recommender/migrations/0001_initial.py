@@ -0,0 +1,28 @@
+# Generated by Django 5.1.1 on 2026-10-18 06:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VectorSyncState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('collection_name', models.CharField(max_length=100)),
+                ('doc_id', models.BigIntegerField()),
+                ('text_hash', models.CharField(max_length=40)),
+                ('payload_hash', models.CharField(max_length=40)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'unique_together': {('collection_name', 'doc_id')},
+            },
+        ),
+    ]
@@ -1,3 +1,121 @@
 from django.db import models
+from django.core.serializers.json import DjangoJSONEncoder
 
-# Create your models here.
+
+class VectorSyncState(models.Model):
+    """Content hashes of what was last written to the vector store for each document."""
+    collection_name = models.CharField(max_length=100)
+    doc_id = models.BigIntegerField()
+    text_hash = models.CharField(max_length=40)
+    payload_hash = models.CharField(max_length=40)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('collection_name', 'doc_id')
+
+    def __str__(self):
+        return f"{self.collection_name}:{self.doc_id}"
+
+
+class MovieSimilarityState(models.Model):
+    """Watch-set signature each movie's SIMILAR edges were last computed from."""
+    movie_id = models.BigIntegerField(unique=True)
+    watch_signature = models.CharField(max_length=100)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.movie_id}:{self.watch_signature}"
+
+
+class UserCoWatchState(models.Model):
+    """Watch-set signature of each user at the last SIMILAR edge computation."""
+    user_id = models.BigIntegerField(unique=True)
+    watch_signature = models.CharField(max_length=100)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.user_id}:{self.watch_signature}"
+
+
+class UserRecommendation(models.Model):
+    """Precomputed recommendations for one user and strategy, refreshed in the background."""
+    user = models.ForeignKey('accounts.UserProfile', on_delete=models.CASCADE, related_name='recommendations')
+    strategy = models.CharField(max_length=32)
+    recommendations = models.JSONField(encoder=DjangoJSONEncoder)
+    computed_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('user', 'strategy')
+
+    def __str__(self):
+        return f"{self.user_id}:{self.strategy}"
+
+
+class OutboxEvent(models.Model):
+    """
+    A graph or vector side effect of a relational write, recorded in the same
+    transaction and applied later by the outbox dispatcher.
+    """
+    PENDING, IN_PROGRESS, DISPATCHED, FAILED, SUPERSEDED = (
+        'pending', 'in_progress', 'dispatched', 'failed', 'superseded',
+    )
+    STATUS_CHOICES = [(value, value) for value in (PENDING, IN_PROGRESS, DISPATCHED, FAILED, SUPERSEDED)]
+
+    event_type = models.CharField(max_length=50)
+    payload = models.JSONField(encoder=DjangoJSONEncoder)
+    idempotency_key = models.CharField(max_length=200)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+    available_at = models.DateTimeField(auto_now_add=True)
+    dispatched_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            # At most one pending event per key, so repeated writes collapse into one dispatch
+            models.UniqueConstraint(
+                fields=['idempotency_key'], condition=models.Q(status='pending'), name='unique_pending_outbox_key',
+            ),
+        ]
+        indexes = [models.Index(fields=['status', 'available_at'])]
+
+    def __str__(self):
+        return f"{self.event_type}:{self.idempotency_key}:{self.status}"
+
+
+class BackgroundJob(models.Model):
+    """A long-running maintenance job (e.g. a full graph load), run by `manage.py run_jobs`."""
+    QUEUED, RUNNING, SUCCEEDED, FAILED = 'queued', 'running', 'succeeded', 'failed'
+    STATUS_CHOICES = [(value, value) for value in (QUEUED, RUNNING, SUCCEEDED, FAILED)]
+    ACTIVE_STATUSES = (QUEUED, RUNNING)
+
+    job_type = models.CharField(max_length=50)
+    params = models.JSONField(default=dict)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=QUEUED)
+    phase = models.CharField(max_length=50, blank=True, default='')
+    rows_processed = models.BigIntegerField(default=0)
+    rows_total = models.BigIntegerField(null=True, blank=True)
+    rows_per_second = models.FloatField(null=True, blank=True)
+    # Where an interrupted run resumes; shape is up to the job type
+    checkpoint = models.JSONField(null=True, blank=True)
+    result = models.JSONField(null=True, blank=True, encoder=DjangoJSONEncoder)
+    error = models.TextField(blank=True, default='')
+    attempts = models.PositiveIntegerField(default=0)
+    worker = models.CharField(max_length=100, blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            # The per-type lock: a second load of the same store is rejected while one is queued or running
+            models.UniqueConstraint(
+                fields=['job_type'], condition=models.Q(status__in=['queued', 'running']),
+                name='one_active_job_per_type',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.job_type}#{self.id}:{self.status}"
@@ -0,0 +1,158 @@
+import inspect
+import json
+import logging
+import os
+import shutil
+import tempfile
+import numpy as np
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from .utils import file_lock
+
+logger = logging.getLogger(__name__)
+
+ONNX_MODEL_FILE = 'model.onnx'
+QUANTIZED_MODEL_FILE = 'model-int8.onnx'
+CONFIG_FILE = 'encoder_config.json'
+
+
+def _artifact_dir(model_name):
+    return os.path.join(str(settings.ENCODER_ONNX_CACHE_DIR), model_name.replace('/', '__'))
+
+
+def export_onnx_int8(model_name):
+    """
+    Export a SentenceTransformer's transformer to ONNX, quantize its weights to
+    int8 and cache the result under ENCODER_ONNX_CACHE_DIR.
+
+    Workers starting together share one export: it runs under a file lock,
+    into a temporary directory that is renamed into place once complete.
+    """
+    directory = _artifact_dir(model_name)
+    parent = os.path.dirname(directory)
+    os.makedirs(parent, exist_ok=True)
+    with file_lock(f'{directory}.lock'):
+        if os.path.exists(os.path.join(directory, QUANTIZED_MODEL_FILE)):
+            return directory
+
+        tmp_directory = tempfile.mkdtemp(prefix=f'.{os.path.basename(directory)}.', dir=parent)
+        try:
+            # mkdtemp creates it private to this user
+            os.chmod(tmp_directory, 0o755)
+            _export(model_name, tmp_directory)
+            # Left behind by an export that crashed before exports were atomic
+            shutil.rmtree(directory, ignore_errors=True)
+            os.replace(tmp_directory, directory)
+        except BaseException:
+            shutil.rmtree(tmp_directory, ignore_errors=True)
+            raise
+
+    logger.info(f"Exported int8 ONNX encoder for '{model_name}' to {directory}.")
+    return directory
+
+
+def _export(model_name, directory):
+    import torch
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+    from sentence_transformers import SentenceTransformer
+    from sentence_transformers.models import Normalize, Pooling
+
+    model = SentenceTransformer(model_name, device="cpu")
+    transformer = model[0]
+    pooling = next((module for module in model if isinstance(module, Pooling)), None)
+    if pooling is None or pooling.get_config_dict().get('pooling_mode_mean_tokens') is not True:
+        raise ImproperlyConfigured(f"Encoder '{model_name}' does not use mean pooling and cannot be exported.")
+
+    tokenizer = transformer.tokenizer
+    # Inputs are passed positionally, so keep them in the order forward() declares them
+    forward_params = list(inspect.signature(transformer.auto_model.forward).parameters)
+    input_names = [name for name in forward_params if name in tokenizer.model_input_names]
+    sample = tokenizer(["warm up"], return_tensors='pt')
+    dynamic_axes = {name: {0: 'batch', 1: 'sequence'} for name in input_names}
+    dynamic_axes['last_hidden_state'] = {0: 'batch', 1: 'sequence'}
+
+    onnx_path = os.path.join(directory, ONNX_MODEL_FILE)
+    transformer.auto_model.eval()
+    with torch.no_grad():
+        torch.onnx.export(
+            transformer.auto_model,
+            tuple(sample[name] for name in input_names),
+            onnx_path,
+            input_names=input_names,
+            output_names=['last_hidden_state'],
+            dynamic_axes=dynamic_axes,
+            opset_version=14,
+            dynamo=False,
+        )
+    quantize_dynamic(onnx_path, os.path.join(directory, QUANTIZED_MODEL_FILE), weight_type=QuantType.QInt8)
+    os.remove(onnx_path)
+
+    tokenizer.save_pretrained(directory)
+    with open(os.path.join(directory, CONFIG_FILE), 'w') as f:
+        json.dump({
+            'input_names': input_names,
+            'max_seq_length': model.max_seq_length,
+            'dimension': model.get_sentence_embedding_dimension(),
+            'normalize': any(isinstance(module, Normalize) for module in model),
+        }, f)
+
+
+class OnnxEncoder:
+    """
+    Int8-quantized ONNX Runtime encoder with the SentenceTransformer encode() interface.
+
+    Mean pooling and normalisation are done in NumPy. The exported model is
+    cached on disk and only rebuilt when it is missing.
+    """
+
+    def __init__(self, model_name):
+        try:
+            import onnxruntime
+            from transformers import AutoTokenizer
+        except ImportError as e:
+            raise ImproperlyConfigured("ENCODER_INFERENCE_MODE='onnx-int8' requires onnxruntime.") from e
+
+        directory = _artifact_dir(model_name)
+        if not os.path.exists(os.path.join(directory, QUANTIZED_MODEL_FILE)):
+            export_onnx_int8(model_name)
+
+        with open(os.path.join(directory, CONFIG_FILE)) as f:
+            self.config = json.load(f)
+
+        self.tokenizer = AutoTokenizer.from_pretrained(directory)
+        options = onnxruntime.SessionOptions()
+        options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = onnxruntime.InferenceSession(
+            os.path.join(directory, QUANTIZED_MODEL_FILE), options, providers=['CPUExecutionProvider']
+        )
+
+    def get_sentence_embedding_dimension(self):
+        return self.config['dimension']
+
+    def _encode_batch(self, texts):
+        tokens = self.tokenizer(
+            texts, padding=True, truncation=True, max_length=self.config['max_seq_length'], return_tensors='np'
+        )
+        inputs = {name: tokens[name].astype(np.int64) for name in self.config['input_names']}
+        hidden = self.session.run(['last_hidden_state'], inputs)[0]
+
+        mask = tokens['attention_mask'][..., None].astype(np.float32)
+        embeddings = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+        if self.config['normalize']:
+            embeddings /= np.clip(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12, None)
+        return embeddings.astype(np.float32)
+
+    def encode(self, sentences, batch_size=32, show_progress_bar=False, **kwargs):
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+        if not texts:
+            return np.zeros((0, self.get_sentence_embedding_dimension()), dtype=np.float32)
+
+        # Encode longest texts first so each batch pads to a similar length
+        order = np.argsort([-len(text) for text in texts], kind='stable')
+        sorted_texts = [texts[i] for i in order]
+        embeddings = np.empty((len(texts), self.get_sentence_embedding_dimension()), dtype=np.float32)
+        embeddings[order] = np.vstack([
+            self._encode_batch(sorted_texts[i:i + batch_size]) for i in range(0, len(texts), batch_size)
+        ])
+        return embeddings[0] if single else embeddings
@@ -0,0 +1,420 @@
+import logging
+import time
+from datetime import timedelta
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from accounts.models import UserProfile
+from movies.models import Actor, Director, Movie
+from watch_history.models import WatchHistory
+from .invalidation import invalidate_movie_recommendations, invalidate_movies, invalidate_user_recommendations
+from .models import OutboxEvent, VectorSyncState
+
+logger = logging.getLogger(__name__)
+
+
+def publish(event_type, payload, idempotency_key):
+    """Record one side effect; call inside the transaction of the write it belongs to."""
+    publish_many([(event_type, payload, idempotency_key)])
+
+
+def publish_many(events):
+    """
+    Record (event_type, payload, idempotency_key) events. An event whose key
+    already has a pending event is dropped: payloads only name what changed,
+    and the dispatcher reads the current state when it runs.
+    """
+    OutboxEvent.objects.bulk_create(
+        [
+            OutboxEvent(event_type=event_type, payload=payload, idempotency_key=key)
+            for event_type, payload, key in events
+        ],
+        batch_size=1000,
+        ignore_conflicts=True,
+    )
+
+
+def publish_movie_changed(movie_id):
+    publish_movies_changed([movie_id])
+
+
+def publish_movies_changed(movie_ids):
+    publish_many([
+        event
+        for movie_id in movie_ids
+        for event in (
+            ('graph.movie', {'id': movie_id}, f'graph.movie:{movie_id}'),
+            ('vector.movie', {'id': movie_id}, f'vector.movie:{movie_id}'),
+        )
+    ])
+
+
+def publish_user_changed(user_id):
+    publish('graph.user', {'id': user_id}, f'graph.user:{user_id}')
+
+
+def publish_watches_changed(pairs):
+    publish_many([
+        ('graph.watched', {'user_id': user_id, 'movie_id': movie_id}, f'graph.watched:{user_id}:{movie_id}')
+        for user_id, movie_id in pairs
+    ])
+
+
+def publish_follow_changed(user_id, label, person_id):
+    publish(
+        'graph.follow',
+        {'user_id': user_id, 'label': label, 'person_id': person_id},
+        f'graph.follow:{user_id}:{label}:{person_id}',
+    )
+
+
+def _people(queryset):
+    return [
+        {'id': person.id, 'first_name': person.first_name, 'last_name': person.last_name, 'birth_year': person.birth_year}
+        for person in queryset
+    ]
+
+
+def dispatch_graph_users(graph, vector, payloads):
+    ids = {payload['id'] for payload in payloads}
+    rows = [
+        {'id': id_, 'username': username, 'date_of_birth': birth_date}
+        for id_, username, birth_date in UserProfile.objects.filter(id__in=ids)
+        .values_list('id', 'user__username', 'birth_date')
+    ]
+    graph._execute_write(graph._run_query, """
+        UNWIND $rows AS row
+        MERGE (u:User {id: row.id})
+        SET u.username = row.username, u.date_of_birth = row.date_of_birth
+    """, rows=rows)
+    deleted = list(ids - {row['id'] for row in rows})
+    if deleted:
+        graph._execute_write(graph._run_query, """
+            UNWIND $ids AS id
+            MATCH (u:User {id: id})
+            DETACH DELETE u
+        """, ids=deleted)
+
+
+def dispatch_graph_movies(graph, vector, payloads):
+    ids = {payload['id'] for payload in payloads}
+    movies = Movie.objects.filter(id__in=ids).prefetch_related('genres', 'actors', 'directors')
+    rows = [
+        {
+            'id': movie.id, 'title': movie.title, 'release_year': movie.release_year,
+            'synopsis': movie.synopsis, 'duration': movie.duration, 'poster_url': movie.poster_url,
+            'avg_rating': float(movie.avg_rating) if movie.avg_rating is not None else None,
+            'genres': [genre.name for genre in movie.genres.all()],
+            'actors': _people(movie.actors.all()),
+            'directors': _people(movie.directors.all()),
+        }
+        for movie in movies
+    ]
+    # Mirrors the movie's current genres and credits: missing edges are merged, stale ones dropped
+    graph._execute_write(graph._run_query, """
+        UNWIND $rows AS row
+        MERGE (m:Movie {id: row.id})
+        SET m.title = row.title, m.release_year = row.release_year, m.synopsis = row.synopsis,
+            m.duration = row.duration, m.poster_url = row.poster_url, m.avg_rating = row.avg_rating
+        WITH m, row
+        CALL {
+            WITH m, row
+            MATCH (m)-[b:BELONGS]->(g:Genre)
+            WHERE NOT g.name IN row.genres
+            DELETE b
+        }
+        CALL {
+            WITH m, row
+            MATCH (p)-[r:ACTS|DIRECTS]->(m)
+            WHERE (type(r) = 'ACTS' AND NOT p.id IN [a IN row.actors | a.id])
+               OR (type(r) = 'DIRECTS' AND NOT p.id IN [d IN row.directors | d.id])
+            DELETE r
+        }
+        CALL {
+            WITH m, row
+            UNWIND row.genres AS genre_name
+            MERGE (g:Genre {name: genre_name})
+            MERGE (m)-[:BELONGS]->(g)
+        }
+        CALL {
+            WITH m, row
+            UNWIND row.actors AS actor
+            MERGE (a:Actor {id: actor.id})
+            ON CREATE SET a.first_name = actor.first_name, a.last_name = actor.last_name, a.birth_year = actor.birth_year
+            MERGE (a)-[:ACTS]->(m)
+        }
+        CALL {
+            WITH m, row
+            UNWIND row.directors AS director
+            MERGE (d:Director {id: director.id})
+            ON CREATE SET d.first_name = director.first_name, d.last_name = director.last_name, d.birth_year = director.birth_year
+            MERGE (d)-[:DIRECTS]->(m)
+        }
+    """, rows=rows)
+    deleted = list(ids - {row['id'] for row in rows})
+    if deleted:
+        graph._execute_write(graph._run_query, """
+            UNWIND $ids AS id
+            MATCH (m:Movie {id: id})
+            DETACH DELETE m
+        """, ids=deleted)
+    invalidate_movies(ids)
+
+
+def dispatch_graph_watches(graph, vector, payloads):
+    pairs = {(payload['user_id'], payload['movie_id']) for payload in payloads}
+    users = {user_id for user_id, _ in pairs}
+    movies = {movie_id for _, movie_id in pairs}
+    # The latest watch wins, as in the bulk loader's rating matrix
+    ratings = {}
+    for user_id, movie_id, rating in (
+        WatchHistory.objects.filter(user_id__in=users, movie_id__in=movies).order_by('id')
+        .values_list('user_id', 'movie_id', 'rating')
+    ):
+        if (user_id, movie_id) in pairs:
+            # The driver rejects Decimal parameters
+            ratings[user_id, movie_id] = float(rating) if rating is not None else None
+    rows = [
+        {'user_id': user_id, 'movie_id': movie_id, 'watched': (user_id, movie_id) in ratings,
+         'rating': ratings.get((user_id, movie_id))}
+        for user_id, movie_id in pairs
+    ]
+    # Endpoints are merged by id so an edge is never dropped while its node event is still
+    # pending or retrying; that event fills in the node's properties
+    graph._execute_write(graph._run_query, """
+        UNWIND $rows AS row
+        CALL {
+            WITH row
+            WITH row WHERE row.watched
+            MERGE (u:User {id: row.user_id})
+            MERGE (m:Movie {id: row.movie_id})
+            MERGE (u)-[w:WATCHED]->(m)
+            SET w.rating = row.rating
+        }
+        CALL {
+            WITH row
+            WITH row WHERE NOT row.watched
+            MATCH (:User {id: row.user_id})-[w:WATCHED]->(:Movie {id: row.movie_id})
+            DELETE w
+        }
+    """, rows=rows)
+    # The signals invalidated these users on commit, possibly before the graph caught up
+    invalidate_user_recommendations(users, ['user-based', 'follow-based'])
+
+
+def dispatch_graph_follows(graph, vector, payloads):
+    rows = {(payload['user_id'], payload['label'], payload['person_id']) for payload in payloads}
+    followed = {
+        ('Actor', person_id, user_id)
+        for person_id, user_id in Actor.followers.through.objects
+        .filter(actor_id__in=[person for _, label, person in rows if label == 'Actor'])
+        .values_list('actor_id', 'userprofile_id')
+    } | {
+        ('Director', person_id, user_id)
+        for person_id, user_id in Director.followers.through.objects
+        .filter(director_id__in=[person for _, label, person in rows if label == 'Director'])
+        .values_list('director_id', 'userprofile_id')
+    }
+    for label, model in (('Actor', Actor), ('Director', Director)):
+        person_ids = {person_id for _, row_label, person_id in rows if row_label == label}
+        if not person_ids:
+            continue
+        people = {person['id']: person for person in _people(model.objects.filter(id__in=person_ids))}
+        label_rows = [
+            {'user_id': user_id, 'person_id': person_id, 'following': (label, person_id, user_id) in followed,
+             'person': people.get(person_id)}
+            for user_id, row_label, person_id in rows if row_label == label
+        ]
+        # Labels cannot be parameters, so each label gets its own query; endpoints are merged
+        # by id as for watches
+        graph._execute_write(graph._run_query, f"""
+            UNWIND $rows AS row
+            CALL {{
+                WITH row
+                WITH row WHERE row.following
+                MERGE (u:User {{id: row.user_id}})
+                MERGE (p:{label} {{id: row.person_id}})
+                ON CREATE SET p.first_name = row.person.first_name, p.last_name = row.person.last_name,
+                    p.birth_year = row.person.birth_year
+                MERGE (u)-[:FOLLOWS]->(p)
+            }}
+            CALL {{
+                WITH row
+                WITH row WHERE NOT row.following
+                MATCH (:User {{id: row.user_id}})-[f:FOLLOWS]->(:{label} {{id: row.person_id}})
+                DELETE f
+            }}
+        """, rows=label_rows)
+    invalidate_user_recommendations({user_id for user_id, _, _ in rows}, ['follow-based'])
+
+
+def dispatch_vector_movies(graph, vector, payloads, collection_name='movies'):
+    ids = {payload['id'] for payload in payloads}
+    movies = Movie.objects.filter(id__in=ids).prefetch_related('genres').order_by('id')
+    docs = [vector.movie_doc(movie) for movie in movies]
+    hashes = [(doc['id'], *vector._doc_hashes(doc)) for doc in docs]
+    text_hashes = dict(
+        VectorSyncState.objects.filter(collection_name=collection_name, doc_id__in=ids).values_list('doc_id', 'text_hash')
+    )
+    if docs:
+        vector._upsert_docs(collection_name, [doc['id'] for doc in docs], docs)
+        vector._save_sync_state(collection_name, hashes)
+    deleted = list(ids - {doc['id'] for doc in docs})
+    if deleted:
+        vector.store.delete(collection_name, deleted)
+        VectorSyncState.objects.filter(collection_name=collection_name, doc_id__in=deleted).delete()
+
+    # A new or re-embedded vector can enter any movie's results; payload changes and deletions
+    # only affect the results that contain the movie
+    if any(text_hashes.get(doc_id) != text_hash for doc_id, text_hash, _ in hashes):
+        invalidate_movie_recommendations()
+    else:
+        invalidate_movies(ids)
+
+
+# Applied in this order within a batch, so nodes exist before the edges that need them
+OUTBOX_HANDLERS = {
+    'graph.user': dispatch_graph_users,
+    'graph.movie': dispatch_graph_movies,
+    'graph.watched': dispatch_graph_watches,
+    'graph.follow': dispatch_graph_follows,
+    'vector.movie': dispatch_vector_movies,
+}
+
+
+class OutboxDispatcher:
+    """
+    Drains pending OutboxEvents into Neo4j and the vector store.
+
+    Each batch is grouped by event type, and every group is one batched write.
+    A failing group is retried with exponential backoff up to
+    OUTBOX_MAX_ATTEMPTS times and does not hold back the other groups.
+    Handlers read the current state and MERGE it, so replaying an event is
+    harmless.
+    """
+
+    def __init__(self, graph, vector, batch_size=None, max_attempts=None):
+        self.graph = graph
+        self.vector = vector
+        self.batch_size = batch_size or settings.OUTBOX_BATCH_SIZE
+        self.max_attempts = max_attempts or settings.OUTBOX_MAX_ATTEMPTS
+
+    def claim(self):
+        with transaction.atomic():
+            ids = list(
+                OutboxEvent.objects.select_for_update(skip_locked=True)
+                .filter(status=OutboxEvent.PENDING, available_at__lte=timezone.now())
+                .order_by('id').values_list('id', flat=True)[:self.batch_size]
+            )
+            OutboxEvent.objects.filter(id__in=ids).update(status=OutboxEvent.IN_PROGRESS)
+        return list(OutboxEvent.objects.filter(id__in=ids).order_by('id'))
+
+    def dispatch_once(self):
+        """Dispatch one batch; returns (dispatched, failed) event counts."""
+        events = self.claim()
+        groups = {}
+        for event in events:
+            groups.setdefault(event.event_type, []).append(event)
+
+        dispatched = failed = 0
+        order = list(OUTBOX_HANDLERS)
+        for event_type in sorted(groups, key=lambda name: order.index(name) if name in order else len(order)):
+            group = groups[event_type]
+            started = time.perf_counter()
+            try:
+                handler = OUTBOX_HANDLERS.get(event_type)
+                if handler is None:
+                    raise ValueError(f"No outbox handler for event type '{event_type}'.")
+                handler(self.graph, self.vector, [event.payload for event in group])
+            except Exception as e:
+                logger.error(f"Error dispatching {len(group)} '{event_type}' outbox events: {e}")
+                self._retry(group, str(e))
+                failed += len(group)
+                continue
+
+            OutboxEvent.objects.filter(id__in=[event.id for event in group]).update(
+                status=OutboxEvent.DISPATCHED, dispatched_at=timezone.now(),
+            )
+            dispatched += len(group)
+            logger.info(f"Dispatched {len(group)} '{event_type}' outbox events in {time.perf_counter() - started:.2f}s.")
+        return dispatched, failed
+
+    def _retry(self, group, error):
+        now = timezone.now()
+        # A newer pending event for the same key covers this one, and would clash with it on requeue
+        superseded = set(
+            OutboxEvent.objects.filter(
+                status=OutboxEvent.PENDING, idempotency_key__in=[event.idempotency_key for event in group],
+            ).values_list('idempotency_key', flat=True)
+        )
+        for event in group:
+            attempts = event.attempts + 1
+            if event.idempotency_key in superseded:
+                status = OutboxEvent.SUPERSEDED
+            elif attempts >= self.max_attempts:
+                status = OutboxEvent.FAILED
+            else:
+                status = OutboxEvent.PENDING
+            backoff = min(settings.OUTBOX_RETRY_BASE_DELAY * 2 ** (attempts - 1), settings.OUTBOX_RETRY_MAX_DELAY)
+            OutboxEvent.objects.filter(id=event.id).update(
+                status=status, attempts=attempts, last_error=error[:2000],
+                available_at=now + timedelta(seconds=backoff),
+                dispatched_at=now if status == OutboxEvent.SUPERSEDED else None,
+            )
+
+    def recover(self):
+        """Requeue events a crashed dispatcher left in progress."""
+        stuck = OutboxEvent.objects.filter(status=OutboxEvent.IN_PROGRESS)
+        requeued = 0
+        for event in stuck:
+            if OutboxEvent.objects.filter(status=OutboxEvent.PENDING, idempotency_key=event.idempotency_key).exists():
+                OutboxEvent.objects.filter(id=event.id).update(
+                    status=OutboxEvent.SUPERSEDED, dispatched_at=timezone.now(),
+                )
+            else:
+                requeued += OutboxEvent.objects.filter(id=event.id).update(status=OutboxEvent.PENDING)
+        return requeued
+
+    def requeue_failed(self):
+        requeued = 0
+        for event in OutboxEvent.objects.filter(status=OutboxEvent.FAILED):
+            if OutboxEvent.objects.filter(status=OutboxEvent.PENDING, idempotency_key=event.idempotency_key).exists():
+                continue
+            requeued += OutboxEvent.objects.filter(id=event.id).update(
+                status=OutboxEvent.PENDING, attempts=0, available_at=timezone.now(),
+            )
+        return requeued
+
+    def purge(self):
+        cutoff = timezone.now() - timedelta(seconds=settings.OUTBOX_RETENTION)
+        deleted, _ = OutboxEvent.objects.filter(
+            status__in=[OutboxEvent.DISPATCHED, OutboxEvent.SUPERSEDED], dispatched_at__lt=cutoff,
+        ).delete()
+        return deleted
+
+    def run(self, loop=False, interval=None):
+        """Drain the outbox; with loop=True keep polling every `interval` seconds."""
+        interval = interval or settings.OUTBOX_POLL_INTERVAL
+        self.recover()
+        totals = {'dispatched': 0, 'failed': 0}
+        while True:
+            dispatched, failed = self.dispatch_once()
+            totals['dispatched'] += dispatched
+            totals['failed'] += failed
+            if dispatched or failed:
+                continue
+            self.purge()
+            if not loop:
+                return totals
+            time.sleep(interval)
+
+
+def outbox_stats():
+    pending = OutboxEvent.objects.filter(status=OutboxEvent.PENDING)
+    oldest = pending.order_by('created_at').values_list('created_at', flat=True).first()
+    return {
+        'pending': pending.count(),
+        'in_progress': OutboxEvent.objects.filter(status=OutboxEvent.IN_PROGRESS).count(),
+        'failed': OutboxEvent.objects.filter(status=OutboxEvent.FAILED).count(),
+        'oldest_pending_seconds': (timezone.now() - oldest).total_seconds() if oldest else 0,
+    }
@@ -0,0 +1,165 @@
+import bisect
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from django.conf import settings
+from django.db.models import Count, F, Max, Min, Q
+from django.utils import timezone
+from accounts.models import UserProfile
+from .als import AlsRecommender
+from .item_knn import ItemKnnRecommender
+from .models import UserRecommendation
+from .recommender import MovieGraphRecommender
+from .utils import decode_cursor, encode_cursor
+
+logger = logging.getLogger(__name__)
+
+USER_RECOMMENDER_BACKENDS = {
+    'neo4j': MovieGraphRecommender,
+    'item-knn': ItemKnnRecommender,
+    'als': AlsRecommender,
+}
+
+
+def recommend_user_based(username):
+    return USER_RECOMMENDER_BACKENDS[settings.USER_RECOMMENDER_BACKEND]().recommend_movies_user_based(username)
+
+
+def recommend_follow_based(username):
+    return MovieGraphRecommender().recommend_movies_based_on_follows(username)
+
+
+RECOMMENDATION_STRATEGIES = {
+    'user-based': recommend_user_based,
+    'follow-based': recommend_follow_based,
+}
+
+
+def get_user_recommendations(username, strategy):
+    """
+    Serve a user's recommendations from the UserRecommendation table. Users the
+    refresher has not reached yet are computed synchronously and stored.
+    """
+    stored = (
+        UserRecommendation.objects.filter(user__user__username=username, strategy=strategy)
+        .values_list('recommendations', flat=True).first()
+    )
+    if stored is not None:
+        return stored
+
+    recommendations = RECOMMENDATION_STRATEGIES[strategy](username)
+    user_id = UserProfile.objects.filter(user__username=username).values_list('id', flat=True).first()
+    if user_id is not None:
+        UserRecommendation.objects.update_or_create(
+            user_id=user_id, strategy=strategy, defaults={'recommendations': recommendations}
+        )
+    return recommendations
+
+
+def follow_feed_sort_key(movie):
+    return [-(movie.get('avg_rating') or 0), -(movie.get('popularity') or 0), movie['id']]
+
+
+def paginate_follow_feed(feed, cursor=None, limit=None):
+    """
+    Page through a ranked follow feed with a keyset cursor: the next page
+    starts after the cursor's sort key, so a refreshed feed neither repeats
+    nor skips movies that kept their rank.
+    """
+    limit = max(limit or settings.FOLLOW_FEED_PAGE_SIZE, 1)
+    keys = [follow_feed_sort_key(movie) for movie in feed]
+    start = 0
+    if cursor:
+        after = decode_cursor(cursor)
+        # Compared against the sort keys below, so anything but three numbers is rejected up front
+        if not (
+            isinstance(after, list) and len(after) == 3
+            and all(isinstance(value, (int, float)) and not isinstance(value, bool) for value in after)
+        ):
+            raise ValueError(f"Invalid cursor '{cursor}'.")
+        start = bisect.bisect_right(keys, after)
+    page = feed[start:start + limit]
+    next_cursor = encode_cursor(keys[start + limit - 1]) if start + limit < len(feed) else None
+    return page, next_cursor
+
+
+class UserRecommendationRefresher:
+    """
+    Recomputes UserRecommendation rows that are missing, older than
+    USER_RECOMMENDATION_MAX_AGE, or older than the user's last watch.
+    Recently active users go first; each batch is computed on a thread pool.
+    """
+
+    def __init__(self, strategies=None, workers=None, batch_size=None, max_age=None):
+        self.strategies = strategies or list(RECOMMENDATION_STRATEGIES)
+        self.workers = workers or settings.USER_RECOMMENDATION_REFRESH_WORKERS
+        self.batch_size = batch_size or settings.USER_RECOMMENDATION_REFRESH_BATCH_SIZE
+        self.max_age = max_age if max_age is not None else settings.USER_RECOMMENDATION_MAX_AGE
+
+    def stale_users(self, limit, exclude=()):
+        cutoff = timezone.now() - timedelta(seconds=self.max_age)
+        stored = Q(recommendations__strategy__in=self.strategies)
+        return list(
+            UserProfile.objects
+            .exclude(id__in=exclude)
+            .annotate(
+                last_active=Max('watchhistory__timestamp'),
+                oldest_refresh=Min('recommendations__computed_at', filter=stored),
+                stored_strategies=Count('recommendations', filter=stored, distinct=True),
+            )
+            .filter(
+                Q(stored_strategies__lt=len(self.strategies)) | Q(oldest_refresh__lt=cutoff)
+                | Q(last_active__gt=F('oldest_refresh'))
+            )
+            .order_by(F('last_active').desc(nulls_last=True), 'id')
+            .values_list('id', 'user__username')[:limit]
+        )
+
+    def refresh(self, users):
+        """Recompute and store the given (user_id, username) pairs; returns the ids that failed."""
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            results = list(executor.map(self._compute, users))
+        rows = [row for user_rows in results for row in user_rows]
+
+        UserRecommendation.objects.bulk_create(
+            rows,
+            batch_size=500,
+            update_conflicts=True,
+            unique_fields=['user', 'strategy'],
+            update_fields=['recommendations', 'computed_at'],
+        )
+        return [user_id for (user_id, _), user_rows in zip(users, results) if len(user_rows) < len(self.strategies)]
+
+    def _compute(self, user):
+        user_id, username = user
+        rows = []
+        for strategy in self.strategies:
+            try:
+                recommendations = RECOMMENDATION_STRATEGIES[strategy](username)
+            except Exception as e:
+                logger.error(f"Error refreshing {strategy} recommendations for '{username}': {e}")
+                continue
+            rows.append(UserRecommendation(
+                user_id=user_id, strategy=strategy, recommendations=recommendations, computed_at=timezone.now()
+            ))
+        return rows
+
+    def run(self, limit=None):
+        """Refresh stale users batch by batch until none are left or `limit` users were refreshed."""
+        started = time.perf_counter()
+        refreshed = 0
+        # Users whose refresh failed stay stale; skip them for the rest of this run
+        failed = set()
+        while limit is None or refreshed < limit:
+            batch_size = self.batch_size if limit is None else min(self.batch_size, limit - refreshed)
+            users = self.stale_users(batch_size, exclude=failed)
+            if not users:
+                break
+            failed.update(self.refresh(users))
+            refreshed += len(users)
+
+        elapsed = time.perf_counter() - started
+        if refreshed:
+            logger.info(f"Refreshed recommendations for {refreshed} users in {elapsed:.1f}s.")
+        return refreshed
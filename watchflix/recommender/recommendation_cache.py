@@ -0,0 +1,173 @@
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.core.cache import cache
+from django.db import close_old_connections
+
+logger = logging.getLogger(__name__)
+
+
+class RecommendationCache:
+    """
+    Cache for expensive recommendation results on top of the Django cache.
+
+    Entries stay fresh for `ttl` seconds and are then served stale for up to
+    `stale_ttl` more while one background refresh recomputes them. Only the
+    request that wins a per-key lock (cache.add) recomputes a missing entry;
+    others wait briefly for its result. Empty results are cached too, for the
+    shorter `negative_ttl`, so users without recommendations do not re-run the
+    query on every request.
+
+    Callers can pass `is_current`, which gets {key: (value, computed_at)} and
+    returns the keys still valid; other entries are treated as missing.
+    """
+
+    def __init__(self, backend=None, stale_ttl=None, negative_ttl=None, lock_timeout=None, refresh_workers=None):
+        self.backend = backend or cache
+        self.stale_ttl = stale_ttl if stale_ttl is not None else settings.RECOMMENDATION_CACHE_STALE_TTL
+        self.negative_ttl = negative_ttl if negative_ttl is not None else settings.RECOMMENDATION_CACHE_NEGATIVE_TTL
+        self.lock_timeout = lock_timeout or settings.RECOMMENDATION_CACHE_LOCK_TIMEOUT
+        self.refresh_workers = refresh_workers or settings.RECOMMENDATION_CACHE_REFRESH_WORKERS
+        self._executor = None
+        self._executor_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._stats = {
+            'hits': 0, 'stale_hits': 0, 'negative_hits': 0, 'misses': 0, 'waits': 0,
+            'refreshes': 0, 'background_refreshes': 0, 'refresh_errors': 0,
+        }
+        self._refresh_seconds = []
+
+    def _count(self, name):
+        with self._stats_lock:
+            self._stats[name] += 1
+
+    def get_or_compute(self, key, compute, ttl, is_current=None):
+        entry = self._current({key: self.backend.get(key)}, is_current).get(key)
+        now = time.time()
+
+        if entry is not None and now < entry['fresh_until']:
+            self._count('negative_hits' if entry['negative'] else 'hits')
+            return entry['value']
+
+        if entry is not None:
+            # Serve the stale value; whoever takes the lock revalidates it in the background
+            self._count('stale_hits')
+            if self._acquire(key):
+                self._submit(key, compute, ttl)
+            return entry['value']
+
+        self._count('misses')
+        if self._acquire(key):
+            try:
+                return self._refresh(key, compute, ttl)
+            finally:
+                self._release(key)
+
+        # Another request is computing this key; wait for its result rather than duplicating the work
+        self._count('waits')
+        deadline = now + self.lock_timeout
+        while time.time() < deadline:
+            time.sleep(0.05)
+            entry = self._current({key: self.backend.get(key)}, is_current).get(key)
+            if entry is not None:
+                return entry['value']
+        return self._refresh(key, compute, ttl)
+
+    def get_many(self, keys, is_current=None):
+        """Fresh values for the keys that have one; stale and missing keys are left to the caller."""
+        now = time.time()
+        entries = self._current(self.backend.get_many(keys), is_current)
+        return {key: entry['value'] for key, entry in entries.items() if now < entry['fresh_until']}
+
+    @staticmethod
+    def _current(entries, is_current):
+        entries = {key: entry for key, entry in entries.items() if entry is not None}
+        if is_current is None or not entries:
+            return entries
+        current = is_current({key: (entry['value'], entry.get('computed_at', 0)) for key, entry in entries.items()})
+        return {key: entry for key, entry in entries.items() if key in current}
+
+    def set(self, key, value, ttl, computed_at=None):
+        self.backend.set(key, self._entry(value, ttl, computed_at), timeout=self._timeout(not value, ttl))
+
+    def set_many(self, values, ttl, computed_at=None):
+        # Negative and positive entries expire at different times, so group them per timeout
+        for negative in (False, True):
+            group = {key: value for key, value in values.items() if (not value) is negative}
+            if group:
+                entries = {key: self._entry(value, ttl, computed_at) for key, value in group.items()}
+                self.backend.set_many(entries, timeout=self._timeout(negative, ttl))
+
+    def _entry(self, value, ttl, computed_at=None):
+        negative = not value
+        return {
+            'value': value,
+            'negative': negative,
+            'fresh_until': time.time() + (self.negative_ttl if negative else ttl),
+            # When the computation started, so changes committed while it ran still invalidate it
+            'computed_at': computed_at or time.time_ns(),
+        }
+
+    def _timeout(self, negative, ttl):
+        return (self.negative_ttl if negative else ttl) + self.stale_ttl
+
+    def _refresh(self, key, compute, ttl):
+        computed_at = time.time_ns()
+        started = time.perf_counter()
+        try:
+            value = compute()
+        except Exception:
+            self._count('refresh_errors')
+            raise
+        elapsed = time.perf_counter() - started
+
+        self.set(key, value, ttl, computed_at)
+        with self._stats_lock:
+            self._stats['refreshes'] += 1
+            self._refresh_seconds.append(elapsed)
+            # Bounded window of recent latencies for the percentiles
+            del self._refresh_seconds[:-1000]
+        return value
+
+    def _submit(self, key, compute, ttl):
+        if self._executor is None:
+            with self._executor_lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.refresh_workers, thread_name_prefix='recommendation-refresh'
+                    )
+        self._executor.submit(self._background_refresh, key, compute, ttl)
+
+    def _background_refresh(self, key, compute, ttl):
+        self._count('background_refreshes')
+        try:
+            self._refresh(key, compute, ttl)
+        except Exception as e:
+            logger.error(f"Error refreshing cached recommendations for '{key}': {e}")
+        finally:
+            self._release(key)
+            close_old_connections()
+
+    def _acquire(self, key):
+        return self.backend.add(f"{key}:refresh_lock", 1, timeout=self.lock_timeout)
+
+    def _release(self, key):
+        self.backend.delete(f"{key}:refresh_lock")
+
+    def stats(self):
+        with self._stats_lock:
+            stats = dict(self._stats)
+            latencies = sorted(self._refresh_seconds)
+        if latencies:
+            stats['refresh_seconds'] = {
+                'avg': sum(latencies) / len(latencies),
+                'p50': latencies[len(latencies) // 2],
+                'p95': latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))],
+                'max': latencies[-1],
+            }
+        return stats
+
+
+recommendation_cache = RecommendationCache()
@@ -1,36 +1,58 @@
 import os
 import django
-from neo4j import GraphDatabase
-from qdrant_client import QdrantClient
-from qdrant_client.http import models
-from sentence_transformers import SentenceTransformer
 import numpy as np
 from movies.models import Movie
 from accounts.models import UserProfile
 from watch_history.models import WatchHistory
+from .models import VectorSyncState
+import hashlib
+import json
 import logging
-from django.core.cache import cache
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'watchflix.settings') 
 django.setup()
 
 from django.conf import settings
+from .clients import get_neo4j_driver, neo4j_pool_stats
+from .vector_store import QdrantVectorStore, get_vector_store
+from .encoder import get_encoder
+from .embedding_cache import query_embedding_cache
+from .recommendation_cache import recommendation_cache
+from .graph_loader import GraphBulkLoader
+from .invalidation import (
+    current_movie_recommendations, follow_feed_key, movie_recommendations_generation, movie_recommendations_key,
+    user_recommendations_key,
+)
+from .utils import chunked
 
 class MovieGraphRecommender:
-    def __init__(self):
-        self.driver = GraphDatabase.driver(
-            settings.NEO4J_URI, auth=(settings.NEO4J_USER, settings.NEO4J_PASSWORD)
-        )
+    """Stateless facade over the process-wide Neo4j driver."""
+
+    def __init__(self, driver=None):
+        self.driver = driver or get_neo4j_driver()
 
     def close(self):
-        self.driver.close()
+        # The driver is shared by the whole process and closed on shutdown
+        pass
+
+    @contextmanager
+    def _session(self):
+        neo4j_pool_stats.session_opened()
+        try:
+            with self.driver.session() as session:
+                yield session
+        finally:
+            neo4j_pool_stats.session_closed()
 
     def _execute_write(self, func, *args, **kwargs):
-        with self.driver.session() as session:
-            session.write_transaction(func, *args, **kwargs)
+        with self._session() as session:
+            return session.write_transaction(func, *args, **kwargs)
 
     def _execute_read(self, func, *args, **kwargs):
-        with self.driver.session() as session:
+        with self._session() as session:
             return session.read_transaction(func, *args, **kwargs)
 
     @staticmethod
@@ -107,58 +129,110 @@ class MovieGraphRecommender:
         self._execute_write(self._run_query, query, relationships=relationships)
 
     def recommend_movies_user_based(self, username, limit=100):
-        cache_key = f"user_recommendations_{username}"
-        recommendations = cache.get(cache_key)
-
-        if not recommendations:
-            query = """
-            MATCH (u:User {username: $username})-[:WATCHED]->(m:Movie)<-[:WATCHED]-(other:User)-[r:WATCHED]->(rec:Movie)
-            WHERE NOT (u)-[:WATCHED]->(rec)
-            WITH rec, COUNT(r) AS popularity, AVG(r.rating) AS avg_rating
-            MATCH (rec)-[:BELONGS]->(g:Genre)
-            WITH rec, popularity, avg_rating, COLLECT(g.name) AS genres
-            RETURN rec.id AS id, rec.title AS title, rec.duration AS duration, 
-                rec.poster_url AS poster_url, rec.release_year AS release_year, 
-                rec.synopsis AS synopsis, genres, popularity, avg_rating
-            ORDER BY avg_rating DESC, popularity DESC
-            LIMIT $limit
-            """
-            recommendations = self._execute_read(self._run_query, query, username=username, limit=limit)
-            # Cache the recommendations for 10 minutes
-            cache.set(cache_key, recommendations, timeout=600)
-
-        return recommendations
-
-    def recommend_movies_based_on_follows(self, username, limit=50):
+        # Invalidated by the WatchHistory signals, so the TTL is only a backstop
+        return recommendation_cache.get_or_compute(
+            user_recommendations_key(username),
+            lambda: self._recommend_movies_user_based(username, limit),
+            ttl=settings.USER_RECOMMENDATIONS_CACHE_TTL,
+        )
+
+    def _recommend_movies_user_based(self, username, limit):
+        # Two hops over the bounded neighbour lists built by CoWatchSimilarityJob
+        query = """
+        MATCH (u:User {username: $username})-[:WATCHED]->(m:Movie)-[s:SIMILAR]->(rec:Movie)
+        WHERE NOT (u)-[:WATCHED]->(rec)
+        WITH rec, SUM(s.score) AS score, COUNT(m) AS popularity
+        ORDER BY score DESC, popularity DESC
+        LIMIT $limit
+        MATCH (rec)-[:BELONGS]->(g:Genre)
+        WITH rec, score, popularity, COLLECT(g.name) AS genres
+        RETURN rec.id AS id, rec.title AS title, rec.duration AS duration, 
+            rec.poster_url AS poster_url, rec.release_year AS release_year, 
+            rec.synopsis AS synopsis, genres, popularity, rec.avg_rating AS avg_rating, score
+        ORDER BY score DESC, popularity DESC
+        """
+        recommendations = self._execute_read(self._run_query, query, username=username, limit=limit)
+        if recommendations:
+            return recommendations
+
+        # No SIMILAR edges yet (compute_similar_movies not run since the graph was loaded):
+        # walk the raw co-watch graph instead
         query = """
-        MATCH (u:User {username: $username})-[:FOLLOWS]->(p)
-        OPTIONAL MATCH (p)-[:ACTS]->(m:Movie)
-        OPTIONAL MATCH (p)-[:DIRECTS]->(m:Movie)
+        MATCH (u:User {username: $username})-[:WATCHED]->(m:Movie)<-[:WATCHED]-(other:User)-[r:WATCHED]->(rec:Movie)
+        WHERE NOT (u)-[:WATCHED]->(rec)
+        WITH rec, COUNT(r) AS popularity, AVG(r.rating) AS avg_rating
+        ORDER BY avg_rating DESC, popularity DESC
+        LIMIT $limit
+        MATCH (rec)-[:BELONGS]->(g:Genre)
+        WITH rec, popularity, avg_rating, COLLECT(g.name) AS genres
+        RETURN rec.id AS id, rec.title AS title, rec.duration AS duration,
+            rec.poster_url AS poster_url, rec.release_year AS release_year,
+            rec.synopsis AS synopsis, genres, popularity, avg_rating, null AS score
+        ORDER BY avg_rating DESC, popularity DESC
+        """
+        return self._execute_read(self._run_query, query, username=username, limit=limit)
+
+    def recommend_movies_based_on_follows(self, username, limit=None):
+        """
+        Unwatched movies of the actors and directors a user follows, best rated
+        first. The whole feed (up to FOLLOW_FEED_MAX_ITEMS) is cached per user
+        and invalidated by the follow and WatchHistory signals.
+        """
+        feed = recommendation_cache.get_or_compute(
+            follow_feed_key(username),
+            lambda: self._follow_feed(username, settings.FOLLOW_FEED_MAX_ITEMS),
+            ttl=settings.FOLLOW_FEED_CACHE_TTL,
+        )
+        return feed[:limit] if limit else feed
+
+    def _follow_feed(self, username, limit):
+        # avg_rating and popularity are stored on the movie by CoWatchSimilarityJob,
+        # so ranking does not touch WATCHED edges beyond the user's own
+        query = """
+        MATCH (u:User {username: $username})-[:FOLLOWS]->(p)-[:ACTS|DIRECTS]->(m:Movie)
         WHERE NOT (u)-[:WATCHED]->(m)
-        WITH m
-        OPTIONAL MATCH (m)<-[r:WATCHED]-(otherUsers:User)
-        WITH m, COALESCE(AVG(r.rating), 0) AS avg_rating
-        OPTIONAL MATCH (m)-[:BELONGS]->(g:Genre)
-        WITH m, avg_rating, COLLECT(g.name) AS genres
-        RETURN DISTINCT m.id AS id, m.title AS title, m.poster_url AS poster_url, 
-            m.release_year AS release_year, avg_rating, genres
+        WITH DISTINCT m
+        ORDER BY COALESCE(m.avg_rating, 0) DESC, COALESCE(m.popularity, 0) DESC, m.id
         LIMIT $limit
+        OPTIONAL MATCH (m)-[:BELONGS]->(g:Genre)
+        WITH m, COLLECT(g.name) AS genres
+        RETURN m.id AS id, m.title AS title, m.poster_url AS poster_url, 
+            m.release_year AS release_year, m.avg_rating AS avg_rating, 
+            COALESCE(m.popularity, 0) AS popularity, genres
+        ORDER BY COALESCE(m.avg_rating, 0) DESC, popularity DESC, id
         """
         return self._execute_read(self._run_query, query, username=username, limit=limit)
 
     def recommend_movies_content_based(self, movie_id, limit=20):
+        """Precomputed CONTENT_SIMILAR neighbours, best match first; see `manage.py compute_content_similarity`."""
         query = """
-        MATCH (m:Movie {id: $movie_id})-[:BELONGS]->(g:Genre)<-[:BELONGS]-(rec:Movie)
-        WHERE rec.id <> $movie_id
+        MATCH (m:Movie {id: $movie_id})-[s:CONTENT_SIMILAR]->(rec:Movie)
         RETURN rec.id AS id, rec.title AS title, rec.duration AS duration, 
         rec.poster_url AS poster_url, rec.release_year AS release_year, 
-        rec.synopsis AS synopsis
+        rec.synopsis AS synopsis, s.score AS score
+        ORDER BY s.score DESC, rec.id
+        LIMIT $limit
+        """
+        recommendations = self._execute_read(self._run_query, query, movie_id=movie_id, limit=limit)
+        if recommendations:
+            return recommendations
+
+        # No edges yet (similarity not computed since the graph was loaded, or a new movie):
+        # rank by the number of shared genres, actors and directors instead
+        query = """
+        MATCH (m:Movie {id: $movie_id})-[:BELONGS|ACTS|DIRECTS]-(feature)-[:BELONGS|ACTS|DIRECTS]-(rec:Movie)
+        WHERE rec.id <> $movie_id
+        WITH rec, count(DISTINCT feature) AS shared
+        RETURN rec.id AS id, rec.title AS title, rec.duration AS duration,
+        rec.poster_url AS poster_url, rec.release_year AS release_year,
+        rec.synopsis AS synopsis, null AS score
+        ORDER BY shared DESC, rec.id
         LIMIT $limit
         """
         return self._execute_read(self._run_query, query, movie_id=movie_id, limit=limit)
 
     def delete_all(self):
-        query = "MATCH (n) DETACH DELETE n"
+        query = "MATCH (n) WHERE NOT n:SchemaMigration DETACH DELETE n"
         self._execute_write(self._run_query, query)
 
     def create_follows_actor_relationship(self, user_id, actor_id):
@@ -175,69 +249,23 @@ class MovieGraphRecommender:
         """
         self._execute_write(self._run_query, query, user_id=user_id, director_id=director_id)
 
-    def load_data(self):
-        self.delete_all()
-        self._load_movies()
-        self._load_users()
-        self._load_watch_relationships()
-
-    def _load_movies(self):
-        movies = Movie.objects.all()
-        for movie in movies:
-            self.create_movie(
-                movie_id=movie.id, title=movie.title, release_year=movie.release_year,
-                synopsis=movie.synopsis, duration=movie.duration, poster_url=movie.poster_url,
-                genres=[genre.name for genre in movie.genres.all()]
-            )
-            self._load_actors_directors(movie)
-
-    def _load_actors_directors(self, movie):
-        for actor in movie.actors.all():
-            self.create_actor(actor.id, actor.first_name, actor.last_name, actor.birth_year)
-            self.create_acts_relationship(actor.id, movie.id)
-
-        for director in movie.directors.all():
-            self.create_director(director.id, director.first_name, director.last_name, director.birth_year)
-            self.create_directs_relationship(director.id, movie.id)
-
-    def _load_users(self):
-        user_profiles = UserProfile.objects.select_related('user').all()
-        for user_profile in user_profiles:
-            self.create_user(user_profile.user.id, user_profile.user.username, user_profile.birth_date)
-
-    def _load_watch_relationships(self):
-        watch_records = WatchHistory.objects.all()
-        relationships = [(record.user.id, record.movie.id, float(record.rating) or 0) for record in watch_records]
-
-        batch_size = 10000
-        for i in range(0, len(relationships), batch_size):
-            self.create_relationships_batch(relationships[i:i + batch_size])
+    def load_data(self, progress=None, resume=None):
+        """Rebuild the whole graph from the Django database with batched writes."""
+        return GraphBulkLoader(self).run(progress=progress, resume=resume)
 
 
 class VectorRecommender:
-    def __init__(self):
-        qdrant_uri = settings.QDRANT_URI
-        encoder_name = settings.ENCODER_MODEL_NAME
-        self.client = QdrantClient(url=qdrant_uri)
-        self.encoder = SentenceTransformer(encoder_name, device="cpu")
+    def __init__(self, store=None, encoder=None, client=None):
+        # Both default to the process-wide instances; loading them per request is expensive
+        if store is None:
+            store = QdrantVectorStore(client) if client is not None else get_vector_store()
+        self.store = store
+        self.encoder = encoder or get_encoder()
         self.logger = logging.getLogger(__name__)  
 
     def create_collection(self, collection_name):
         try:
-            self.client.create_collection(
-                collection_name=collection_name,
-                vectors_config=models.VectorParams(
-                    size=self.encoder.get_sentence_embedding_dimension(), 
-                    distance=models.Distance.COSINE,
-                    on_disk=True
-                    ),  
-                quantization_config=models.ScalarQuantization(
-                scalar=models.ScalarQuantizationConfig(
-                    type=models.ScalarType.INT8,
-                    always_ram=True,
-                    ),
-                ),                          
-            )
+            self.store.create_collection(collection_name, self.encoder.get_sentence_embedding_dimension())
 
             self.logger.info(f"Collection '{collection_name}' created successfully.")
         except Exception as e:
@@ -247,7 +275,40 @@ class VectorRecommender:
         if not text:
             return np.zeros(self.encoder.get_sentence_embedding_dimension())
 
-        return self.encoder.encode(text, show_progress_bar=True).tolist()
+        return self.encoder.encode(text, show_progress_bar=False).tolist()
+
+    def get_embeddings_batch(self, texts, batch_size=None):
+        """Encode a list of texts in one call; empty texts get a zero vector."""
+        batch_size = batch_size or settings.VECTOR_ENCODE_BATCH_SIZE
+        vectors = np.zeros((len(texts), self.encoder.get_sentence_embedding_dimension()), dtype=np.float32)
+
+        non_empty = [i for i, text in enumerate(texts) if text]
+        if non_empty:
+            vectors[non_empty] = self.encoder.encode(
+                [texts[i] for i in non_empty], batch_size=batch_size, show_progress_bar=False
+            )
+        return vectors
+
+    @staticmethod
+    def movie_doc(movie, genre_names=None):
+        if genre_names is None:
+            genre_names = [genre.name for genre in movie.genres.all()]
+        return {
+            'title': movie.title,
+            'plot': movie.synopsis,
+            'id': movie.id,
+            'release_year': movie.release_year,
+            'imdbId': movie.imdb_id,
+            'poster_url': movie.poster_url,
+            'duration': movie.duration,
+            'genres': genre_names,
+            'avg_rating': float(movie.avg_rating) if movie.avg_rating is not None else None
+        }
+
+    def _upsert_docs(self, collection_name, ids, docs):
+        vectors = self.get_embeddings_batch([doc['plot'] for doc in docs])
+        payloads = [{k: v for k, v in doc.items() if k != 'plot'} for doc in docs]
+        self.store.upsert(collection_name, ids, vectors, payloads)
     
     def add_vector(self, collection_name, doc_id, doc):
         try:
@@ -257,13 +318,8 @@ class VectorRecommender:
 
             payload = {k: v for k, v in doc.items() if k != 'plot'}
             
-            point = models.PointStruct(
-                id=doc_id,
-                vector=vector,
-                payload=payload
-            )
-            
-            self.client.upload_points(collection_name=collection_name, points=[point])
+            self.store.upsert(collection_name, [doc_id], [vector], [payload])
+            self._save_sync_state(collection_name, [(doc_id, *self._doc_hashes(doc))])
 
             self.logger.info(f"Uploaded vector for document ID {doc_id} successfully.")
         except Exception as e:
@@ -276,137 +332,289 @@ class VectorRecommender:
 
             self.logger.info(f"Adding {len(ids)} vectors to the '{collection_name}' collection.")
 
-            points = [
-                models.PointStruct(
-                    id=id_, 
-                    vector=self.get_embeddings(doc['plot']), 
-                    payload={k: v for k, v in doc.items() if k != 'plot'},  
-                )
-                for id_, doc in zip(ids, docs)
-            ]
-
-            self.client.upload_points(collection_name=collection_name, points=points)
-            self.logger.info(f"Uploaded {len(points)} vectors successfully.")
+            chunk_size = settings.VECTOR_UPLOAD_BATCH_SIZE
+            for i in range(0, len(ids), chunk_size):
+                self._upsert_docs(collection_name, ids[i:i + chunk_size], docs[i:i + chunk_size])
+
+            self.logger.info(f"Uploaded {len(ids)} vectors successfully.")
         except Exception as e:
             self.logger.error(f"Error adding vectors: {e}")
+
+    def add_vectors_streaming(self, collection_name, docs, on_uploaded=None):
+        """
+        Encode and upload an iterable of docs in bounded chunks.
+
+        Uploads run on a background thread so the next chunk is encoded while
+        the previous one is in flight. At most two chunks are held in memory.
+        `on_uploaded(ids)` is called once each chunk is stored.
+        """
+        chunk_size = settings.VECTOR_UPLOAD_BATCH_SIZE
+        total = 0
+        started = time.perf_counter()
+
+        with ThreadPoolExecutor(max_workers=1) as uploader:
+            pending = None
+            for chunk in chunked(docs, chunk_size):
+                ids = [doc['id'] for doc in chunk]
+                vectors = self.get_embeddings_batch([doc['plot'] for doc in chunk])
+                payloads = [{k: v for k, v in doc.items() if k != 'plot'} for doc in chunk]
+                if pending is not None:
+                    self._finish_upload(*pending, on_uploaded)
+                pending = (uploader.submit(self.store.upsert, collection_name, ids, vectors, payloads), ids)
+
+                total += len(ids)
+                elapsed = time.perf_counter() - started
+                self.logger.info(f"Encoded {total} movies ({total / elapsed:.1f} movies/s).")
+            if pending is not None:
+                self._finish_upload(*pending, on_uploaded)
+
+        elapsed = time.perf_counter() - started
+        if total:
+            self.logger.info(f"Uploaded {total} vectors in {elapsed:.1f}s ({total / elapsed:.1f} movies/s).")
+        return total
     
+    @staticmethod
+    def _finish_upload(future, ids, on_uploaded):
+        future.result()
+        if on_uploaded is not None:
+            on_uploaded(ids)
+
     def save_collection(self, collection_name, path):
-        self.client.export_collection(collection_name, path)
+        self.store.save_collection(collection_name, path)
 
     def load_collection(self, collection_name, path):
-        self.client.import_collection(collection_name, path)
+        self.store.load_collection(collection_name, path)
+
+    def _iter_movie_docs(self):
+        movies = Movie.objects.prefetch_related('genres').order_by('id')
+        for movie in movies.iterator(chunk_size=settings.VECTOR_UPLOAD_BATCH_SIZE):
+            yield self.movie_doc(movie, [genre.name for genre in movie.genres.all()])
+
+    @staticmethod
+    def _doc_hashes(doc):
+        # The model and inference mode are part of the text hash so switching either re-embeds everything
+        text = f"{settings.ENCODER_MODEL_NAME}\n{settings.ENCODER_INFERENCE_MODE}\n{doc['plot'] or ''}"
+        payload = json.dumps({k: v for k, v in doc.items() if k != 'plot'}, sort_keys=True, default=str)
+        return (
+            hashlib.sha1(text.encode('utf-8')).hexdigest(),
+            hashlib.sha1(payload.encode('utf-8')).hexdigest(),
+        )
 
-    def _add_movie_vectors(self):
+    @staticmethod
+    def _save_sync_state(collection_name, rows):
+        VectorSyncState.objects.bulk_create(
+            [
+                VectorSyncState(collection_name=collection_name, doc_id=doc_id, text_hash=text_hash, payload_hash=payload_hash)
+                for doc_id, text_hash, payload_hash in rows
+            ],
+            batch_size=1000,
+            update_conflicts=True,
+            unique_fields=['collection_name', 'doc_id'],
+            update_fields=['text_hash', 'payload_hash', 'updated_at'],
+        )
+
+    def sync_movie_vectors(self, collection_name='movies', progress=None):
+        """
+        Bring the vector collection in line with the Movie table.
+
+        Only new movies and movies whose synopsis changed are re-encoded. When
+        only metadata changed the payload is replaced in place, and points of
+        deleted movies are removed. Sync state is saved as each chunk is
+        uploaded, so an interrupted sync picks up where it stopped.
+        `progress(phase, movies_scanned)` is called after every chunk.
+        """
+        started = time.perf_counter()
+        if not self.store.collection_exists(collection_name):
+            self.create_collection(collection_name)
+            VectorSyncState.objects.filter(collection_name=collection_name).delete()
+        else:
+            # Collections created before the genres index existed get it here
+            self.store.ensure_payload_index(collection_name)
+
+        known = {
+            doc_id: (text_hash, payload_hash)
+            for doc_id, text_hash, payload_hash in VectorSyncState.objects
+                .filter(collection_name=collection_name)
+                .values_list('doc_id', 'text_hash', 'payload_hash')
+        }
+        seen = set()
+        changed_state = []
+        encoded_hashes = {}
+        payload_updates = []
+
+        def docs_to_encode():
+            for doc in self._iter_movie_docs():
+                seen.add(doc['id'])
+                hashes = self._doc_hashes(doc)
+                previous = known.get(doc['id'])
+                if previous == hashes:
+                    continue
+                if previous is not None and previous[0] == hashes[0]:
+                    changed_state.append((doc['id'], *hashes))
+                    payload_updates.append((doc['id'], {k: v for k, v in doc.items() if k != 'plot'}))
+                else:
+                    encoded_hashes[doc['id']] = hashes
+                    yield doc
+
+        def uploaded(ids):
+            self._save_sync_state(collection_name, [(doc_id, *encoded_hashes.pop(doc_id)) for doc_id in ids])
+            if progress is not None:
+                progress('encode', len(seen))
+
+        encoded = self.add_vectors_streaming(collection_name, docs_to_encode(), on_uploaded=uploaded)
+        if progress is not None:
+            progress('payloads', len(seen))
+
+        chunk_size = settings.VECTOR_UPLOAD_BATCH_SIZE
+        for i in range(0, len(payload_updates), chunk_size):
+            chunk = payload_updates[i:i + chunk_size]
+            self.store.set_payloads(collection_name, [doc_id for doc_id, _ in chunk], [payload for _, payload in chunk])
+
+        deleted = [doc_id for doc_id in known if doc_id not in seen]
+        for i in range(0, len(deleted), chunk_size):
+            self.store.delete(collection_name, deleted[i:i + chunk_size])
+
+        self._save_sync_state(collection_name, changed_state)
+        VectorSyncState.objects.filter(collection_name=collection_name, doc_id__in=deleted).delete()
+
+        self.logger.info(
+            f"Synced '{collection_name}' in {time.perf_counter() - started:.1f}s: {encoded} encoded, "
+            f"{len(payload_updates)} payloads updated, {len(deleted)} deleted, "
+            f"{len(seen) - len(changed_state) - encoded} unchanged."
+        )
+        return {'encoded': encoded, 'payloads_updated': len(payload_updates), 'deleted': len(deleted)}
+
+    def _add_movie_vectors(self, progress=None):
         try:
-            movies = Movie.objects.all()
-            if not movies.exists():
+            if not Movie.objects.exists():
                 self.logger.warning("No movies found in the database.")
-                return
-
-            ids = []
-            docs = []
-            for movie in movies:
-                ids.append(movie.id)
-                genre_names = [genre.name for genre in movie.genres.all()]
-                print(genre_names)
-                docs.append({
-                    'title': movie.title,
-                    'plot': movie.synopsis,
-                    'id': movie.id,
-                    'release_year': movie.release_year,
-                    'imdbId': movie.imdb_id,
-                    'poster_url': movie.poster_url,
-                    'duration': movie.duration,
-                    'genres': genre_names,
-                    'avg_rating': movie.avg_rating
-                })
-                
-            self.logger.info(f"Prepared {len(ids)} movies for vector uploading.")
-            self.add_vectors('movies', ids, docs)
+
+            return self.sync_movie_vectors('movies', progress=progress)
         except Exception as e:
             self.logger.error(f"Error adding movie vectors: {e}")
+            raise
 
-    def load_data(self):
+    def load_data(self, incremental=False, progress=None):
         self.logger.info("Starting data loading process...")
-        self.create_collection('movies')
-        self._add_movie_vectors()
+        if not incremental:
+            self.create_collection('movies')
+            VectorSyncState.objects.filter(collection_name='movies').delete()
+        result = self._add_movie_vectors(progress)
         self.logger.info("Data loading completed.")
+        return result
 
-    def search_query(self, collection_name, vector, genres=None, top_k=10):
+    def search_query(self, collection_name, vector, genres=None, top_k=10, exclude_ids=None):
         try:
-            search_params = models.SearchParams(exact=False)
-
-            filter_conditions = None
-            if genres and len(genres) > 1:
-                selected_genres = genres[:2]
-                filter_conditions = models.Filter(
-                    must=[
-                        models.FieldCondition(
-                            key="genres",
-                            match=models.MatchAny(any=selected_genres)
-                        )
-                    ]
-                )
-
-            search_result = self.client.search(
-                collection_name=collection_name,
-                query_vector=vector,
-                limit=top_k,
-                search_params=search_params,
-                query_filter=filter_conditions
+            # Both stores apply the genre and id filters inside the search, so top_k comes back full
+            required_genres = list(dict.fromkeys(genres[:2])) if genres else []
+            return self.store.search(
+                collection_name, vector, top_k=top_k, genres=required_genres, exclude_ids=exclude_ids
             )
-
-            payloads = [hit.payload for hit in search_result]
-
-            if genres:
-                first_two_genres = set(genres[:2])
-                filtered_payloads = [
-                    payload for payload in payloads if first_two_genres.issubset(set(payload.get('genres', [])))
-                ]
-            else:
-                filtered_payloads = payloads
-
-            return filtered_payloads
         except Exception as e:
             self.logger.error(f"Error searching collection: {e}")
             return []
 
     def get_movie_recommendations(self, movie_id, include_genre=False, top_k=10):
-        cache_key = f"movie_recommendations_{movie_id}"
-        cached_recommendations = cache.get(cache_key)
-
-        if cached_recommendations:
-            return cached_recommendations
-    
+        key = movie_recommendations_key(movie_id, include_genre, top_k)
         try:
-            movie = Movie.objects.get(id=movie_id)
+            return recommendation_cache.get_or_compute(
+                key,
+                lambda: self._movie_recommendations(movie_id, include_genre, top_k),
+                ttl=settings.MOVIE_RECOMMENDATIONS_CACHE_TTL,
+                is_current=lambda entries: current_movie_recommendations(entries, {key: movie_id}),
+            )
+        except Exception as e:
+            self.logger.error(f"Error retrieving movie recommendations: {e}")
+            return []
+
+    def _movie_recommendations(self, movie_id, include_genre, top_k):
+        vector, genre_names = self.get_stored_vector('movies', movie_id)
+
+        if vector is None:
+            # Not indexed yet, fall back to encoding the synopsis
+            try:
+                movie = Movie.objects.get(id=movie_id)
+            except Movie.DoesNotExist:
+                # Cached as a negative result; creating the movie invalidates it
+                self.logger.error(f"Movie with ID {movie_id} not found.")
+                return []
             vector = self.get_embeddings(movie.synopsis)
+            genre_names = [genre.name for genre in movie.genres.all()]
 
-            recommendations = []
+        if not include_genre:
             genre_names = []
 
-            if include_genre:
-                genre_names = [genre.name for genre in movie.genres.all()]
-
-            recs = self.search_query('movies', vector, genre_names, top_k=top_k)
-            recommendations.extend([rec for rec in recs if rec['id'] != movie.id])
+        recommendations = self.search_query('movies', vector, genre_names, top_k=top_k, exclude_ids=[movie_id])
+        return list({rec['id']: rec for rec in recommendations}.values())
 
-            unique_recommendations = {rec['id']: rec for rec in recommendations}.values()
-
-            cache.set(cache_key, list(unique_recommendations), timeout=3600)
+    def get_movie_recommendations_batch(self, movie_ids, include_genre=False, top_k=10):
+        """
+        Similar movies for many ids at once, as {movie_id: recommendations}.
 
-            return list(unique_recommendations)
+        Shares the per-movie cache entries with get_movie_recommendations and
+        answers all cache misses with a single batched vector search.
+        """
+        generation = movie_recommendations_generation()
+        cache_keys = {movie_id: movie_recommendations_key(movie_id, include_genre, top_k, generation) for movie_id in movie_ids}
+        source_ids = {key: movie_id for movie_id, key in cache_keys.items()}
+        cached = recommendation_cache.get_many(
+            cache_keys.values(), is_current=lambda entries: current_movie_recommendations(entries, source_ids),
+        )
+        results = {
+            movie_id: cached[key] for movie_id, key in cache_keys.items() if key in cached
+        }
+        missing = [movie_id for movie_id in movie_ids if movie_id not in results]
+        if not missing:
+            return results
+
+        computed_at = time.time_ns()
+        try:
+            stored = self.store.retrieve_many('movies', missing)
+            queries = {
+                movie_id: (vector, payload.get('genres', []))
+                for movie_id, (vector, payload) in stored.items()
+            }
+
+            unindexed = Movie.objects.filter(id__in=[movie_id for movie_id in missing if movie_id not in stored])\
+                .prefetch_related('genres')
+            unindexed = list(unindexed)
+            vectors = self.get_embeddings_batch([movie.synopsis for movie in unindexed])
+            for movie, vector in zip(unindexed, vectors):
+                queries[movie.id] = (vector, [genre.name for genre in movie.genres.all()])
+
+            query_ids = list(queries)
+            batch_results = self.store.search_batch(
+                'movies',
+                [queries[movie_id][0] for movie_id in query_ids],
+                top_k=top_k,
+                genres_list=[
+                    list(dict.fromkeys(queries[movie_id][1][:2])) if include_genre else None for movie_id in query_ids
+                ],
+                exclude_ids_list=[[movie_id] for movie_id in query_ids],
+            )
 
-        except Movie.DoesNotExist:
-            self.logger.error(f"Movie with ID {movie_id} not found.")
-            return []
+            fresh = {}
+            for movie_id, recommendations in zip(query_ids, batch_results):
+                results[movie_id] = list({rec['id']: rec for rec in recommendations}.values())
+                fresh[cache_keys[movie_id]] = results[movie_id]
+            recommendation_cache.set_many(fresh, ttl=settings.MOVIE_RECOMMENDATIONS_CACHE_TTL, computed_at=computed_at)
         except Exception as e:
-            self.logger.error(f"Error retrieving movie recommendations: {e}")
-            return []
+            self.logger.error(f"Error retrieving batch movie recommendations: {e}")
+
+        for movie_id in missing:
+            results.setdefault(movie_id, [])
+        return results
+
+    def get_stored_vector(self, collection_name, doc_id):
+        """Return the stored (vector, genres) for a point, or (None, []) if it is missing."""
+        vector, payload = self.store.retrieve(collection_name, doc_id)
+        if vector is None:
+            return None, []
+        return vector, payload.get('genres', [])
     
     def get_movies_by_plot(self, plot, top_k=20):
         try:
-            vector = self.get_embeddings(plot)
+            vector = query_embedding_cache.get_or_compute(plot, self.get_embeddings)
 
             movies = self.search_query(collection_name='movies', vector=vector, top_k=top_k)
 
@@ -421,6 +629,7 @@ class VectorRecommender:
             return []
         
     def close(self):
-        self.client.close()
+        # The store is shared by the whole process and closed on shutdown
+        pass
 
     
\ No newline at end of file
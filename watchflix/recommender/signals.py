@@ -0,0 +1,53 @@
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+from movies.models import Actor, Director, Movie
+from watch_history.models import WatchHistory
+from .invalidation import invalidate_movie_recommendations, invalidate_movies, invalidate_user_recommendations
+from .outbox import publish_watches_changed
+
+# Invalidation runs after commit, so a request racing the write cannot re-cache the old result
+
+
+@receiver(post_save, sender=WatchHistory)
+@receiver(post_delete, sender=WatchHistory)
+def watch_history_changed(sender, instance, **kwargs):
+    # Recorded in the write's transaction; the dispatcher only sees it, and writes the WATCHED edge, after commit
+    publish_watches_changed([(instance.user_id, instance.movie_id)])
+    # Both strategies hide movies the user has already watched
+    user_ids = [instance.user_id]
+    transaction.on_commit(lambda: invalidate_user_recommendations(user_ids, ['user-based', 'follow-based']))
+
+
+@receiver(m2m_changed, sender=Actor.followers.through)
+@receiver(m2m_changed, sender=Director.followers.through)
+def follows_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action == 'pre_clear' and not reverse:
+        # The followers are gone by post_clear, so remember them now
+        instance._cleared_follower_ids = list(instance.followers.values_list('id', flat=True))
+        return
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+
+    if reverse:
+        user_ids = [instance.pk]
+    elif action == 'post_clear':
+        user_ids = getattr(instance, '_cleared_follower_ids', [])
+    else:
+        user_ids = list(pk_set)
+    transaction.on_commit(lambda: invalidate_user_recommendations(user_ids, ['follow-based']))
+
+
+@receiver(post_save, sender=Movie)
+@receiver(post_delete, sender=Movie)
+def movie_changed(sender, instance, **kwargs):
+    # Only results for or containing this movie show its fields; vector changes bump everything on dispatch
+    movie_ids = [instance.pk]
+    transaction.on_commit(lambda: invalidate_movies(movie_ids))
+
+
+@receiver(m2m_changed, sender=Movie.genres.through)
+def movie_genres_changed(sender, action, **kwargs):
+    # A movie gaining a genre can enter any genre-filtered result, so this one stays global
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        transaction.on_commit(invalidate_movie_recommendations)
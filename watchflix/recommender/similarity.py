@@ -0,0 +1,211 @@
+import heapq
+import itertools
+import logging
+import math
+import time
+from collections import Counter, defaultdict
+from django.conf import settings
+from django.db.models import Avg, Count, Max, Sum
+from watch_history.models import WatchHistory
+from .models import MovieSimilarityState, UserCoWatchState
+from .utils import chunked
+
+logger = logging.getLogger(__name__)
+
+
+class CoWatchSimilarityJob:
+    """
+    Materialises each movie's top-N co-watched neighbours as
+    (:Movie)-[:SIMILAR {score, co_watchers}]->(:Movie) edges.
+
+    The score is the cosine similarity of the two movies' watcher sets,
+    co_watchers / sqrt(watchers_a * watchers_b). Only movies whose watch set
+    changed since the last run are recomputed, tracked in MovieSimilarityState,
+    along with every movie co-watched with one whose watchers changed and every
+    movie watched by a user whose history changed (tracked in
+    UserCoWatchState), since their scores moved too. When that covers more than
+    SIMILAR_MOVIES_MAX_INCREMENTAL of the watched movies, every movie is
+    recomputed instead.
+    """
+
+    write_query = """
+    UNWIND $rows AS row
+    MATCH (m:Movie {id: row.movie_id})
+    SET m.avg_rating = row.avg_rating, m.popularity = row.popularity
+    WITH m, row
+    CALL {
+        WITH m
+        MATCH (m)-[old:SIMILAR]->()
+        DELETE old
+    }
+    WITH m, row
+    UNWIND row.neighbors AS neighbor
+    MATCH (other:Movie {id: neighbor.id})
+    CREATE (m)-[:SIMILAR {score: neighbor.score, co_watchers: neighbor.co_watchers}]->(other)
+    """
+
+    def __init__(self, recommender, top_n=None, min_co_watchers=None, max_incremental=None, batch_size=500):
+        self.recommender = recommender
+        self.top_n = top_n or settings.SIMILAR_MOVIES_TOP_N
+        self.min_co_watchers = min_co_watchers or settings.SIMILAR_MOVIES_MIN_CO_WATCHERS
+        self.max_incremental = max_incremental or settings.SIMILAR_MOVIES_MAX_INCREMENTAL
+        self.batch_size = batch_size
+
+    def run(self, full=False):
+        started = time.perf_counter()
+        watch_stats = self._watch_stats()
+        user_signatures = self._user_signatures()
+        watchers_by_movie, movies_by_user = self._watch_graph()
+        previous = dict(MovieSimilarityState.objects.values_list('movie_id', 'watch_signature'))
+        previous_users = dict(UserCoWatchState.objects.values_list('user_id', 'watch_signature'))
+
+        changed_users = [
+            user_id for user_id, signature in user_signatures.items() if previous_users.get(user_id) != signature
+        ]
+        changed = None
+        if not full:
+            limit = int(len(watch_stats) * self.max_incremental)
+            changed = self._affected(
+                watch_stats, previous, changed_users, watchers_by_movie, movies_by_user, limit,
+            )
+            if changed is None:
+                logger.info(f"More than {limit} movies are affected, recomputing all of them.")
+        if changed is None:
+            changed = set(watch_stats)
+        changed = sorted(changed)
+        # Movies that lost every watch still have edges to drop
+        removed = [movie_id for movie_id in previous if movie_id not in watch_stats]
+        watchers = {movie_id: stats['watchers'] for movie_id, stats in watch_stats.items()}
+
+        for batch in chunked(changed + removed, self.batch_size):
+            neighbors = self.neighbors(
+                [movie_id for movie_id in batch if movie_id in watch_stats], watchers_by_movie, movies_by_user,
+            )
+            rows = [
+                {
+                    'movie_id': movie_id,
+                    'avg_rating': watch_stats[movie_id]['avg_rating'] if movie_id in watch_stats else None,
+                    'popularity': watchers.get(movie_id, 0),
+                    'neighbors': neighbors.get(movie_id, []),
+                }
+                for movie_id in batch
+            ]
+            self.recommender._execute_write(self.recommender._run_query, self.write_query, rows=rows)
+
+        self._save_state(changed, removed, watch_stats)
+        self._save_user_state(changed_users, user_signatures, previous_users)
+        elapsed = time.perf_counter() - started
+        logger.info(
+            f"Recomputed SIMILAR edges for {len(changed)} movies, cleared {len(removed)} "
+            f"({len(watch_stats) - len(changed)} unchanged) in {elapsed:.1f}s."
+        )
+        return {'recomputed': len(changed), 'cleared': len(removed), 'unchanged': len(watch_stats) - len(changed)}
+
+    @staticmethod
+    def _affected(watch_stats, previous, changed_users, watchers_by_movie, movies_by_user, limit):
+        """Movies whose neighbours may have moved, or None once there are more than `limit`."""
+        changed = {
+            movie_id for movie_id, stats in watch_stats.items()
+            if previous.get(movie_id) != stats['signature']
+        }
+        # Only a change in who watched a movie moves its scores; a rating edit just rewrites avg_rating
+        moved = [
+            movie_id for movie_id in changed
+            if previous.get(movie_id) is None
+            or previous[movie_id].rsplit(':', 1)[0] != watch_stats[movie_id]['signature'].rsplit(':', 1)[0]
+        ]
+        # A user's new or removed watch changes its co-watch count with everything else they watched.
+        # Scores are normalised by both movies' watcher counts, so whatever is co-watched with a movie
+        # whose watchers changed moves too
+        expansions = itertools.chain(
+            (movies_by_user.get(user_id, ()) for user_id in changed_users),
+            (movies_by_user[user_id] for movie_id in moved for user_id in watchers_by_movie.get(movie_id, ())),
+        )
+        for movies in expansions:
+            if len(changed) > limit:
+                return None
+            changed.update(movies)
+        return changed if len(changed) <= limit else None
+
+    def _watch_stats(self):
+        # Cheap per-movie fingerprint of the watch set, computed by the database
+        rows = (
+            WatchHistory.objects.order_by().values('movie_id')
+            .annotate(
+                records=Count('id'), watchers=Count('user_id', distinct=True), user_sum=Sum('user_id'),
+                last_id=Max('id'), rating_sum=Sum('rating'), avg_rating=Avg('rating'),
+            )
+        )
+        return {
+            row['movie_id']: {
+                'signature': f"{row['records']}:{row['user_sum']}:{row['last_id']}:{row['rating_sum']}",
+                'watchers': row['watchers'],
+                'avg_rating': float(row['avg_rating']) if row['avg_rating'] is not None else None,
+            }
+            for row in rows
+        }
+
+    @staticmethod
+    def _user_signatures():
+        # Co-watch counts only depend on who watched what, so ratings are left out
+        rows = (
+            WatchHistory.objects.order_by().values('user_id')
+            .annotate(records=Count('id'), movie_sum=Sum('movie_id'), last_id=Max('id'))
+        )
+        return {row['user_id']: f"{row['records']}:{row['movie_sum']}:{row['last_id']}" for row in rows}
+
+    @staticmethod
+    def _watch_graph():
+        """Who watched what, loaded once per run and shared by every batch."""
+        watchers_by_movie, movies_by_user = defaultdict(set), defaultdict(set)
+        rows = WatchHistory.objects.order_by().values_list('movie_id', 'user_id')
+        for movie_id, user_id in rows.iterator(chunk_size=10000):
+            watchers_by_movie[movie_id].add(user_id)
+            movies_by_user[user_id].add(movie_id)
+        return watchers_by_movie, movies_by_user
+
+    def neighbors(self, movie_ids, watchers_by_movie, movies_by_user):
+        """{movie_id: top-N neighbours} for a batch of movies."""
+        neighbors = {}
+        for movie_id in movie_ids:
+            co_watched = Counter()
+            for user_id in watchers_by_movie.get(movie_id, ()):
+                co_watched.update(movies_by_user[user_id])
+            co_watched.pop(movie_id, None)
+            watchers = len(watchers_by_movie[movie_id])
+            scored = (
+                (co / math.sqrt(watchers * len(watchers_by_movie[other_id])), other_id, co)
+                for other_id, co in co_watched.items() if co >= self.min_co_watchers
+            )
+            neighbors[movie_id] = [
+                {'id': other_id, 'score': score, 'co_watchers': co}
+                for score, other_id, co in heapq.nlargest(self.top_n, scored)
+            ]
+        return neighbors
+
+    @staticmethod
+    def _save_state(changed, removed, watch_stats):
+        MovieSimilarityState.objects.bulk_create(
+            [
+                MovieSimilarityState(movie_id=movie_id, watch_signature=watch_stats[movie_id]['signature'])
+                for movie_id in changed
+            ],
+            batch_size=1000,
+            update_conflicts=True,
+            unique_fields=['movie_id'],
+            update_fields=['watch_signature', 'updated_at'],
+        )
+        MovieSimilarityState.objects.filter(movie_id__in=removed).delete()
+
+    @staticmethod
+    def _save_user_state(changed_users, user_signatures, previous_users):
+        UserCoWatchState.objects.bulk_create(
+            [UserCoWatchState(user_id=user_id, watch_signature=user_signatures[user_id]) for user_id in changed_users],
+            batch_size=1000,
+            update_conflicts=True,
+            unique_fields=['user_id'],
+            update_fields=['watch_signature', 'updated_at'],
+        )
+        UserCoWatchState.objects.filter(
+            user_id__in=[user_id for user_id in previous_users if user_id not in user_signatures]
+        ).delete()
@@ -1,3 +1,550 @@
-from django.test import TestCase
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+from unittest import mock
+import numpy as np
+from django.contrib.auth.models import User
+from django.core.cache.backends.locmem import LocMemCache
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+from accounts.models import SubscriptionPlan, UserProfile
+from load_data.load_watch_history import update_movie_avg_ratings
+from movies.models import Actor, Movie
+from watch_history.models import WatchHistory
+from .models import OutboxEvent
+from .outbox import (
+    OUTBOX_HANDLERS, OutboxDispatcher, dispatch_graph_follows, dispatch_graph_users, dispatch_graph_watches, publish,
+    publish_user_changed, publish_watches_changed,
+)
+from .read_model import follow_feed_sort_key, paginate_follow_feed
+from .recommendation_cache import RecommendationCache
+from .similarity import CoWatchSimilarityJob
+from .utils import decode_cursor, encode_cursor
+from .vector_store import NumpyVectorStore
 
-# Create your tests here.
+
+class FakeGraph:
+    """Records the writes a handler sends to Neo4j."""
+
+    def __init__(self):
+        self.writes = []
+
+    def _run_query(self, tx, query, **params):
+        return []
+
+    def _execute_write(self, fn, query, **params):
+        self.writes.append((query, params))
+
+
+def create_profile(username):
+    plan, _ = SubscriptionPlan.objects.get_or_create(name='Basic', price=Decimal('9.99'))
+    return UserProfile.objects.create(
+        user=User.objects.create(username=username), birth_date='1990-01-01', subscription_plan=plan,
+    )
+
+
+def create_movie(title):
+    return Movie.objects.create(title=title, release_year=2000, duration=90, synopsis=title, imdb_id='tt0000001')
+
+
+class GraphHandlerTests(TestCase):
+    def setUp(self):
+        self.profile = create_profile('alice')
+        self.movie = create_movie('Heat')
+
+    def test_watches_send_float_ratings(self):
+        WatchHistory.objects.create(user=self.profile, movie=self.movie, rating=Decimal('4.50'))
+        graph = FakeGraph()
+        dispatch_graph_watches(graph, None, [{'user_id': self.profile.id, 'movie_id': self.movie.id}])
+
+        query, params = graph.writes[0]
+        row = params['rows'][0]
+        self.assertIs(type(row['rating']), float)
+        self.assertEqual(row['rating'], 4.5)
+        self.assertTrue(row['watched'])
+        # Missing endpoint nodes are merged rather than silently matched away
+        self.assertIn('MERGE (u:User {id: row.user_id})', query)
+        self.assertIn('MERGE (m:Movie {id: row.movie_id})', query)
+
+    def test_watches_keep_null_ratings_and_deletions(self):
+        other = create_movie('Ronin')
+        WatchHistory.objects.create(user=self.profile, movie=self.movie, rating=None)
+        graph = FakeGraph()
+        dispatch_graph_watches(graph, None, [
+            {'user_id': self.profile.id, 'movie_id': self.movie.id},
+            {'user_id': self.profile.id, 'movie_id': other.id},
+        ])
+
+        rows = {row['movie_id']: row for row in graph.writes[0][1]['rows']}
+        self.assertEqual((rows[self.movie.id]['watched'], rows[self.movie.id]['rating']), (True, None))
+        self.assertEqual((rows[other.id]['watched'], rows[other.id]['rating']), (False, None))
+
+    def test_follows_merge_person_with_its_properties(self):
+        actor = Actor.objects.create(first_name='Al', last_name='Pacino', birth_year=1940)
+        actor.followers.add(self.profile)
+        graph = FakeGraph()
+        dispatch_graph_follows(graph, None, [{'user_id': self.profile.id, 'label': 'Actor', 'person_id': actor.id}])
+
+        query, params = graph.writes[0]
+        self.assertIn('MERGE (p:Actor {id: row.person_id})', query)
+        row = params['rows'][0]
+        self.assertTrue(row['following'])
+        self.assertEqual(row['person']['last_name'], 'Pacino')
+
+
+class LoadWatchHistoryTests(TestCase):
+    def test_avg_ratings_publish_movie_events(self):
+        profile = create_profile('alice')
+        rated, unrated = create_movie('Heat'), create_movie('Ronin')
+        WatchHistory.objects.create(user=profile, movie=rated, rating=Decimal('4.00'))
+        OutboxEvent.objects.all().delete()
+
+        update_movie_avg_ratings({rated.id: rated, unrated.id: unrated})
+
+        self.assertEqual(
+            set(OutboxEvent.objects.values_list('idempotency_key', flat=True)),
+            {f'graph.movie:{rated.id}', f'vector.movie:{rated.id}'},
+        )
+
+
+class FakeHandlers:
+    """Stands in for the outbox handlers, recording each group and failing the given event types."""
+
+    def __init__(self, fail=()):
+        self.calls = []
+        self.fail = set(fail)
+        self.handlers = {event_type: self._handler(event_type) for event_type in OUTBOX_HANDLERS}
+
+    def _handler(self, event_type):
+        def handle(graph, vector, payloads):
+            self.calls.append((event_type, payloads))
+            if event_type in self.fail:
+                raise RuntimeError('neo4j unavailable')
+        return handle
+
+
+@override_settings(OUTBOX_RETRY_BASE_DELAY=5, OUTBOX_RETRY_MAX_DELAY=60, OUTBOX_RETENTION=3600)
+class OutboxDispatcherTests(TestCase):
+    def setUp(self):
+        self.fake = FakeHandlers()
+        patcher = mock.patch.dict(OUTBOX_HANDLERS, self.fake.handlers)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.dispatcher = OutboxDispatcher(None, None, batch_size=10, max_attempts=3)
+
+    def _make_available(self):
+        OutboxEvent.objects.update(available_at=timezone.now() - timedelta(seconds=1))
+
+    def test_claim_takes_available_events_in_order(self):
+        for user_id in range(12):
+            publish_user_changed(user_id)
+        OutboxEvent.objects.filter(idempotency_key='graph.user:0').update(
+            available_at=timezone.now() + timedelta(minutes=1),
+        )
+
+        claimed = self.dispatcher.claim()
+        self.assertEqual([event.payload['id'] for event in claimed], list(range(1, 11)))
+        self.assertTrue(all(event.status == OutboxEvent.IN_PROGRESS for event in claimed))
+        self.assertEqual(OutboxEvent.objects.filter(status=OutboxEvent.PENDING).count(), 2)
+
+    def test_pending_keys_collapse(self):
+        publish_user_changed(1)
+        publish_user_changed(1)
+        self.assertEqual(OutboxEvent.objects.count(), 1)
+
+    def test_groups_dispatch_nodes_before_edges(self):
+        publish_watches_changed([(1, 10), (2, 10)])
+        publish_user_changed(1)
+        publish_user_changed(2)
+
+        self.assertEqual(self.dispatcher.dispatch_once(), (4, 0))
+        self.assertEqual([event_type for event_type, _ in self.fake.calls], ['graph.user', 'graph.watched'])
+        self.assertEqual(len(self.fake.calls[1][1]), 2)
+        self.assertFalse(OutboxEvent.objects.exclude(status=OutboxEvent.DISPATCHED).exists())
+
+    def test_failed_group_backs_off_without_blocking_others(self):
+        self.fake.fail.add('graph.watched')
+        publish_user_changed(1)
+        publish_watches_changed([(1, 10)])
+
+        self.assertEqual(self.dispatcher.dispatch_once(), (1, 1))
+        event = OutboxEvent.objects.get(event_type='graph.watched')
+        self.assertEqual((event.status, event.attempts), (OutboxEvent.PENDING, 1))
+        self.assertIn('neo4j unavailable', event.last_error)
+        self.assertGreater(event.available_at, timezone.now() + timedelta(seconds=3))
+        # Not retried before its backoff runs out
+        self.assertEqual(self.dispatcher.dispatch_once(), (0, 0))
+
+        self._make_available()
+        self.assertEqual(self.dispatcher.dispatch_once(), (0, 1))
+        event.refresh_from_db()
+        self.assertGreater(event.available_at, timezone.now() + timedelta(seconds=8))
+
+        self._make_available()
+        self.dispatcher.dispatch_once()
+        event.refresh_from_db()
+        self.assertEqual((event.status, event.attempts), (OutboxEvent.FAILED, 3))
+
+        self.assertEqual(self.dispatcher.requeue_failed(), 1)
+        event.refresh_from_db()
+        self.assertEqual((event.status, event.attempts), (OutboxEvent.PENDING, 0))
+
+    def test_unknown_event_type_fails_its_group(self):
+        publish('graph.unknown', {}, 'graph.unknown:1')
+        self.assertEqual(self.dispatcher.dispatch_once(), (0, 1))
+
+    def test_failure_with_newer_pending_event_is_superseded(self):
+        publish_user_changed(1)
+        claimed = self.dispatcher.claim()
+        # The user changes again while the first event is in flight
+        publish_user_changed(1)
+
+        self.dispatcher._retry(claimed, 'neo4j unavailable')
+        old = OutboxEvent.objects.get(id=claimed[0].id)
+        self.assertEqual(old.status, OutboxEvent.SUPERSEDED)
+        self.assertIsNotNone(old.dispatched_at)
+        self.assertEqual(OutboxEvent.objects.filter(status=OutboxEvent.PENDING).count(), 1)
+
+    def test_recover_requeues_or_supersedes_stuck_events(self):
+        publish_user_changed(1)
+        publish_user_changed(2)
+        stuck = {event.payload['id']: event for event in self.dispatcher.claim()}
+        publish_user_changed(2)
+
+        self.assertEqual(self.dispatcher.recover(), 1)
+        self.assertEqual(OutboxEvent.objects.get(id=stuck[1].id).status, OutboxEvent.PENDING)
+        self.assertEqual(OutboxEvent.objects.get(id=stuck[2].id).status, OutboxEvent.SUPERSEDED)
+
+    def test_purge_drops_old_finished_events(self):
+        for user_id in range(3):
+            publish_user_changed(user_id)
+        self.dispatcher.dispatch_once()
+        old, recent, _ = OutboxEvent.objects.order_by('id')
+        OutboxEvent.objects.filter(id=old.id).update(dispatched_at=timezone.now() - timedelta(hours=2))
+        OutboxEvent.objects.filter(id=recent.id).update(status=OutboxEvent.FAILED, dispatched_at=None)
+
+        self.assertEqual(self.dispatcher.purge(), 1)
+        self.assertEqual(OutboxEvent.objects.count(), 2)
+
+    def test_run_drains_into_the_graph(self):
+        profile = create_profile('alice')
+        movie = create_movie('Heat')
+        OutboxEvent.objects.all().delete()
+        publish_user_changed(profile.id)
+        WatchHistory.objects.create(user=profile, movie=movie, rating=Decimal('3.50'))
+
+        graph = FakeGraph()
+        handlers = {'graph.user': dispatch_graph_users, 'graph.watched': dispatch_graph_watches}
+        with mock.patch.dict(OUTBOX_HANDLERS, handlers):
+            totals = OutboxDispatcher(graph, None).run()
+
+        self.assertEqual(totals, {'dispatched': 2, 'failed': 0})
+        (user_query, user_params), (watch_query, watch_params) = graph.writes
+        self.assertIn('MERGE (u:User {id: row.id})', user_query)
+        self.assertEqual(user_params['rows'][0]['username'], 'alice')
+        # Written as a Neo4j date, as the bulk loader does
+        self.assertEqual(user_params['rows'][0]['date_of_birth'], date(1990, 1, 1))
+        self.assertEqual(watch_params['rows'], [
+            {'user_id': profile.id, 'movie_id': movie.id, 'watched': True, 'rating': 3.5},
+        ])
+
+
+class CoWatchSimilarityJobTests(TestCase):
+    def setUp(self):
+        self.movies = [create_movie(f'Movie {i}') for i in range(8)]
+        self.profiles = [create_profile(f'user{i}') for i in range(6)]
+        # Users 0-3 watch overlapping runs of movies 0-5; users 4 and 5 only watch movies 6 and 7
+        watched = [self.movies[i:i + 3] for i in range(4)] + [self.movies[6:], self.movies[6:]]
+        for profile, movies in zip(self.profiles, watched):
+            for movie in movies:
+                WatchHistory.objects.create(user=profile, movie=movie, rating=Decimal('3.00'))
+
+    def _edges(self, graph):
+        return {
+            row['movie_id']: [(neighbor['id'], round(neighbor['score'], 9)) for neighbor in row['neighbors']]
+            for _, params in graph.writes for row in params['rows']
+        }
+
+    def _run(self, **kwargs):
+        graph = FakeGraph()
+        result = CoWatchSimilarityJob(graph, top_n=3, min_co_watchers=1, **kwargs).run()
+        return result, self._edges(graph)
+
+    def test_rating_edit_only_rewrites_its_movie(self):
+        self._run(max_incremental=1)
+        WatchHistory.objects.filter(movie=self.movies[0]).update(rating=Decimal('5.00'))
+
+        result, edges = self._run(max_incremental=1)
+        self.assertEqual(result['recomputed'], 1)
+        self.assertEqual(list(edges), [self.movies[0].id])
+
+    def test_incremental_run_matches_full_run(self):
+        _, edges = self._run(max_incremental=1)
+        WatchHistory.objects.create(user=self.profiles[0], movie=self.movies[5], rating=Decimal('4.00'))
+
+        result, changed = self._run(max_incremental=1)
+        self.assertEqual(result['recomputed'], 6)
+        edges.update(changed)
+        graph = FakeGraph()
+        CoWatchSimilarityJob(graph, top_n=3, min_co_watchers=1).run(full=True)
+        self.assertEqual(edges, self._edges(graph))
+
+    def test_falls_back_to_full_run_past_the_limit(self):
+        self._run(max_incremental=1)
+        WatchHistory.objects.create(user=self.profiles[0], movie=self.movies[5], rating=Decimal('4.00'))
+
+        result, _ = self._run(max_incremental=0.1)
+        self.assertEqual(result['recomputed'], len(self.movies))
+
+
+class NumpyVectorStoreTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = directory.name
+        self.store = NumpyVectorStore(f'{self.path}/store')
+        self.store.create_collection('movies', 8)
+
+        rng = np.random.default_rng(0)
+        self.vectors = {}
+        # Several small upserts, so searches span merged and unmerged segments
+        for start in range(0, 100, 10):
+            ids = list(range(start, start + 10))
+            vectors = rng.normal(size=(10, 8))
+            self.store.upsert('movies', ids, vectors, [{'id': id_, 'genres': ['Drama' if id_ % 2 else 'Comedy']} for id_ in ids])
+            self.vectors.update(zip(ids, vectors))
+        self.query = rng.normal(size=8)
+
+    def _brute_force(self, top_k, keep=lambda id_: True):
+        query = self.query / np.linalg.norm(self.query)
+        scores = {
+            id_: float(vector @ query / np.linalg.norm(vector))
+            for id_, vector in self.vectors.items() if keep(id_)
+        }
+        return sorted(scores, key=scores.get, reverse=True)[:top_k]
+
+    def _ids(self, results):
+        return [payload['id'] for payload in results]
+
+    def test_search_matches_brute_force(self):
+        self.assertEqual(self._ids(self.store.search('movies', self.query, top_k=10)), self._brute_force(10))
+        self.assertEqual(
+            self._ids(self.store.search('movies', self.query, top_k=5, genres=['Drama'], exclude_ids=[1, 3])),
+            self._brute_force(5, lambda id_: id_ % 2 and id_ not in (1, 3)),
+        )
+        batch = self.store.search_batch('movies', [self.query, -self.query], top_k=10)
+        self.assertEqual(self._ids(batch[0]), self._brute_force(10))
+
+    def test_delete(self):
+        deleted = self._brute_force(3)
+        self.store.delete('movies', deleted)
+
+        self.assertEqual(self.store.retrieve('movies', deleted[0]), (None, None))
+        for id_ in deleted:
+            del self.vectors[id_]
+        self.assertEqual(self._ids(self.store.search('movies', self.query, top_k=10)), self._brute_force(10))
+
+    def test_reupsert_replaces_vector_and_payload(self):
+        self.store.delete('movies', [42])
+        self.store.upsert('movies', [42, 7], [self.query, -self.query], [{'id': 42, 'genres': []}, {'id': 7, 'genres': []}])
+        self.vectors.update({42: self.query, 7: -self.query})
+
+        results = self.store.search('movies', self.query, top_k=100)
+        self.assertEqual(self._ids(results)[0], 42)
+        self.assertEqual(self._ids(results)[-1], 7)
+        self.assertEqual(len(results), 100)
+        vector, payload = self.store.retrieve('movies', 42)
+        self.assertEqual(payload, {'id': 42, 'genres': []})
+        np.testing.assert_allclose(vector, self.query / np.linalg.norm(self.query), rtol=1e-5)
+        self.assertEqual(self._ids(self.store.search('movies', self.query, top_k=10)), self._brute_force(10))
+
+    def test_save_and_load(self):
+        self.store.delete('movies', [0])
+        del self.vectors[0]
+        self.store.save_collection('movies', f'{self.path}/snapshot')
+
+        loaded = NumpyVectorStore(f'{self.path}/other')
+        loaded.load_collection('movies', f'{self.path}/snapshot')
+        self.assertTrue(loaded.collection_exists('movies'))
+        self.assertEqual(self._ids(loaded.search('movies', self.query, top_k=100)), self._brute_force(100))
+        self.assertEqual(loaded.retrieve('movies', 0), (None, None))
+
+
+class RecommendationCacheTests(SimpleTestCase):
+    def setUp(self):
+        self.backend = LocMemCache('recommendation-cache-tests', {})
+        self.backend.clear()
+        self.cache = RecommendationCache(
+            backend=self.backend, stale_ttl=60, negative_ttl=30, lock_timeout=5, refresh_workers=1,
+        )
+        self.calls = []
+
+    def _compute(self, value):
+        def compute():
+            self.calls.append(value)
+            return value
+        return compute
+
+    def test_hit_does_not_recompute(self):
+        self.assertEqual(self.cache.get_or_compute('key', self._compute([1]), ttl=60), [1])
+        self.assertEqual(self.cache.get_or_compute('key', self._compute([2]), ttl=60), [1])
+        self.assertEqual(self.calls, [[1]])
+        self.assertEqual(self.cache.get_many(['key', 'missing']), {'key': [1]})
+
+    def test_single_flight(self):
+        started, release = threading.Event(), threading.Event()
+
+        def slow():
+            self.calls.append('slow')
+            started.set()
+            release.wait(5)
+            return [1]
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(self.cache.get_or_compute('key', slow, ttl=60)))]
+        threads[0].start()
+        started.wait(5)
+        threads += [
+            threading.Thread(target=lambda: results.append(self.cache.get_or_compute('key', self._compute([2]), ttl=60)))
+            for _ in range(4)
+        ]
+        for thread in threads[1:]:
+            thread.start()
+        # Release the computation once every other request is waiting on it
+        while self.cache.stats()['waits'] < 4:
+            time.sleep(0.01)
+        release.set()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(results, [[1]] * 5)
+        self.assertEqual(self.calls, ['slow'])
+
+    def test_stale_value_served_while_revalidating(self):
+        self.cache.set('key', [1], ttl=0)
+
+        self.assertEqual(self.cache.get_or_compute('key', self._compute([2]), ttl=60), [1])
+        self.cache._executor.shutdown(wait=True)
+        self.assertEqual(self.calls, [[2]])
+        self.assertEqual(self.cache.get_or_compute('key', self._compute([3]), ttl=60), [2])
+        self.assertEqual(self.cache.stats()['background_refreshes'], 1)
+        self.assertIsNone(self.backend.get('key:refresh_lock'))
+
+    def test_stale_value_kept_when_revalidation_fails(self):
+        self.cache.set('key', [1], ttl=0)
+
+        def boom():
+            raise RuntimeError('neo4j unavailable')
+
+        self.assertEqual(self.cache.get_or_compute('key', boom, ttl=60), [1])
+        self.cache._executor.shutdown(wait=True)
+        self.assertEqual(self.backend.get('key')['value'], [1])
+        self.assertIsNone(self.backend.get('key:refresh_lock'))
+
+    def test_negative_results_are_cached_briefly(self):
+        self.assertEqual(self.cache.get_or_compute('key', self._compute([]), ttl=3600), [])
+        self.assertEqual(self.cache.get_or_compute('key', self._compute([1]), ttl=3600), [])
+        self.assertEqual(self.calls, [[]])
+
+        entry = self.backend.get('key')
+        self.assertTrue(entry['negative'])
+        self.assertLessEqual(entry['fresh_until'], time.time() + 30)
+        self.assertEqual(self.cache.stats()['negative_hits'], 1)
+
+    def test_exceptions_are_not_cached(self):
+        def boom():
+            raise RuntimeError('neo4j unavailable')
+
+        with self.assertRaises(RuntimeError):
+            self.cache.get_or_compute('key', boom, ttl=60)
+        self.assertIsNone(self.backend.get('key'))
+        self.assertIsNone(self.backend.get('key:refresh_lock'))
+        # The next request computes again instead of waiting on a stale lock
+        self.assertEqual(self.cache.get_or_compute('key', self._compute([1]), ttl=60), [1])
+        self.assertEqual(self.cache.stats()['refresh_errors'], 1)
+
+    def test_is_current_rejects_outdated_entries(self):
+        self.cache.set('key', [1], ttl=60, computed_at=1)
+
+        value = self.cache.get_or_compute(
+            'key', self._compute([2]), ttl=60,
+            is_current=lambda entries: {key for key, (_, computed_at) in entries.items() if computed_at > 1},
+        )
+        self.assertEqual(value, [2])
+
+
+class FollowFeedPaginationTests(SimpleTestCase):
+    def setUp(self):
+        # Ranked by avg_rating, then popularity, then id; the ratings and popularities tie in runs
+        ranks = [(4.5, 9), (4.5, 9), (4.5, 2), (3.0, 5), (3.0, 5)] + [(None, 1)] * 5
+        self.feed = [
+            {'id': id_, 'avg_rating': avg_rating, 'popularity': popularity}
+            for id_, (avg_rating, popularity) in enumerate(ranks)
+        ]
+
+    def _pages(self, feed, limit):
+        pages, cursor = [], None
+        while True:
+            page, cursor = paginate_follow_feed(feed, cursor, limit)
+            pages.append([movie['id'] for movie in page])
+            if cursor is None:
+                return pages
+
+    def test_cursor_round_trip(self):
+        self.assertEqual(decode_cursor(encode_cursor([-4.5, -9, 1])), [-4.5, -9, 1])
+        with self.assertRaises(ValueError):
+            decode_cursor('not a cursor')
+
+    def test_pages_cover_the_feed_once(self):
+        self.assertEqual(self._pages(self.feed, 3), [[0, 1, 2], [3, 4, 5], [6, 7, 8], [9]])
+        self.assertEqual(self._pages(self.feed, 10), [list(range(10))])
+
+    def test_ties_break_on_id(self):
+        page, cursor = paginate_follow_feed(self.feed, None, 1)
+        self.assertEqual(decode_cursor(cursor), follow_feed_sort_key(self.feed[0]))
+        page, _ = paginate_follow_feed(self.feed, cursor, 1)
+        # Movie 1 has the same rating and popularity as movie 0, and follows it on id
+        self.assertEqual(page[0]['id'], 1)
+
+    def test_refreshed_feed_neither_repeats_nor_skips(self):
+        _, cursor = paginate_follow_feed(self.feed, None, 3)
+        refreshed = [movie for movie in self.feed if movie['id'] != 1]
+        page, _ = paginate_follow_feed(refreshed, cursor, 3)
+        self.assertEqual([movie['id'] for movie in page], [3, 4, 5])
+
+    def test_invalid_cursors(self):
+        for after in (['a', 'b', 'c'], [1, None, 2], [True, 1, 2], {'a': 1}, [1, 2]):
+            with self.subTest(after=after), self.assertRaises(ValueError):
+                paginate_follow_feed(self.feed, encode_cursor(after), 3)
+        with self.assertRaises(ValueError):
+            paginate_follow_feed(self.feed, '!!', 3)
+
+
+class FollowFeedViewTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(create_profile('alice').user)
+        self.url = reverse('neo4j-follow-based-recommendations', args=['alice'])
+        feed = [{'id': id_, 'avg_rating': 4.0, 'popularity': 1, 'genres': ['Drama']} for id_ in range(5)]
+        patcher = mock.patch('recommender.views.get_user_recommendations', return_value=feed)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_next_cursor_continues_the_feed(self):
+        response = self.client.get(self.url, {'limit': 3})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([movie['id'] for movie in response.data['recommendations']], [0, 1, 2])
+
+        response = self.client.get(self.url, {'limit': 3, 'cursor': response.data['next_cursor']})
+        self.assertEqual([movie['id'] for movie in response.data['recommendations']], [3, 4])
+        self.assertIsNone(response.data['next_cursor'])
+
+    def test_invalid_cursor_is_a_bad_request(self):
+        for cursor in ('!!', encode_cursor(['a', 'b', 'c'])):
+            response = self.client.get(self.url, {'cursor': cursor})
+            self.assertEqual(response.status_code, 400)
+            self.assertIn('Invalid cursor', response.data['error'])
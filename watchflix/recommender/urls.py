@@ -1,18 +1,26 @@
 from django.urls import path
 from .views import (
+    ReadinessView,
+    RecommenderStatsView,
     LoadNeo4jDataView,
     LoadQdrantDataView,
+    JobStatusView,
     Neo4jContentBasedRecommendationView,
     Neo4jUserBasedRecommendationView,
     Neo4jFollowBasedRecommendationView,
-    QdrantContentBasedRecommendationView
+    QdrantContentBasedRecommendationView,
+    QdrantBatchContentBasedRecommendationView
 )
 
 urlpatterns = [
+    path('ready/', ReadinessView.as_view(), name='recommender-ready'),
+    path('stats/', RecommenderStatsView.as_view(), name='recommender-stats'),
     path('neo4j/load-data/', LoadNeo4jDataView.as_view(), name='neo4j-load-data'),
     path('qdrant/load-data/', LoadQdrantDataView.as_view(), name='qdrant-load-data'),
+    path('jobs/<int:job_id>/', JobStatusView.as_view(), name='recommender-job-status'),
     path('neo4j/content-based/<int:movie_id>/', Neo4jContentBasedRecommendationView.as_view(), name='neo4j-content-based-recommendations'),
     path('neo4j/user-based/<str:username>/', Neo4jUserBasedRecommendationView.as_view(), name='neo4j-user-based-recommendations'),
     path('neo4j/follow-based/<str:username>/', Neo4jFollowBasedRecommendationView.as_view(), name='neo4j-follow-based-recommendations'),
     path('qdrant/content-based/<int:movie_id>/', QdrantContentBasedRecommendationView.as_view(), name='qdrant-content-based-recommendations'),
+    path('qdrant/content-based/batch/', QdrantBatchContentBasedRecommendationView.as_view(), name='qdrant-content-based-recommendations-batch'),
 ]
\ No newline at end of file
@@ -0,0 +1,87 @@
+import base64
+import json
+import os
+from contextlib import contextmanager
+from itertools import islice
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+def chunked(iterable, size):
+    """Yield lists of up to `size` items from an iterable without materialising it."""
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def save_array_bundle(directory, arrays, meta):
+    """
+    Save named arrays as .npy files plus a meta.json, each swapped in atomically.
+
+    meta.json is written last, so readers that watch it only ever see complete bundles.
+    """
+    os.makedirs(directory, exist_ok=True)
+    for name, array in arrays.items():
+        tmp_path = os.path.join(directory, f'.{name}.npy.tmp')
+        with open(tmp_path, 'wb') as f:
+            np.save(f, array)
+        os.replace(tmp_path, os.path.join(directory, f'{name}.npy'))
+
+    tmp_path = os.path.join(directory, '.meta.json.tmp')
+    with open(tmp_path, 'w') as f:
+        json.dump(meta, f)
+    os.replace(tmp_path, os.path.join(directory, 'meta.json'))
+
+
+def load_array_bundle(directory, names):
+    """Memory-map arrays saved by save_array_bundle; returns (arrays, meta, meta mtime)."""
+    meta_path = os.path.join(directory, 'meta.json')
+    mtime = os.stat(meta_path).st_mtime_ns
+    with open(meta_path) as f:
+        meta = json.load(f)
+    # mmap_mode='r' shares the pages between every worker on the host
+    arrays = {name: np.load(os.path.join(directory, f'{name}.npy'), mmap_mode='r') for name in names}
+    return arrays, meta, mtime
+
+
+def bundle_mtime(directory):
+    try:
+        return os.stat(os.path.join(directory, 'meta.json')).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+
+@contextmanager
+def file_lock(path):
+    """Hold an exclusive lock on `path` (created if missing), shared by every process on the host."""
+    with open(path, 'a+b') as f:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def encode_cursor(values):
+    """Opaque pagination cursor for a JSON-serialisable sort key."""
+    return base64.urlsafe_b64encode(json.dumps(values).encode('utf-8')).decode('ascii')
+
+
+def decode_cursor(cursor):
+    try:
+        return json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+    except (ValueError, UnicodeError) as e:
+        raise ValueError(f"Invalid cursor '{cursor}'.") from e
@@ -0,0 +1,458 @@
+import json
+import os
+import shutil
+import threading
+import uuid
+from contextlib import contextmanager
+import numpy as np
+from django.conf import settings
+from qdrant_client.http import models
+from .clients import get_qdrant_client
+from .utils import file_lock
+
+MANIFEST = 'manifest.json'
+
+
+class QdrantVectorStore:
+    """Vector store backed by a Qdrant server; genre and id filters run inside the HNSW search."""
+
+    def __init__(self, client=None):
+        self.client = client or get_qdrant_client()
+
+    def collection_exists(self, collection_name):
+        return self.client.collection_exists(collection_name)
+
+    def create_collection(self, collection_name, dimension):
+        if self.client.collection_exists(collection_name):
+            self.client.delete_collection(collection_name)
+        self.client.create_collection(
+            collection_name=collection_name,
+            vectors_config=models.VectorParams(
+                size=dimension,
+                distance=models.Distance.COSINE,
+                on_disk=True
+                ),
+            quantization_config=models.ScalarQuantization(
+            scalar=models.ScalarQuantizationConfig(
+                type=models.ScalarType.INT8,
+                always_ram=True,
+                ),
+            ),
+        )
+        self.ensure_payload_index(collection_name)
+
+    def ensure_payload_index(self, collection_name):
+        if 'genres' in (self.client.get_collection(collection_name).payload_schema or {}):
+            return
+        self.client.create_payload_index(
+            collection_name=collection_name,
+            field_name="genres",
+            field_schema=models.PayloadSchemaType.KEYWORD,
+        )
+
+    def upsert(self, collection_name, ids, vectors, payloads):
+        points = [
+            models.PointStruct(id=id_, vector=list(map(float, vector)), payload=payload)
+            for id_, vector, payload in zip(ids, vectors, payloads)
+        ]
+        self.client.upload_points(collection_name=collection_name, points=points)
+
+    def set_payloads(self, collection_name, ids, payloads):
+        """Replace the payloads of existing points without touching their vectors."""
+        self.client.batch_update_points(
+            collection_name=collection_name,
+            update_operations=[
+                models.OverwritePayloadOperation(overwrite_payload=models.SetPayload(payload=payload, points=[id_]))
+                for id_, payload in zip(ids, payloads)
+            ],
+        )
+
+    def delete(self, collection_name, ids):
+        self.client.delete(collection_name=collection_name, points_selector=models.PointIdsList(points=list(ids)))
+
+    def retrieve(self, collection_name, doc_id):
+        points = self.client.retrieve(
+            collection_name=collection_name, ids=[doc_id], with_vectors=True, with_payload=True
+        )
+        if not points or points[0].vector is None:
+            return None, None
+        return points[0].vector, points[0].payload or {}
+
+    def retrieve_many(self, collection_name, doc_ids):
+        points = self.client.retrieve(
+            collection_name=collection_name, ids=list(doc_ids), with_vectors=True, with_payload=True
+        )
+        return {point.id: (point.vector, point.payload or {}) for point in points if point.vector is not None}
+
+    @staticmethod
+    def _filter(genres, exclude_ids):
+        if not genres and not exclude_ids:
+            return None
+        return models.Filter(
+            must=[
+                models.FieldCondition(key="genres", match=models.MatchValue(value=genre))
+                for genre in genres or []
+            ],
+            must_not=[models.HasIdCondition(has_id=list(exclude_ids))] if exclude_ids else None,
+        )
+
+    def search(self, collection_name, vector, top_k=10, genres=None, exclude_ids=None):
+        search_result = self.client.search(
+            collection_name=collection_name,
+            query_vector=vector,
+            limit=top_k,
+            search_params=models.SearchParams(exact=False),
+            query_filter=self._filter(genres, exclude_ids)
+        )
+        return [hit.payload for hit in search_result]
+
+    def search_batch(self, collection_name, vectors, top_k=10, genres_list=None, exclude_ids_list=None):
+        """Run several searches in one request; returns one payload list per vector."""
+        genres_list = genres_list or [None] * len(vectors)
+        exclude_ids_list = exclude_ids_list or [None] * len(vectors)
+        requests = [
+            models.SearchRequest(
+                vector=list(map(float, vector)),
+                limit=top_k,
+                filter=self._filter(genres, exclude_ids),
+                params=models.SearchParams(exact=False),
+                with_payload=True,
+            )
+            for vector, genres, exclude_ids in zip(vectors, genres_list, exclude_ids_list)
+        ]
+        results = self.client.search_batch(collection_name=collection_name, requests=requests)
+        return [[hit.payload for hit in hits] for hits in results]
+
+    def save_collection(self, collection_name, path):
+        self.client.export_collection(collection_name, path)
+
+    def load_collection(self, collection_name, path):
+        self.client.import_collection(collection_name, path)
+
+
+class _NumpySegment:
+    """An immutable block of rows: a memory-mapped vectors .npy plus its ids and payloads."""
+
+    def __init__(self, directory, name):
+        self.name = name
+        with open(os.path.join(directory, f'{name}.json')) as f:
+            data = json.load(f)
+        # Memory-map the matrix read-only so every worker shares the same pages
+        self.vectors = np.load(os.path.join(directory, f'{name}.npy'), mmap_mode='r')
+        self.ids = np.asarray(data['ids'], dtype=np.int64)
+        self.payloads = data['payloads']
+
+    @staticmethod
+    def write(directory, ids, vectors, payloads):
+        name = f'segment-{uuid.uuid4().hex}'
+        with open(os.path.join(directory, f'{name}.npy'), 'wb') as f:
+            np.save(f, np.asarray(vectors, dtype=np.float32))
+        with open(os.path.join(directory, f'{name}.json'), 'w') as f:
+            json.dump({'ids': [int(id_) for id_ in ids], 'payloads': payloads}, f)
+        return {'name': name, 'rows': len(ids)}
+
+
+class _NumpyCollection:
+    """
+    One version of a collection: the segments listed in its manifest.json.
+
+    Writers never modify a segment; they add new ones and swap in a new
+    manifest, and a changed manifest is loaded into a new instance, so a
+    reader always sees a consistent set of rows. Where an id appears in
+    several segments the last one wins, and ids in the manifest's `deleted`
+    list are hidden.
+    """
+
+    def __init__(self, directory, previous=None):
+        self.directory = directory
+        self.manifest_path = os.path.join(directory, MANIFEST)
+        # Segments are immutable, so the ones the previous version already mapped are reused
+        loaded = previous.segments_by_name if previous is not None else {}
+
+        # A writer removes segments two versions old, so a reader that raced two writes retries
+        for attempt in range(3):
+            with open(self.manifest_path) as f:
+                stat = os.fstat(f.fileno())
+                manifest, version = json.load(f), (stat.st_ino, stat.st_mtime_ns)
+            try:
+                segments = [
+                    loaded.get(entry['name']) or _NumpySegment(directory, entry['name'])
+                    for entry in manifest['segments']
+                ]
+                break
+            except FileNotFoundError:
+                if attempt == 2:
+                    raise
+
+        self.manifest = manifest
+        self.dimension = manifest['dimension']
+        self.segments = segments
+        self.segments_by_name = {segment.name: segment for segment in segments}
+        self.offsets = np.cumsum([0] + [len(segment.ids) for segment in segments])
+        self.ids = np.concatenate([segment.ids for segment in segments]) if segments else np.zeros(0, dtype=np.int64)
+        self.payloads = [payload for segment in segments for payload in segment.payloads]
+
+        self.row_by_id = {int(id_): row for row, id_ in enumerate(self.ids)}
+        for id_ in manifest['deleted']:
+            self.row_by_id.pop(id_, None)
+        self.live = np.zeros(len(self.ids), dtype=bool)
+        self.live[list(self.row_by_id.values())] = True
+
+        self.genre_index = {}
+        for payload in self.payloads:
+            for genre in payload.get('genres') or []:
+                self.genre_index.setdefault(genre, len(self.genre_index))
+        self.genre_matrix = np.zeros((len(self.payloads), len(self.genre_index)), dtype=bool)
+        for row, payload in enumerate(self.payloads):
+            for genre in payload.get('genres') or []:
+                self.genre_matrix[row, self.genre_index[genre]] = True
+
+        self.version = version
+
+    def is_stale(self):
+        stat = os.stat(self.manifest_path)
+        return (stat.st_ino, stat.st_mtime_ns) != self.version
+
+    def __len__(self):
+        return len(self.row_by_id)
+
+    def vector(self, row):
+        segment = int(np.searchsorted(self.offsets, row, side='right')) - 1
+        return self.segments[segment].vectors[row - self.offsets[segment]]
+
+    def scores(self, vectors):
+        """Dot products of a (k, dimension) query matrix against every row, as a (k, rows) matrix."""
+        if not self.segments:
+            return np.zeros((len(vectors), 0), dtype=np.float32)
+        return np.hstack([vectors @ segment.vectors.T for segment in self.segments])
+
+    def genre_columns(self, genres):
+        return [self.genre_index[genre] for genre in genres if genre in self.genre_index]
+
+
+class NumpyVectorStore:
+    """
+    Embedded vector store keeping float32 embeddings in memory-mapped .npy
+    segments with JSON payload sidecars.
+
+    Vectors are L2-normalised on write, so cosine similarity is a matrix
+    product and search is exact. Each write appends a segment (merging
+    trailing segments of similar size, so a full load rewrites every row
+    O(log N) times) and atomically replaces the manifest under a file lock
+    shared by all processes.
+    """
+
+    def __init__(self, path=None):
+        self.path = str(path or settings.VECTOR_STORE_PATH)
+        self._collections = {}
+        self._lock = threading.Lock()
+
+    def _directory(self, collection_name):
+        return os.path.join(self.path, collection_name)
+
+    def _collection(self, collection_name):
+        collection = self._collections.get(collection_name)
+        if collection is not None and not collection.is_stale():
+            return collection
+
+        with self._lock:
+            collection = self._collections.get(collection_name)
+            if collection is None or collection.is_stale():
+                collection = _NumpyCollection(self._directory(collection_name), previous=collection)
+                self._collections[collection_name] = collection
+        return collection
+
+    @contextmanager
+    def _writing(self, collection_name, create=False):
+        """Yield the current manifest for editing; on exit publish it and drop unreferenced segments."""
+        directory = self._directory(collection_name)
+        if create:
+            os.makedirs(directory, exist_ok=True)
+        with self._lock, file_lock(os.path.join(directory, '.lock')):
+            try:
+                with open(os.path.join(directory, MANIFEST)) as f:
+                    previous = json.load(f)
+            except FileNotFoundError:
+                if not create:
+                    raise
+                previous = {'dimension': None, 'segments': [], 'deleted': []}
+            manifest = json.loads(json.dumps(previous))
+            yield directory, manifest
+            if manifest == previous:
+                return
+
+            tmp_path = os.path.join(directory, f'.{MANIFEST}.tmp')
+            with open(tmp_path, 'w') as f:
+                json.dump(manifest, f)
+            os.replace(tmp_path, os.path.join(directory, MANIFEST))
+
+            # Keep the previous version's segments for readers still opening them
+            referenced = {entry['name'] for entry in manifest['segments'] + previous['segments']}
+            for filename in os.listdir(directory):
+                name, ext = os.path.splitext(filename)
+                if name.startswith('segment-') and ext in ('.npy', '.json') and name not in referenced:
+                    os.remove(os.path.join(directory, filename))
+
+    @staticmethod
+    def _merge_tail(directory, manifest):
+        """Merge trailing segments while the one before is no larger, dropping shadowed and deleted rows."""
+        segments = manifest['segments']
+        merge = 1
+        while merge < len(segments) and segments[-merge - 1]['rows'] <= sum(entry['rows'] for entry in segments[-merge:]):
+            merge += 1
+        if merge == 1:
+            return
+
+        tail = [_NumpySegment(directory, entry['name']) for entry in segments[-merge:]]
+        ids = np.concatenate([segment.ids for segment in tail])
+        payloads = [payload for segment in tail for payload in segment.payloads]
+        deleted = set(manifest['deleted'])
+        last_row = {int(id_): row for row, id_ in enumerate(ids)}
+        keep = sorted(row for id_, row in last_row.items() if id_ not in deleted)
+        vectors = np.concatenate([segment.vectors for segment in tail])[keep]
+
+        manifest['segments'] = segments[:-merge]
+        if keep:
+            manifest['segments'].append(_NumpySegment.write(directory, ids[keep], vectors, [payloads[row] for row in keep]))
+        if merge == len(segments):
+            # Every segment was merged, so no older row can still carry a deleted id
+            manifest['deleted'] = []
+
+    @staticmethod
+    def _normalize(vectors):
+        vectors = np.asarray(vectors, dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+        return vectors / np.where(norms == 0, 1, norms)
+
+    def collection_exists(self, collection_name):
+        return os.path.exists(os.path.join(self._directory(collection_name), MANIFEST))
+
+    def ensure_payload_index(self, collection_name):
+        # Genre filters scan the in-memory genre matrix; there is nothing to index
+        pass
+
+    def create_collection(self, collection_name, dimension):
+        with self._writing(collection_name, create=True) as (directory, manifest):
+            manifest.update(dimension=dimension, segments=[], deleted=[])
+
+    def upsert(self, collection_name, ids, vectors, payloads):
+        ids = [int(id_) for id_ in ids]
+        if not ids:
+            return
+        with self._writing(collection_name) as (directory, manifest):
+            manifest['segments'].append(_NumpySegment.write(directory, ids, self._normalize(vectors), list(payloads)))
+            upserted = set(ids)
+            manifest['deleted'] = [id_ for id_ in manifest['deleted'] if id_ not in upserted]
+            self._merge_tail(directory, manifest)
+
+    def set_payloads(self, collection_name, ids, payloads):
+        with self._writing(collection_name) as (directory, manifest):
+            collection = _NumpyCollection(directory, previous=self._collections.get(collection_name))
+            rows = [(collection.row_by_id.get(int(id_)), int(id_), payload) for id_, payload in zip(ids, payloads)]
+            rows = [row for row in rows if row[0] is not None]
+            if not rows:
+                return
+            # The vectors are unchanged, so a payload update is an upsert of the stored rows
+            vectors = np.stack([collection.vector(row) for row, _, _ in rows])
+            manifest['segments'].append(_NumpySegment.write(directory, [id_ for _, id_, _ in rows], vectors, [payload for _, _, payload in rows]))
+            self._merge_tail(directory, manifest)
+
+    def delete(self, collection_name, ids):
+        with self._writing(collection_name) as (directory, manifest):
+            manifest['deleted'] = sorted(set(manifest['deleted']) | {int(id_) for id_ in ids})
+
+    def retrieve(self, collection_name, doc_id):
+        collection = self._collection(collection_name)
+        row = collection.row_by_id.get(int(doc_id))
+        if row is None:
+            return None, None
+        return collection.vector(row).tolist(), collection.payloads[row]
+
+    def retrieve_many(self, collection_name, doc_ids):
+        collection = self._collection(collection_name)
+        rows = {int(id_): collection.row_by_id.get(int(id_)) for id_ in doc_ids}
+        return {
+            id_: (collection.vector(row).tolist(), collection.payloads[row])
+            for id_, row in rows.items() if row is not None
+        }
+
+    def _mask(self, collection, scores, genres, exclude_ids):
+        # Rows replaced by a later segment or deleted never match
+        scores = np.where(collection.live, scores, -np.inf)
+        if genres:
+            columns = collection.genre_columns(genres)
+            if len(columns) < len(set(genres)):
+                scores[:] = -np.inf
+                return scores
+            scores = np.where(collection.genre_matrix[:, columns].all(axis=1), scores, -np.inf)
+
+        if exclude_ids:
+            rows = [collection.row_by_id[int(id_)] for id_ in exclude_ids if int(id_) in collection.row_by_id]
+            scores[rows] = -np.inf
+        return scores
+
+    @staticmethod
+    def _top_k(collection, scores, top_k):
+        limit = min(top_k, len(scores))
+        if limit <= 0:
+            return []
+        candidates = np.argpartition(-scores, limit - 1)[:limit]
+        ranked = candidates[np.argsort(-scores[candidates])]
+        return [collection.payloads[row] for row in ranked if np.isfinite(scores[row])]
+
+    def search(self, collection_name, vector, top_k=10, genres=None, exclude_ids=None):
+        collection = self._collection(collection_name)
+        if not len(collection):
+            return []
+
+        scores = collection.scores(self._normalize([vector]))[0]
+        return self._top_k(collection, self._mask(collection, scores, genres, exclude_ids), top_k)
+
+    def search_batch(self, collection_name, vectors, top_k=10, genres_list=None, exclude_ids_list=None):
+        """Score all query vectors with one matrix product per segment; returns one payload list per vector."""
+        collection = self._collection(collection_name)
+        if not len(collection):
+            return [[] for _ in vectors]
+
+        genres_list = genres_list or [None] * len(vectors)
+        exclude_ids_list = exclude_ids_list or [None] * len(vectors)
+        all_scores = collection.scores(self._normalize(vectors))
+        return [
+            self._top_k(collection, self._mask(collection, scores, genres, exclude_ids), top_k)
+            for scores, genres, exclude_ids in zip(all_scores, genres_list, exclude_ids_list)
+        ]
+
+    def save_collection(self, collection_name, path):
+        directory = self._directory(collection_name)
+        with self._lock, file_lock(os.path.join(directory, '.lock')):
+            shutil.copytree(directory, path, dirs_exist_ok=True, ignore=shutil.ignore_patterns('.*'))
+
+    def load_collection(self, collection_name, path):
+        with open(os.path.join(path, MANIFEST)) as f:
+            imported = json.load(f)
+        with self._writing(collection_name, create=True) as (directory, manifest):
+            # Segment names are unique, so copying them next to the current ones is safe; the manifest swaps last
+            for entry in imported['segments']:
+                for ext in ('.npy', '.json'):
+                    shutil.copyfile(os.path.join(path, entry['name'] + ext), os.path.join(directory, entry['name'] + ext))
+            manifest.clear()
+            manifest.update(imported)
+
+
+VECTOR_STORE_BACKENDS = {
+    'qdrant': QdrantVectorStore,
+    'numpy': NumpyVectorStore,
+}
+
+_vector_store = None
+_vector_store_lock = threading.Lock()
+
+
+def get_vector_store():
+    """Return the process-wide vector store selected by VECTOR_STORE_BACKEND."""
+    global _vector_store
+    if _vector_store is None:
+        with _vector_store_lock:
+            if _vector_store is None:
+                _vector_store = VECTOR_STORE_BACKENDS[settings.VECTOR_STORE_BACKEND]()
+    return _vector_store
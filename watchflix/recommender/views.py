@@ -1,31 +1,91 @@
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
+from django.conf import settings
+from django.core.cache import cache
 from .recommender import MovieGraphRecommender, VectorRecommender
+from .clients import neo4j_pool_metrics
+from .encoder import encoder_registry
+from .graph_schema import GraphSchemaManager
+from .read_model import get_user_recommendations, paginate_follow_feed
+from .embedding_cache import query_embedding_cache
+from .recommendation_cache import recommendation_cache
+from .outbox import outbox_stats
+from .jobs import JobAlreadyActive, enqueue_job, job_status
+from .models import BackgroundJob
+from django.urls import reverse
 from rest_framework_simplejwt.authentication import JWTAuthentication
-import random 
+
+
+class ReadinessView(APIView):
+    authentication_classes = []
+    graph_schema_ready = False
+
+    @classmethod
+    def check_graph_schema(cls):
+        # Once the schema is ONLINE it stays so; only re-check until then
+        if not cls.graph_schema_ready:
+            try:
+                cls.graph_schema_ready = GraphSchemaManager(MovieGraphRecommender()).is_ready()
+            except Exception:
+                return False
+        return cls.graph_schema_ready
+
+    def get(self, request):
+        encoder_ready = encoder_registry.is_ready()
+        graph_schema_ready = self.check_graph_schema() if settings.NEO4J_SCHEMA_REQUIRED_FOR_READY else None
+        ready = encoder_ready and graph_schema_ready is not False
+        response_status = status.HTTP_200_OK if ready else status.HTTP_503_SERVICE_UNAVAILABLE
+        return Response({
+            'ready': ready,
+            'encoder_ready': encoder_ready,
+            'graph_schema_ready': graph_schema_ready,
+        }, status=response_status)
+
+class RecommenderStatsView(APIView):
+    authentication_classes = []
+
+    def get(self, request):
+        return Response({
+            'query_embedding_cache': query_embedding_cache.stats(),
+            'recommendation_cache': recommendation_cache.stats(),
+            'cache': cache.stats() if hasattr(cache, 'stats') else None,
+            'encoder_batching': encoder_registry.batching_stats(),
+            'neo4j_pool': neo4j_pool_metrics(),
+            'outbox': outbox_stats(),
+        }, status=status.HTTP_200_OK)
 
 class LoadNeo4jDataView(APIView):
     def post(self, request):
-        recommender = MovieGraphRecommender()
-        try:
-            recommender.load_data()
-            return Response({'message': 'Data loaded into Neo4j successfully'}, status=status.HTTP_200_OK)
-        except Exception as e:
-            return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-        finally:
-            recommender.close()
+        return enqueue_job_response(request, 'neo4j.load_data', {})
 
 class LoadQdrantDataView(APIView):
     def post(self, request):
-        recommender = VectorRecommender()
-        try:
-            recommender.load_data()
-            return Response({'message': 'Data loaded into Qdrant successfully'}, status=status.HTTP_200_OK)
-        except Exception as e:
-            return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-        finally:
-            recommender.close()
+        # mode=incremental only re-encodes new or changed movies
+        incremental = request.data.get('mode', request.GET.get('mode')) == 'incremental'
+        return enqueue_job_response(request, 'qdrant.load_data', {'incremental': incremental})
+
+def enqueue_job_response(request, job_type, params):
+    """Queue a load job for `manage.py run_jobs`; poll the returned status_url for progress."""
+    try:
+        job = enqueue_job(job_type, params)
+    except JobAlreadyActive as e:
+        return Response({
+            'error': str(e),
+            'job_id': e.job.id,
+            'status_url': request.build_absolute_uri(reverse('recommender-job-status', args=[e.job.id])),
+        }, status=status.HTTP_409_CONFLICT)
+    return Response({
+        'job_id': job.id,
+        'status_url': request.build_absolute_uri(reverse('recommender-job-status', args=[job.id])),
+    }, status=status.HTTP_202_ACCEPTED)
+
+class JobStatusView(APIView):
+    def get(self, request, job_id):
+        job = BackgroundJob.objects.filter(id=job_id).first()
+        if job is None:
+            return Response({'error': 'Job not found.'}, status=status.HTTP_404_NOT_FOUND)
+        return Response(job_status(job), status=status.HTTP_200_OK)
 
 class Neo4jContentBasedRecommendationView(APIView):
     authentication_classes = [JWTAuthentication]
@@ -44,36 +104,33 @@ class Neo4jFollowBasedRecommendationView(APIView):
     authentication_classes = [JWTAuthentication]
 
     def get(self, request, username):
-        recommender = MovieGraphRecommender()
         try:
-            genres_set = set() 
-            recommendations = recommender.recommend_movies_based_on_follows(username)
-
-            for rec in recommendations:
-                genres_set.update(rec.get('genres', [])) 
-
-            unique_genres = list(genres_set)  
-
-            random.shuffle(recommendations)  
-
-            return Response({
-                'username': username,
-                'recommendations': recommendations, 
-                'genres': unique_genres
-            }, status=status.HTTP_200_OK)
+            limit = min(max(int(request.query_params.get('limit', settings.FOLLOW_FEED_PAGE_SIZE)), 1), 100)
+            feed = get_user_recommendations(username, 'follow-based')
+            recommendations, next_cursor = paginate_follow_feed(feed, request.query_params.get('cursor'), limit)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
         except Exception as e:
             return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-        finally:
-            recommender.close()
+
+        genres_set = set() 
+        for rec in recommendations:
+            genres_set.update(rec.get('genres', [])) 
+
+        return Response({
+            'username': username,
+            'recommendations': recommendations, 
+            'genres': list(genres_set),
+            'next_cursor': next_cursor,
+        }, status=status.HTTP_200_OK)
 
 class Neo4jUserBasedRecommendationView(APIView):
     authentication_classes = [JWTAuthentication]
 
     def get(self, request, username):
-        recommender = MovieGraphRecommender()
         try:
             genres_set = set() 
-            recommendations = recommender.recommend_movies_user_based(username)
+            recommendations = get_user_recommendations(username, 'user-based')
 
             for rec in recommendations:
                 genres_set.update(rec.get('genres', [])) 
@@ -87,8 +144,6 @@ class Neo4jUserBasedRecommendationView(APIView):
             }, status=status.HTTP_200_OK)
         except Exception as e:
             return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-        finally:
-            recommender.close()
 
 class QdrantContentBasedRecommendationView(APIView):
     authentication_classes = [JWTAuthentication]
@@ -113,3 +168,28 @@ class QdrantContentBasedRecommendationView(APIView):
             return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
         finally:
             recommender.close()
+
+
+class QdrantBatchContentBasedRecommendationView(APIView):
+    authentication_classes = [JWTAuthentication]
+    max_ids = 100
+
+    def get(self, request):
+        try:
+            movie_ids = [int(movie_id) for movie_id in request.GET.get('ids', '').split(',') if movie_id.strip()]
+        except ValueError:
+            return Response({'error': 'ids must be a comma-separated list of movie ids.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        if not movie_ids:
+            return Response({'error': 'ids is required.'}, status=status.HTTP_400_BAD_REQUEST)
+        if len(movie_ids) > self.max_ids:
+            return Response({'error': f'At most {self.max_ids} ids are allowed.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        recommender = VectorRecommender()
+        try:
+            recommendations = recommender.get_movie_recommendations_batch(list(dict.fromkeys(movie_ids)))
+            return Response({'recommendations': recommendations}, status=status.HTTP_200_OK)
+        except Exception as e:
+            return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        finally:
+            recommender.close()
@@ -2,6 +2,7 @@ from rest_framework import viewsets, status
 from rest_framework.response import Response
 from rest_framework.decorators import action
 from django.shortcuts import get_object_or_404
+from django.db import transaction
 from django.db.models import Count
 from accounts.models import UserProfile
 from movies.models import Movie
@@ -51,15 +52,18 @@ class WatchHistoryViewSet(viewsets.ViewSet):
 
         watch_history = WatchHistory.objects.filter(user=user_profile, movie=movie).first()
 
+        # The WATCHED edge is published to the outbox by the save signal, in the same transaction
         if watch_history:
-            watch_history.rating = rating
-            watch_history.save()
+            with transaction.atomic():
+                watch_history.rating = rating
+                watch_history.save()
             return Response({'detail': 'Watch history updated', 'rating': rating}, status=status.HTTP_200_OK)
 
         # Save new watch history entry
         serializer = CreateWatchHistorySerializer(data=request.data)
         if serializer.is_valid():
-            serializer.save(user=user_profile, movie=movie)
+            with transaction.atomic():
+                serializer.save(user=user_profile, movie=movie)
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
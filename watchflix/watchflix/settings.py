@@ -92,6 +92,43 @@ DATABASES = {
 }
 
 
+# Caching: a small per-process L1 in front of a shared L2 that every worker sees and that survives restarts.
+# CACHE_L2_BACKEND is 'db' (default, a table in the default database), 'redis' (CACHE_L2_LOCATION is the
+# Redis URL), 'file' or 'locmem' for tests. Redis and the database make cache.add atomic across workers;
+# the file backend scans its whole directory on every write and logs a warning at startup.
+CACHE_L2_BACKEND = os.getenv('CACHE_L2_BACKEND', 'db')
+CACHE_L2_BACKENDS = {
+    'db': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'recommender_cache',
+        'OPTIONS': {'MAX_ENTRIES': int(os.getenv('CACHE_L2_MAX_ENTRIES', 100000))},
+    },
+    'file': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.getenv('CACHE_L2_LOCATION', BASE_DIR / 'cache'),
+        'OPTIONS': {'MAX_ENTRIES': int(os.getenv('CACHE_L2_MAX_ENTRIES', 5000))},
+    },
+    'redis': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.getenv('CACHE_L2_LOCATION', 'redis://localhost:6379/0'),
+    },
+    'locmem': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'watchflix-l2',
+    },
+}
+CACHES = {
+    'default': {
+        'BACKEND': 'recommender.cache_backends.TwoTierCache',
+        'OPTIONS': {
+            'L2_ALIAS': 'shared',
+            'L1_MAX_ENTRIES': int(os.getenv('CACHE_L1_MAX_ENTRIES', 1000)),
+            'L1_TIMEOUT': float(os.getenv('CACHE_L1_TIMEOUT', 5)),
+        },
+    },
+    'shared': CACHE_L2_BACKENDS[CACHE_L2_BACKEND],
+}
+
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
 
@@ -157,10 +194,94 @@ SIMPLE_JWT = {
 NEO4J_URI = os.getenv('NEO4J_URI', 'bolt://localhost:7687')
 NEO4J_USER = os.getenv('NEO4J_USER', 'neo4j')
 NEO4J_PASSWORD = os.getenv('NEO4J_PASSWORD', 'Neo4jSecret')
+# One driver per process; these bound its connection pool
+NEO4J_MAX_CONNECTION_POOL_SIZE = int(os.getenv('NEO4J_MAX_CONNECTION_POOL_SIZE', 50))
+NEO4J_CONNECTION_ACQUISITION_TIMEOUT = float(os.getenv('NEO4J_CONNECTION_ACQUISITION_TIMEOUT', 30))
+NEO4J_MAX_CONNECTION_LIFETIME = int(os.getenv('NEO4J_MAX_CONNECTION_LIFETIME', 3600))
+# Rows per UNWIND transaction when rebuilding the graph
+NEO4J_BULK_BATCH_SIZE = int(os.getenv('NEO4J_BULK_BATCH_SIZE', 5000))
+# Seconds `graph_schema migrate` waits for indexes; the readiness check can require an ONLINE schema
+NEO4J_SCHEMA_AWAIT_TIMEOUT = int(os.getenv('NEO4J_SCHEMA_AWAIT_TIMEOUT', 300))
+NEO4J_SCHEMA_REQUIRED_FOR_READY = os.getenv('NEO4J_SCHEMA_REQUIRED_FOR_READY', 'True') == 'True'
+# Offline rebuilds: neo4j-admin binary, and where the server sees its import directory for LOAD CSV
+NEO4J_ADMIN_PATH = os.getenv('NEO4J_ADMIN_PATH', 'neo4j-admin')
+NEO4J_IMPORT_URL_PREFIX = os.getenv('NEO4J_IMPORT_URL_PREFIX', 'file:///')
+# CONTENT_SIMILAR edges kept per movie, and how much a shared genre, actor or director weighs
+CONTENT_SIMILARITY_TOP_N = int(os.getenv('CONTENT_SIMILARITY_TOP_N', 50))
+CONTENT_SIMILARITY_WEIGHTS = {
+    group: float(os.getenv(f'CONTENT_SIMILARITY_{group.upper()}_WEIGHT', default))
+    for group, default in (('genre', 1.0), ('actor', 1.5), ('director', 2.0))
+}
+# Co-watch SIMILAR edges kept per movie, and the co-watchers needed for an edge
+SIMILAR_MOVIES_TOP_N = int(os.getenv('SIMILAR_MOVIES_TOP_N', 50))
+SIMILAR_MOVIES_MIN_CO_WATCHERS = int(os.getenv('SIMILAR_MOVIES_MIN_CO_WATCHERS', 2))
+# Share of the watched movies an incremental SIMILAR run may recompute before it recomputes all of them
+SIMILAR_MOVIES_MAX_INCREMENTAL = float(os.getenv('SIMILAR_MOVIES_MAX_INCREMENTAL', 0.3))
+# Backend for neo4j/user-based/: 'neo4j' walks the graph, 'item-knn' and 'als' score with offline models
+USER_RECOMMENDER_BACKEND = os.getenv('USER_RECOMMENDER_BACKEND', 'neo4j')
+ITEM_KNN_PATH = os.getenv('ITEM_KNN_PATH', BASE_DIR / 'item_knn')
+ITEM_KNN_NEIGHBORS = int(os.getenv('ITEM_KNN_NEIGHBORS', 50))
+# ALS model for USER_RECOMMENDER_BACKEND='als'; 'implicit' treats ratings as confidence, 'explicit' fits them
+ALS_PATH = os.getenv('ALS_PATH', BASE_DIR / 'als')
+ALS_FACTORS = int(os.getenv('ALS_FACTORS', 64))
+ALS_REGULARIZATION = float(os.getenv('ALS_REGULARIZATION', 0.1))
+ALS_ITERATIONS = int(os.getenv('ALS_ITERATIONS', 15))
+ALS_ALPHA = float(os.getenv('ALS_ALPHA', 40))
+ALS_FEEDBACK = os.getenv('ALS_FEEDBACK', 'implicit')
+# Recommendation caches are invalidated by model signals; these TTLs are only a backstop
+USER_RECOMMENDATIONS_CACHE_TTL = int(os.getenv('USER_RECOMMENDATIONS_CACHE_TTL', 24 * 3600))
+MOVIE_RECOMMENDATIONS_CACHE_TTL = int(os.getenv('MOVIE_RECOMMENDATIONS_CACHE_TTL', 7 * 24 * 3600))
+# Follow feed: ranked movies of followed people, cached per user and served in cursor pages
+FOLLOW_FEED_MAX_ITEMS = int(os.getenv('FOLLOW_FEED_MAX_ITEMS', 500))
+FOLLOW_FEED_PAGE_SIZE = int(os.getenv('FOLLOW_FEED_PAGE_SIZE', 50))
+FOLLOW_FEED_CACHE_TTL = int(os.getenv('FOLLOW_FEED_CACHE_TTL', 24 * 3600))
+# Expired entries are served for STALE_TTL more while one background refresh recomputes them;
+# empty results are cached for NEGATIVE_TTL, and LOCK_TIMEOUT bounds a single-flight recompute
+RECOMMENDATION_CACHE_STALE_TTL = int(os.getenv('RECOMMENDATION_CACHE_STALE_TTL', 3600))
+RECOMMENDATION_CACHE_NEGATIVE_TTL = int(os.getenv('RECOMMENDATION_CACHE_NEGATIVE_TTL', 300))
+RECOMMENDATION_CACHE_LOCK_TIMEOUT = int(os.getenv('RECOMMENDATION_CACHE_LOCK_TIMEOUT', 30))
+RECOMMENDATION_CACHE_REFRESH_WORKERS = int(os.getenv('RECOMMENDATION_CACHE_REFRESH_WORKERS', 4))
+# Background refresh of the UserRecommendation read model (`manage.py refresh_recommendations`)
+USER_RECOMMENDATION_MAX_AGE = int(os.getenv('USER_RECOMMENDATION_MAX_AGE', 3600))
+USER_RECOMMENDATION_REFRESH_WORKERS = int(os.getenv('USER_RECOMMENDATION_REFRESH_WORKERS', 8))
+USER_RECOMMENDATION_REFRESH_BATCH_SIZE = int(os.getenv('USER_RECOMMENDATION_REFRESH_BATCH_SIZE', 100))
+# Outbox of graph/vector side effects, drained by `manage.py dispatch_outbox`
+OUTBOX_BATCH_SIZE = int(os.getenv('OUTBOX_BATCH_SIZE', 500))
+OUTBOX_POLL_INTERVAL = float(os.getenv('OUTBOX_POLL_INTERVAL', 1))
+OUTBOX_MAX_ATTEMPTS = int(os.getenv('OUTBOX_MAX_ATTEMPTS', 10))
+OUTBOX_RETRY_BASE_DELAY = int(os.getenv('OUTBOX_RETRY_BASE_DELAY', 5))
+OUTBOX_RETRY_MAX_DELAY = int(os.getenv('OUTBOX_RETRY_MAX_DELAY', 600))
+OUTBOX_RETENTION = int(os.getenv('OUTBOX_RETENTION', 7 * 24 * 3600))
+# Background jobs (`manage.py run_jobs`); a job without a heartbeat for HEARTBEAT_TIMEOUT is resumed elsewhere
+JOB_WORKERS = int(os.getenv('JOB_WORKERS', 2))
+JOB_POLL_INTERVAL = float(os.getenv('JOB_POLL_INTERVAL', 2))
+JOB_HEARTBEAT_INTERVAL = int(os.getenv('JOB_HEARTBEAT_INTERVAL', 10))
+JOB_HEARTBEAT_TIMEOUT = int(os.getenv('JOB_HEARTBEAT_TIMEOUT', 60))
+JOB_MAX_ATTEMPTS = int(os.getenv('JOB_MAX_ATTEMPTS', 3))
 
 # QDRANT setup
 QDRANT_URI = os.getenv('QDRANT_URI', 'http://localhost:6333')
+# 'qdrant' uses the server above, 'numpy' an embedded memory-mapped store under VECTOR_STORE_PATH
+VECTOR_STORE_BACKEND = os.getenv('VECTOR_STORE_BACKEND', 'qdrant')
+VECTOR_STORE_PATH = os.getenv('VECTOR_STORE_PATH', BASE_DIR / 'vector_store')
 ENCODER_MODEL_NAME = "all-MiniLM-L6-v2"
+# Load the encoder when the app starts (before gunicorn --preload forks workers); wsgi.py and asgi.py
+# turn this on, so management commands do not pay for it
+ENCODER_PRELOAD = os.getenv('ENCODER_PRELOAD', 'False') == 'True'
+# 'fp32' runs the PyTorch model, 'onnx-int8' an int8-quantized ONNX export cached in ENCODER_ONNX_CACHE_DIR
+ENCODER_INFERENCE_MODE = os.getenv('ENCODER_INFERENCE_MODE', 'fp32')
+ENCODER_ONNX_CACHE_DIR = os.getenv('ENCODER_ONNX_CACHE_DIR', BASE_DIR / 'encoder_cache')
+# Group concurrent single-query encodes into one batch (flushed at the size or wait limit)
+ENCODER_MICRO_BATCHING = os.getenv('ENCODER_MICRO_BATCHING', 'True') == 'True'
+ENCODER_MAX_BATCH_SIZE = int(os.getenv('ENCODER_MAX_BATCH_SIZE', 32))
+ENCODER_MAX_WAIT_MS = float(os.getenv('ENCODER_MAX_WAIT_MS', 5))
+# Texts per encoder forward pass and points per Qdrant upload when loading vectors
+VECTOR_ENCODE_BATCH_SIZE = int(os.getenv('VECTOR_ENCODE_BATCH_SIZE', 64))
+VECTOR_UPLOAD_BATCH_SIZE = int(os.getenv('VECTOR_UPLOAD_BATCH_SIZE', 512))
+# LRU cache of plot-search query embeddings (optionally shared through the Django cache)
+QUERY_EMBEDDING_CACHE_SIZE = int(os.getenv('QUERY_EMBEDDING_CACHE_SIZE', 1024))
+QUERY_EMBEDDING_CACHE_TTL = int(os.getenv('QUERY_EMBEDDING_CACHE_TTL', 3600))
+QUERY_EMBEDDING_CACHE_SHARED = os.getenv('QUERY_EMBEDDING_CACHE_SHARED', 'False') == 'True'
 
 # CORS set up
 CORS_ALLOW_CREDENTIALS = True
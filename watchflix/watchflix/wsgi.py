@@ -12,5 +12,7 @@ import os
 from django.core.wsgi import get_wsgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'watchflix.settings')
+# Serving processes warm up the encoder at startup
+os.environ.setdefault('ENCODER_PRELOAD', 'True')
 
 application = get_wsgi_application()